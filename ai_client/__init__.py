@@ -2,6 +2,9 @@ import os
 from http.cookies import SimpleCookie
 from .openai_client import OpenAIClient
 from .gemini_client import GeminiWebClient
+from .cache import CachedClient
+from .rate_limit import RateLimitedClient
+from .router import RoutingClient
 
 
 def _parse_cookie(cookie_str: str) -> dict:
@@ -11,15 +14,36 @@ def _parse_cookie(cookie_str: str) -> dict:
     return {key: morsel.value for key, morsel in cookie.items()}
 
 
+def _enabled(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
 def create_client():
-    """根据环境变量配置创建 AI 客户端"""
-    provider = os.getenv("AI_PROVIDER", "openai").lower()
-    
+    """根据环境变量配置创建 AI 客户端
+
+    AI_RATE_LIMIT=true（默认）时加限流和重试，AI_CACHE=true 时为 chat 调用加缓存（缓存命中不占用限流额度）
+    AI_PROVIDER 为逗号分隔的多个提供商时（如 gemini,openai），按顺序路由并在出错或过慢时切换（见 router.py）
+    """
+    rate_limit = _enabled("AI_RATE_LIMIT", "true")
+    backends = []
+    for provider in os.getenv("AI_PROVIDER", "openai").lower().split(","):
+        if provider.strip():
+            backend = _create_provider(provider.strip(), rate_limit)
+            backends.append(RateLimitedClient(backend) if rate_limit else backend)
+    client = backends[0] if len(backends) == 1 else RoutingClient(backends)
+    if _enabled("AI_CACHE", "false"):
+        client = CachedClient(client)
+    return client
+
+
+def _create_provider(provider: str, rate_limit: bool = False):
+    """创建指定提供商的客户端，rate_limit=True 时由外层负责重试"""
     if provider == "openai":
         return OpenAIClient(
             api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("OPENAI_BASE_URL"),
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            max_retries=0 if rate_limit else 2
         )
     elif provider == "gemini":
         cookie_str = os.getenv("GEMINI_COOKIE", "")
@@ -1,6 +1,7 @@
 """AI 请求接口"""
 
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 
 class AIClient(ABC):
@@ -16,12 +17,61 @@ class AIClient(ABC):
         """多轮对话，保留历史记录"""
         pass
     
+    async def stream_chat_history(self, message: str) -> AsyncIterator[str]:
+        """多轮对话（流式），逐段返回回复内容，保留历史记录
+        
+        默认实现等待完整回复后一次性返回，支持流式的客户端应覆盖此方法
+        """
+        yield await self.chat_history(message)
+    
     @abstractmethod
     async def image_history(self, message: str, file_path: str,file_name: str,upload_image_path: str) -> str:
         """生成图片，保留历史记录"""
         pass
     
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        """生成单张图片，不保留历史记录（可并发调用），保存为 file_path/file_name.png
+
+        返回是否成功保存了图片
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持无状态图片生成")
+    
     @abstractmethod
     def reset_chat(self):
         """重置对话历史"""
         pass
+
+
+class DelegatingClient(AIClient):
+    """包装另一个 AIClient 的基类，默认所有调用都转发给 inner
+
+    缓存、限流等包装层继承此类，只覆盖需要处理的方法
+    """
+    
+    def __init__(self, inner: AIClient):
+        self.inner = inner
+    
+    def __getattr__(self, name):
+        # 其余属性（如 model、history、image 等）透传给被包装的客户端
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+    
+    async def chat(self, message: str) -> str:
+        return await self.inner.chat(message)
+    
+    async def chat_history(self, message: str) -> str:
+        return await self.inner.chat_history(message)
+    
+    async def stream_chat_history(self, message: str) -> AsyncIterator[str]:
+        async for delta in self.inner.stream_chat_history(message):
+            yield delta
+    
+    async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+        return await self.inner.image_history(message, file_path, file_name)
+    
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        return await self.inner.generate_image(message, file_path, file_name)
+    
+    def reset_chat(self):
+        self.inner.reset_chat()
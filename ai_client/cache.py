@@ -0,0 +1,196 @@
+"""AI 响应缓存 - 为无状态的 chat 调用提供两级缓存
+
+    一级: 进程内 LRU（每条记录到期时间，与本地缓存使用同一个有效期）
+    二级: 本地 SQLite（默认 data/ai_cache.db）
+    可选共享层: Redis（AI_CACHE_REDIS=true，异步客户端，见 util/redis_client.py）
+
+缓存键由 provider、model 和提示词的 sha256 组成。只缓存 chat，多轮对话和图片生成直接透传。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from .base import AIClient, DelegatingClient
+from util.paths import DATA_DIR
+
+CACHE_FILE = os.getenv("AI_CACHE_FILE", os.path.join(DATA_DIR, "ai_cache.db"))
+# 缓存有效期（秒），默认 7 天
+CACHE_TTL = int(os.getenv("AI_CACHE_TTL", 7 * 24 * 3600))
+# 进程内 LRU 条目数
+MEMORY_MAX_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", 256))
+# 本地缓存最大体积（MB），超出时淘汰最久未使用的
+DISK_MAX_MB = float(os.getenv("AI_CACHE_DISK_MB", 100))
+REDIS_ENABLED = os.getenv("AI_CACHE_REDIS", "false").lower() in ("1", "true", "yes")
+REDIS_PREFIX = "xhs:ai_cache:"
+
+
+def client_identity(client: AIClient) -> tuple[str, str]:
+    """(provider, model)，用于区分不同模型的回复；限流等包装层透明，使用最内层客户端"""
+    while isinstance(client, DelegatingClient):
+        client = client.inner
+    provider = type(client).__name__
+    model = getattr(client, "model", None) or getattr(client, "MODEL", "") or ""
+    return provider, str(model)
+
+
+def make_key(provider: str, model: str, prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{digest}"
+
+
+class DiskCache:
+    """SQLite 缓存层，按总字节数淘汰"""
+
+    def __init__(self, path: str = CACHE_FILE, ttl: int = CACHE_TTL, max_bytes: int = int(DISK_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _db(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            try:
+                with conn:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS ai_cache (
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_used REAL NOT NULL
+                        )
+                    """)
+                    yield conn
+            finally:
+                conn.close()
+
+    def get(self, key: str) -> str | None:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> tuple[str, float] | None:
+        """返回 (值, 到期时间)，不存在或已过期时返回 None"""
+        now = time.time()
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM ai_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+        return (row[0], row[1] + self.ttl) if row else None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            conn.execute("DELETE FROM ai_cache WHERE created_at <= ?", (now - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # 从最久未使用的开始淘汰，直到低于上限
+                excess = total - self.max_bytes
+                for old_key, old_size in conn.execute("SELECT key, size FROM ai_cache ORDER BY last_used").fetchall():
+                    if excess <= 0:
+                        break
+                    conn.execute("DELETE FROM ai_cache WHERE key = ?", (old_key,))
+                    excess -= old_size
+
+
+class CachedClient(DelegatingClient):
+    """为任意 AIClient 的 chat 调用加缓存
+
+    使用方法:
+        client = CachedClient(create_client())
+        await client.chat("...")   # 相同提示词第二次直接命中缓存
+        print(client.stats)
+    """
+
+    def __init__(self, inner: AIClient, memory_entries: int = MEMORY_MAX_ENTRIES, disk: DiskCache = None, use_redis: bool = REDIS_ENABLED):
+        super().__init__(inner)
+        self.memory_entries = memory_entries
+        # 键 → (值, 到期时间)
+        self.memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.disk = disk or DiskCache()
+        self.use_redis = use_redis
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "redis_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _redis():
+        """当前事件循环的异步 Redis 客户端（前台和后台任务线程各自一个）"""
+        from util.redis_client import get_async_redis
+        return get_async_redis()
+
+    def _remember(self, key: str, value: str, expires_at: float = None):
+        self.memory[key] = (value, expires_at or time.time() + self.disk.ttl)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    async def _lookup(self, key: str) -> str | None:
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.time():
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self.memory[key]
+
+        entry = await asyncio.to_thread(self.disk.get_entry, key)
+        if entry is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, *entry)
+            return entry[0]
+
+        if self.use_redis:
+            try:
+                value = await self._redis().get(REDIS_PREFIX + key)
+            except Exception:
+                value = None
+            if value is not None:
+                self.stats["redis_hits"] += 1
+                self._remember(key, value)
+                await asyncio.to_thread(self.disk.set, key, value)
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def _store(self, key: str, value: str):
+        self._remember(key, value)
+        await asyncio.to_thread(self.disk.set, key, value)
+        if self.use_redis:
+            try:
+                await self._redis().set(REDIS_PREFIX + key, value, CACHE_TTL)
+            except Exception:
+                pass
+
+    async def chat(self, message: str) -> str:
+        """单次对话，相同 provider/model/提示词 命中缓存时直接返回"""
+        key = make_key(*client_identity(self.inner), message)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        reply = await self.inner.chat(message)
+        if reply:
+            await self._store(key, json.dumps(reply, ensure_ascii=False))
+        return reply
+
+    def stats_text(self) -> str:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["redis_hits"]
+        total = hits + self.stats["misses"]
+        rate = hits / total * 100 if total else 0
+        return (f"AI 缓存命中率 {rate:.0f}%（内存 {self.stats['memory_hits']}，本地 {self.stats['disk_hits']}，"
+                f"Redis {self.stats['redis_hits']}，未命中 {self.stats['misses']}）")
@@ -1,7 +1,9 @@
 """Gemini 反代实现 (gemini_webapi)"""
 
+import asyncio
 from gemini_webapi import GeminiClient
 from .base import AIClient
+from .history import estimate_tokens, record_usage
 import time
 from util.console import print_info
 from gemini_webapi.constants import Model 
@@ -12,18 +14,28 @@ class GeminiWebClient(AIClient):
     def __init__(self, secure_1psid: str, secure_1psidts: str = None):
         self.secure_1psid = secure_1psid
         self.secure_1psidts = secure_1psidts
+        self.model = "gemini-3.0-pro"
         self.client = None
         self.chat_session = None
+        # 并发请求（如并行生成图片）首次调用时只初始化一次
+        self._init_lock = asyncio.Lock()
     
     async def _ensure_client(self):
-        if self.client is None:
-            self.client = GeminiClient(self.secure_1psid, self.secure_1psidts)
-            await self.client.init(auto_refresh=True)
+        if self.client is not None:
+            return
+        async with self._init_lock:
+            if self.client is None:
+                client = GeminiClient(self.secure_1psid, self.secure_1psidts)
+                await client.init(auto_refresh=True)
+                # 初始化成功后再赋值，失败时下次调用重新初始化
+                self.client = client
     
     async def chat(self, message: str) -> str:
         """单次对话，不保留历史记录"""
         await self._ensure_client()
-        response = await self.client.generate_content(message, model="gemini-3.0-pro")
+        response = await self.client.generate_content(message, model=self.model)
+        # 网页版接口不返回 usage，使用估算值
+        record_usage(self, estimate_tokens(message), estimate_tokens(response.text))
         return response.text
     async def image(self, message: str, file_path: str,file_name: str,upload_image_path: str) -> str:
         """生成图片，保留历史记录, 保存到 file_path"""
@@ -53,9 +65,10 @@ class GeminiWebClient(AIClient):
         await self._ensure_client()
         
         if self.chat_session is None:
-            self.chat_session = self.client.start_chat(model="gemini-3.0-pro")
+            self.chat_session = self.client.start_chat(model=self.model)
         
         response = await self.chat_session.send_message(message)
+        record_usage(self, estimate_tokens(message), estimate_tokens(response.text))
         return response.text
     
     async def image_history(self, message: str, file_path: str,file_name: str) -> str:
@@ -63,12 +76,24 @@ class GeminiWebClient(AIClient):
         await self._ensure_client()
         
         if self.chat_session is None:
-            self.chat_session = self.client.start_chat(model="gemini-3.0-pro")
+            self.chat_session = self.client.start_chat(model=self.model)
         response = await self.chat_session.send_message(message)
         for i, image in enumerate(response.images):  
             await image.save(path=file_path, filename=f"{file_name}.png", verbose=True)
         return response.text
     
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        """生成单张图片，不保留历史记录（可并发调用），保存为 file_path/file_name.png"""
+        await self._ensure_client()
+        
+        response = await self.client.generate_content(message, model=Model.G_3_0_PRO)
+        if not response.images:
+            return False
+        
+        # 只保留第一张，避免多张结果互相覆盖
+        await response.images[0].save(path=file_path, filename=f"{file_name}.png", verbose=False)
+        return True
+    
     def reset_chat(self):
         """重置对话历史，开始新会话"""
         self.chat_session = None
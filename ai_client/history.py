@@ -0,0 +1,147 @@
+"""对话历史管理 - 按 token 预算压缩历史，控制每次请求的提示词长度
+
+超出预算时，把较早的对话压缩进滚动摘要，最近几轮保持原文，
+第一条用户消息（选题要求等任务指令）和 system 消息始终原样保留。
+"""
+
+import os
+from typing import Awaitable, Callable
+from util.console import console
+from util.metrics import inc
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken 为可选依赖，缺失时使用估算
+    _encoding = None
+
+# 历史消息的 token 预算（不含本轮回复）
+TOKEN_BUDGET = int(os.getenv("OPENAI_HISTORY_TOKEN_BUDGET", 6000))
+# 压缩时保留原文的最近轮数（一问一答为一轮）
+KEEP_RECENT_TURNS = int(os.getenv("OPENAI_HISTORY_KEEP_TURNS", 3))
+
+SUMMARY_PROMPT = """请把下面的对话压缩成一段简洁的摘要，供后续对话继续使用。
+必须保留：已经确定的选题、内容要点、标题和标签、用户提出的修改要求和最终结论；省略寒暄和被否定的方案。
+直接输出摘要，不要输出其他内容。
+
+{previous}对话内容：
+{transcript}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数，有 tiktoken 时精确计算，否则按中文 1 字 1 token、其他 4 字符 1 token 估算"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    cjk = sum(1 for ch in text if "一" <= ch <= "鿿" or "　" <= ch <= "〿" or "＀" <= ch <= "￯")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def record_usage(client, prompt_tokens: int, completion_tokens: int):
+    """记录 token 用量指标，接口返回 usage 时传实际值，否则传估算值"""
+    labels = {"provider": type(client).__name__, "model": getattr(client, "model", "")}
+    inc("ai_tokens_total", prompt_tokens, kind="prompt", **labels)
+    inc("ai_tokens_total", completion_tokens, kind="completion", **labels)
+
+
+class ChatHistory:
+    """有 token 预算的对话历史"""
+
+    def __init__(self, token_budget: int = TOKEN_BUDGET, keep_recent_turns: int = KEEP_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.clear()
+
+    def clear(self):
+        """清空历史"""
+        # 固定保留的消息（system 消息和第一条用户消息）
+        self.pinned: list[dict] = []
+        # 可被压缩的消息
+        self.messages: list[dict] = []
+        self.summary = ""
+        # 每轮的 token 统计，便于观察压缩效果
+        self.turns: list[dict] = []
+
+    def append(self, role: str, content: str):
+        """追加一条消息"""
+        message = {"role": role, "content": content, "tokens": estimate_tokens(content)}
+        if role == "system" or (role == "user" and not self.pinned and not self.messages):
+            self.pinned.append(message)
+        else:
+            self.messages.append(message)
+
+    def pop(self):
+        """撤回最后一条消息（请求失败时使用）"""
+        if self.messages:
+            self.messages.pop()
+        elif self.pinned:
+            self.pinned.pop()
+
+    @property
+    def total_tokens(self) -> int:
+        """发送给模型的历史 token 总数"""
+        return (sum(m["tokens"] for m in self.pinned)
+                + sum(m["tokens"] for m in self.messages)
+                + estimate_tokens(self.summary))
+
+    def to_messages(self) -> list[dict]:
+        """构建请求用的 messages"""
+        result = [{"role": m["role"], "content": m["content"]} for m in self.pinned]
+        if self.summary:
+            result.append({"role": "system", "content": f"以下是之前对话的摘要：\n{self.summary}"})
+        result.extend({"role": m["role"], "content": m["content"]} for m in self.messages)
+        return result
+
+    def record_turn(self, sent_tokens: int, reply_tokens: int, prompt_tokens: int = None):
+        """记录一轮请求的 token 数，prompt_tokens 为接口返回的实际值（可能为空）"""
+        self.turns.append({
+            "turn": len(self.turns) + 1,
+            "sent_tokens": sent_tokens,
+            "prompt_tokens": prompt_tokens,
+            "reply_tokens": reply_tokens,
+        })
+        actual = f"，实际 {prompt_tokens}" if prompt_tokens else ""
+        console.print(
+            f"[dim]🧮 第 {len(self.turns)} 轮: 历史 {sent_tokens} tokens{actual}，"
+            f"回复 {reply_tokens} tokens，预算 {self.token_budget}[/dim]"
+        )
+
+    def _split_index(self) -> int:
+        """需要压缩的消息数量：保留最近 keep_recent_turns 轮，且从用户消息处切分"""
+        keep = self.keep_recent_turns * 2 + 1  # 末尾是本轮尚未回复的用户消息
+        index = max(0, len(self.messages) - keep)
+        while index > 0 and self.messages[index]["role"] != "user":
+            index -= 1
+        return index
+
+    async def compact(self, summarize: Callable[[str], Awaitable[str]]) -> bool:
+        """超出预算时压缩较早的对话，返回是否执行了压缩
+
+        summarize: 无状态的对话函数（如 client.chat），用于生成摘要
+        """
+        if self.total_tokens <= self.token_budget:
+            return False
+        index = self._split_index()
+        if index <= 0:
+            return False
+
+        before = self.total_tokens
+        old = self.messages[:index]
+        transcript = "\n\n".join(
+            f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}" for m in old
+        )
+        previous = f"之前的摘要：\n{self.summary}\n\n" if self.summary else ""
+        try:
+            summary = await summarize(SUMMARY_PROMPT.format(previous=previous, transcript=transcript))
+        except Exception as e:
+            console.print(f"[yellow]⚠️ 历史压缩失败，继续使用完整历史: {e}[/yellow]")
+            return False
+
+        self.summary = summary.strip()
+        self.messages = self.messages[index:]
+        console.print(
+            f"[dim]🗜️ 历史已压缩: {len(old)} 条消息并入摘要，{before} → {self.total_tokens} tokens[/dim]"
+        )
+        return True
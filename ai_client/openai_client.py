@@ -1,38 +1,132 @@
-"""OpenAI SDK 实现"""
+"""OpenAI SDK 实现（AsyncOpenAI + 共享连接池）"""
 
-from openai import OpenAI
+import asyncio
+import weakref
+from typing import AsyncIterator
+from openai import AsyncOpenAI
+from util.http_client import get_http_client
 from .base import AIClient
+from .history import ChatHistory, estimate_tokens, record_usage
 
 
 class OpenAIClient(AIClient):
-    """OpenAI SDK 实现"""
-    
-    def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-4o-mini"):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    """OpenAI SDK 实现
+
+    基于 AsyncOpenAI，请求不阻塞事件循环，同一进程内可以并发多个请求；
+    同一事件循环内的所有实例共享一个 HTTP 连接池。
+    多轮对话的历史由 ChatHistory 管理，超出 token 预算时自动压缩为摘要。
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-4o-mini", max_retries: int = 2):
+        """max_retries 为 SDK 自带的重试次数，外层使用 RateLimitedClient 时设为 0，避免重复重试"""
+        self.api_key = api_key
+        self.base_url = base_url
         self.model = model
-        self.history = []
-    
+        self.max_retries = max_retries
+        self.history = ChatHistory()
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环对应的 AsyncOpenAI 实例"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=get_http_client("openai"),
+                max_retries=self.max_retries
+            )
+            self._clients[loop] = client
+        return client
+
     async def chat(self, message: str) -> str:
         """单次对话，不保留历史记录"""
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": message}]
         )
-        return response.choices[0].message.content
-    
+        reply = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        if usage:
+            record_usage(self, usage.prompt_tokens, usage.completion_tokens)
+        else:
+            record_usage(self, estimate_tokens(message), estimate_tokens(reply))
+        return reply
+
+    async def _prepare_history(self, message: str) -> list[dict]:
+        """追加用户消息，必要时压缩历史，返回本次请求的 messages"""
+        self.history.append("user", message)
+        await self.history.compact(self.chat)
+        return self.history.to_messages()
+
     async def chat_history(self, message: str) -> str:
         """多轮对话，保留历史记录"""
-        self.history.append({"role": "user", "content": message})
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=self.history
-        )
-        
+        messages = await self._prepare_history(message)
+
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages
+            )
+        except Exception:
+            # 请求失败时撤回本轮消息，保证历史中 user/assistant 成对出现
+            self.history.pop()
+            raise
+
         reply = response.choices[0].message.content
-        self.history.append({"role": "assistant", "content": reply})
+        self.history.append("assistant", reply)
+        usage = getattr(response, "usage", None)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        self.history.record_turn(prompt_tokens, estimate_tokens(reply), usage.prompt_tokens if usage else None)
+        if usage:
+            record_usage(self, usage.prompt_tokens, usage.completion_tokens)
+        else:
+            record_usage(self, prompt_tokens, estimate_tokens(reply))
         return reply
-    
+
+    async def stream_chat_history(self, message: str) -> AsyncIterator[str]:
+        """多轮对话（流式），逐段返回回复内容，保留历史记录"""
+        messages = await self._prepare_history(message)
+
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True
+            )
+        except Exception:
+            self.history.pop()
+            raise
+
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # 调用方提前停止时及时释放连接
+            await stream.close()
+            # 中途中断时保留已收到的部分回复，没有收到任何内容则撤回本轮消息
+            if parts:
+                reply = "".join(parts)
+                self.history.append("assistant", reply)
+                prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+                self.history.record_turn(prompt_tokens, estimate_tokens(reply))
+                # 流式响应不带 usage，使用估算值
+                record_usage(self, prompt_tokens, estimate_tokens(reply))
+            else:
+                self.history.pop()
+
+    async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+        """生成图片，保留历史记录（OpenAI 文本模型不支持）"""
+        raise NotImplementedError("OpenAI 客户端暂不支持图片生成，请使用 gemini")
+
     def reset_chat(self):
         """重置对话历史"""
-        self.history = []
+        self.history.clear()
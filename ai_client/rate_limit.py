@@ -0,0 +1,293 @@
+"""AI 请求限流与重试 - 按 provider/model 的令牌桶 + 自适应并发 + 指数退避重试
+
+    令牌桶: 限制请求速率（rpm），允许 burst 个请求的突发
+    自适应并发: 正常时逐步放宽并发上限，遇到限流（429、配额、Gemini 网页版限流）时减半（AIMD）
+    重试: 429 / 5xx / 超时 / 连接错误自动重试，优先使用 Retry-After，否则带抖动的指数退避；
+          收到 Retry-After 时同一 provider/model 的所有请求一起暂停
+
+默认配置见 DEFAULT_POLICIES，可用 AI_RATE_LIMITS 覆盖（JSON，键为 "类名" 或 "类名:模型"）:
+    AI_RATE_LIMITS={"OpenAIClient:gpt-4o": {"rpm": 60, "max_concurrency": 4}}
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable
+from util.console import console
+from util.metrics import span, inc
+from .base import AIClient, DelegatingClient
+from .cache import client_identity
+
+MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", 4))
+RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", 1))
+RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", 60))
+
+# rpm: 每分钟请求数；burst: 令牌桶容量；max_concurrency/min_concurrency: 自适应并发的上下限
+DEFAULT_POLICIES = {
+    "OpenAIClient": {"rpm": 500, "burst": 20, "max_concurrency": 16, "min_concurrency": 1},
+    "GeminiWebClient": {"rpm": 20, "burst": 3, "max_concurrency": 3, "min_concurrency": 1},
+}
+FALLBACK_POLICY = {"rpm": 60, "burst": 5, "max_concurrency": 4, "min_concurrency": 1}
+
+# gemini_webapi 等不带状态码的异常，按类名判断
+_THROTTLE_NAMES = ("ratelimit", "usagelimit", "temporarilyblocked", "toomanyrequests")
+_TRANSIENT_NAMES = ("timeout", "connect", "apierror", "remoteprotocol", "readerror", "serviceunavailable")
+
+
+def _load_overrides() -> dict:
+    raw = os.getenv("AI_RATE_LIMITS", "").strip()
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        console.print("[yellow]⚠️ AI_RATE_LIMITS 不是有效的 JSON，已忽略[/yellow]")
+        return {}
+
+
+# 首次使用时读取（而不是导入时），调用方可以在导入后、发出请求前设置 AI_RATE_LIMITS
+_overrides: dict | None = None
+
+
+def _get_overrides() -> dict:
+    global _overrides
+    if _overrides is None:
+        _overrides = _load_overrides()
+    return _overrides
+
+
+def get_policy(provider: str, model: str) -> dict:
+    """provider/model 的限流配置：默认值 < 类名覆盖 < 类名:模型覆盖"""
+    overrides = _get_overrides()
+    return {
+        **FALLBACK_POLICY,
+        **DEFAULT_POLICIES.get(provider, {}),
+        **overrides.get(provider, {}),
+        **overrides.get(f"{provider}:{model}", {}),
+    }
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """从异常携带的响应头中读取 Retry-After（秒）"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def classify(exc: BaseException) -> tuple[bool, bool, float | None]:
+    """判断异常类型，返回 (是否可重试, 是否为限流, Retry-After 秒数)"""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429:
+        return True, True, _retry_after(exc)
+    if isinstance(status, int):
+        # 408/409 与 5xx 为临时错误，其余 4xx（参数、鉴权）重试也没用
+        return status in (408, 409) or status >= 500, False, _retry_after(exc)
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True, False, None
+    name = type(exc).__name__.lower()
+    if any(key in name for key in _THROTTLE_NAMES):
+        return True, True, None
+    if any(key in name for key in _TRANSIENT_NAMES):
+        return True, False, None
+    return False, False, None
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """带抖动的指数退避（full jitter）"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """令牌桶，支持整体暂停（收到 Retry-After 时）"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """自适应并发上限（AIMD）：每成功 limit 次加 1，遇到限流减半"""
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False, succeeded: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                new_limit = max(self.min_concurrency, self.limit // 2)
+                if new_limit < self.limit:
+                    console.print(f"[dim]🐢 检测到限流，并发上限 {self.limit} → {new_limit}[/dim]")
+                self.limit = new_limit
+                self._successes = 0
+            elif succeeded and self.limit < self.max_concurrency:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class _Limits:
+    """同一 provider/model 共享的令牌桶和并发上限"""
+
+    def __init__(self, policy: dict):
+        self.bucket = TokenBucket(policy["rpm"] / 60, policy["burst"])
+        self.concurrency = AdaptiveLimiter(policy["max_concurrency"], policy["min_concurrency"])
+
+
+# asyncio 同步原语不能跨事件循环使用，每个事件循环一组（后台任务线程有自己的事件循环）
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, _Limits]]" = weakref.WeakKeyDictionary()
+
+
+def _get_limits(provider: str, model: str) -> _Limits:
+    per_loop = _limits.setdefault(asyncio.get_running_loop(), {})
+    key = f"{provider}:{model}"
+    if key not in per_loop:
+        per_loop[key] = _Limits(get_policy(provider, model))
+    return per_loop[key]
+
+
+class RateLimitedClient(DelegatingClient):
+    """为任意 AIClient 加限流和重试
+
+    使用方法:
+        client = RateLimitedClient(create_client())
+        await client.chat("...")   # 429/5xx 自动退避重试
+        print(client.stats_text())
+    """
+
+    def __init__(self, inner: AIClient, max_retries: int = MAX_RETRIES):
+        super().__init__(inner)
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    def _limits(self) -> _Limits:
+        return _get_limits(*client_identity(self.inner))
+
+    async def _call(self, name: str, func: Callable[[], Awaitable]):
+        limits = self._limits()
+        provider, model = client_identity(self.inner)
+        with span("ai", provider=provider, method=name) as call_span:
+            for attempt in range(self.max_retries + 1):
+                await limits.bucket.acquire()
+                await limits.concurrency.acquire()
+                self.stats["requests"] += 1
+                call_span.set(model=model, attempts=attempt + 1)
+                try:
+                    result = await func()
+                    await limits.concurrency.release(succeeded=True)
+                    return result
+                except asyncio.CancelledError:
+                    await limits.concurrency.release()
+                    raise
+                except Exception as e:
+                    retryable, throttled, retry_after = classify(e)
+                    await limits.concurrency.release(throttled=throttled)
+                    if throttled:
+                        self.stats["throttled"] += 1
+                        inc("ai_throttled_total", provider=provider)
+                    if not retryable or attempt >= self.max_retries:
+                        self.stats["failed"] += 1
+                        raise
+                    delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                    if retry_after is not None:
+                        # 服务端明确要求等待，同一 provider/model 的其他请求也一起暂停
+                        limits.bucket.pause(retry_after)
+                    self.stats["retries"] += 1
+                    inc("ai_retries_total", provider=provider, method=name)
+                    console.print(f"[dim]🔁 {name} 失败（{type(e).__name__}），{delay:.1f}s 后第 {attempt + 1} 次重试[/dim]")
+                    await asyncio.sleep(delay)
+
+    async def chat(self, message: str) -> str:
+        return await self._call("chat", lambda: self.inner.chat(message))
+
+    async def chat_history(self, message: str) -> str:
+        return await self._call("chat_history", lambda: self.inner.chat_history(message))
+
+    async def stream_chat_history(self, message: str) -> AsyncIterator[str]:
+        """流式对话：只限流和重试到收到第一段内容为止，之后的错误直接抛出"""
+        stream = None
+
+        async def start():
+            nonlocal stream
+            stream = self.inner.stream_chat_history(message)
+            try:
+                return await stream.__anext__()
+            except StopAsyncIteration:
+                return None
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        first = await self._call("stream_chat_history", start)
+        try:
+            if first is None:
+                return
+            yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+
+    async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+        return await self._call("image_history", lambda: self.inner.image_history(message, file_path, file_name))
+
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        return await self._call("generate_image", lambda: self.inner.generate_image(message, file_path, file_name))
+
+    def stats_text(self) -> str:
+        limits = self._limits()
+        return (f"AI 请求 {self.stats['requests']} 次，重试 {self.stats['retries']}，限流 {self.stats['throttled']}，"
+                f"失败 {self.stats['failed']}，当前并发上限 {limits.concurrency.limit}")
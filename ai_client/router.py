@@ -0,0 +1,301 @@
+"""多提供商路由 - 按健康状况选择后端，出错自动切换，可选对冲请求
+
+    路由: 按配置顺序选择第一个健康的后端；连续失败的后端熔断一段时间（指数增长），期间跳过
+    切换: 请求出错或超时时换下一个后端重试；文本请求的超时按该后端的 p95 延迟计算
+          （AI_ROUTE_TIMEOUT_FACTOR 倍，不低于 AI_ROUTE_MIN_TIMEOUT，不高于 AI_ROUTE_TIMEOUT），
+          流式对话的每一段之间也使用同样的超时
+    对冲（可选，AI_HEDGE=true）: 单次对话（chat）在当前后端超过其 p95 延迟仍未返回时，向下一个后端再发一次，先返回的为准
+
+多轮对话固定在同一个后端上；切换后端时把最近几轮对话记录附在消息前面，新后端可以接着回答。
+
+配置: AI_PROVIDER=gemini,openai（逗号分隔，靠前的优先）
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable
+from util.console import console
+from util.metrics import inc
+from .base import AIClient
+from .cache import client_identity
+
+# 单次请求超时上限（秒），延迟样本不足时和图片生成使用该值
+ROUTE_TIMEOUT = float(os.getenv("AI_ROUTE_TIMEOUT", 180))
+# 文本请求的超时：p95 延迟的倍数，以及下限（秒）
+ROUTE_TIMEOUT_FACTOR = float(os.getenv("AI_ROUTE_TIMEOUT_FACTOR", 3))
+ROUTE_MIN_TIMEOUT = float(os.getenv("AI_ROUTE_MIN_TIMEOUT", 30))
+# 对冲会向第二个提供商重复发送请求（产生额外费用），默认关闭
+HEDGE_ENABLED = os.getenv("AI_HEDGE", "false").lower() in ("1", "true", "yes")
+# 延迟样本不足时的对冲等待时间（秒）
+HEDGE_DEFAULT_DELAY = float(os.getenv("AI_HEDGE_DELAY", 20))
+HEDGE_MIN_SAMPLES = 20
+# 连续失败多少次后熔断，以及熔断时长（秒，按次数翻倍，不超过上限）
+FAILURE_THRESHOLD = int(os.getenv("AI_ROUTE_FAILURES", 3))
+COOLDOWN_BASE = float(os.getenv("AI_ROUTE_COOLDOWN", 30))
+COOLDOWN_MAX = 600
+# 切换后端时附带的最近对话轮数和每条的最大长度
+REPLAY_TURNS = 6
+REPLAY_MAX_CHARS = 2000
+
+
+class BackendHealth:
+    """单个后端的健康状况：延迟样本（按文本、流式首段、图片分开统计）、连续失败次数、熔断截止时间"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: dict[str, deque[float]] = {kind: deque(maxlen=200) for kind in ("text", "stream", "image")}
+        self.failures = 0
+        self.open_until = 0.0
+        self.successes = 0
+        self.errors = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def p95(self, kind: str = "text") -> float | None:
+        latencies = self.latencies[kind]
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def timeout(self, kind: str = "text") -> float:
+        """单次请求（或流式对话的每一段）的超时：文本请求按 p95 延迟计算，样本不足时使用上限"""
+        p95 = self.p95(kind) if kind != "image" else None
+        if p95 is None:
+            return ROUTE_TIMEOUT
+        return min(ROUTE_TIMEOUT, max(ROUTE_MIN_TIMEOUT, p95 * ROUTE_TIMEOUT_FACTOR))
+
+    def record_success(self, seconds: float, kind: str = "text"):
+        self.latencies[kind].append(seconds)
+        self.failures = 0
+        self.open_until = 0.0
+        self.successes += 1
+
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        self.errors += 1
+        if self.failures >= FAILURE_THRESHOLD:
+            cooldown = min(COOLDOWN_MAX, COOLDOWN_BASE * 2 ** (self.failures - FAILURE_THRESHOLD))
+            self.open_until = time.monotonic() + cooldown
+            console.print(f"[dim]⛔ {self.name} 连续失败 {self.failures} 次，{cooldown:.0f}s 内不再使用（{type(error).__name__}）[/dim]")
+
+
+def backend_name(client: AIClient) -> str:
+    provider, model = client_identity(client)
+    return f"{provider}:{model}" if model else provider
+
+
+class RoutingClient(AIClient):
+    """在多个 AIClient 之间路由
+
+    使用方法:
+        client = RoutingClient([gemini_client, openai_client])
+        await client.chat("...")   # gemini 慢或出错时自动用 openai
+        print(client.stats_text())
+    """
+
+    def __init__(self, backends: list[AIClient], hedge: bool = HEDGE_ENABLED, timeout: float = ROUTE_TIMEOUT):
+        if not backends:
+            raise ValueError("RoutingClient 至少需要一个后端")
+        self.backends = backends
+        self.health = [BackendHealth(backend_name(backend)) for backend in backends]
+        self.hedge = hedge
+        self.timeout = timeout
+        self.model = "+".join(health.name for health in self.health)
+        # 多轮对话当前使用的后端和对话记录（用于切换后端时补充上下文）
+        self.active: int | None = None
+        self.transcript: list[tuple[str, str]] = []
+        self.hedges = 0
+
+    def __getattr__(self, name):
+        # 其余属性透传给首选后端
+        if name == "backends":
+            raise AttributeError(name)
+        return getattr(self.backends[0], name)
+
+    def _order(self, preferred: int = None) -> list[int]:
+        """可用后端的尝试顺序：指定的后端优先，其次按配置顺序；全部熔断时按恢复时间排序"""
+        indexes = list(range(len(self.backends)))
+        if preferred is not None:
+            indexes.remove(preferred)
+            indexes.insert(0, preferred)
+        available = [i for i in indexes if self.health[i].available]
+        return available or sorted(indexes, key=lambda i: self.health[i].open_until)
+
+    def _timeout(self, index: int, kind: str = "text") -> float:
+        return min(self.timeout, self.health[index].timeout(kind))
+
+    async def _attempt(self, index: int, func: Callable[[AIClient], Awaitable], kind: str = "text"):
+        """在单个后端上执行并记录健康状况"""
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(self.backends[index]), self._timeout(index, kind))
+        except NotImplementedError:
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.health[index].record_failure(e)
+            raise
+        self.health[index].record_success(time.monotonic() - start, kind)
+        return result
+
+    async def _route(self, name: str, func: Callable[[AIClient], Awaitable], preferred: int = None, kind: str = "text"):
+        """按顺序尝试各后端，返回 (后端序号, 结果)"""
+        error = None
+        for index in self._order(preferred):
+            try:
+                return index, await self._attempt(index, func, kind)
+            except NotImplementedError as e:
+                error = error or e
+            except Exception as e:
+                error = e
+                inc("ai_fallbacks_total", backend=self.health[index].name, method=name)
+                console.print(f"[dim]↪️ {self.health[index].name} {name} 失败（{type(e).__name__}: {e}），尝试下一个后端[/dim]")
+        raise error
+
+    async def _hedged(self, func: Callable[[AIClient], Awaitable]):
+        """对冲请求：首选后端超过 p95 延迟未返回时，再向下一个后端发送，先成功的为准"""
+        order = self._order()
+        if len(order) < 2:
+            return await self._attempt(order[0], func)
+
+        primary, backup = order[0], order[1]
+        delay = self.health[primary].p95() or HEDGE_DEFAULT_DELAY
+        tasks = {asyncio.create_task(self._attempt(primary, func)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                inc("ai_hedges_total", backend=self.health[backup].name)
+                console.print(f"[dim]⏱️ {self.health[primary].name} 超过 {delay:.1f}s 未返回，同时请求 {self.health[backup].name}[/dim]")
+                tasks[asyncio.create_task(self._attempt(backup, func))] = backup
+
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                # 首选后端在对冲前就失败了，直接切换到下一个
+                if not pending and backup not in tasks.values():
+                    tasks[asyncio.create_task(self._attempt(backup, func))] = backup
+                    pending = {task for task, index in tasks.items() if index == backup}
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def chat(self, message: str) -> str:
+        """单次对话：可对冲，出错自动切换后端"""
+        if self.hedge:
+            try:
+                return await self._hedged(lambda client: client.chat(message))
+            except Exception:
+                # 两个后端都失败时，再按顺序尝试其余后端
+                if len(self.backends) <= 2:
+                    raise
+        return (await self._route("chat", lambda client: client.chat(message)))[1]
+
+    def _with_context(self, index: int, message: str) -> str:
+        """切换到新后端时，把最近的对话记录附在消息前面"""
+        if index == self.active or not self.transcript:
+            return message
+        lines = []
+        for role, text in self.transcript[-REPLAY_TURNS * 2:]:
+            lines.append(f"{role}：{text[:REPLAY_MAX_CHARS]}")
+        history = "\n\n".join(lines)
+        return f"以下是我们之前的对话记录：\n\n{history}\n\n请在此基础上继续，回答下面的消息：\n\n{message}"
+
+    def _remember(self, index: int, message: str, reply: str):
+        self.active = index
+        self.transcript.append(("用户", message))
+        self.transcript.append(("助手", reply))
+
+    async def chat_history(self, message: str) -> str:
+        """多轮对话：固定在当前后端，出错时切换并补充上下文"""
+        index, reply = await self._route(
+            "chat_history",
+            lambda client: client.chat_history(self._with_context(self.backends.index(client), message)),
+            self.active
+        )
+        self._remember(index, message, reply)
+        return reply
+
+    async def stream_chat_history(self, message: str) -> AsyncIterator[str]:
+        """流式多轮对话：收到第一段内容之前出错时切换后端"""
+        error = None
+        for index in self._order(self.active):
+            stream = self.backends[index].stream_chat_history(self._with_context(index, message))
+            timeout = self._timeout(index, "stream")
+            start = time.monotonic()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), timeout)
+            except StopAsyncIteration:
+                first = ""
+            except NotImplementedError as e:
+                await stream.aclose()
+                error = error or e
+                continue
+            except Exception as e:
+                await stream.aclose()
+                self.health[index].record_failure(e)
+                error = e
+                inc("ai_fallbacks_total", backend=self.health[index].name, method="stream_chat_history")
+                console.print(f"[dim]↪️ {self.health[index].name} 流式对话失败（{type(e).__name__}: {e}），尝试下一个后端[/dim]")
+                continue
+
+            self.health[index].record_success(time.monotonic() - start, "stream")
+            parts = [first]
+            try:
+                if first:
+                    yield first
+                # 已经输出了部分内容，中途卡住时不再切换后端，超时后直接抛出
+                while True:
+                    try:
+                        delta = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError as e:
+                        self.health[index].record_failure(e)
+                        raise TimeoutError(f"{self.health[index].name} 流式对话超过 {timeout:.0f}s 没有新内容") from e
+                    parts.append(delta)
+                    yield delta
+            finally:
+                await stream.aclose()
+                self._remember(index, message, "".join(parts))
+            return
+        raise error
+
+    async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+        index, reply = await self._route(
+            "image_history", lambda client: client.image_history(message, file_path, file_name), self.active, "image"
+        )
+        self.active = index
+        return reply
+
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        """无状态图片生成：跳过不支持的后端，出错自动切换"""
+        return (await self._route("generate_image", lambda client: client.generate_image(message, file_path, file_name), kind="image"))[1]
+
+    def reset_chat(self):
+        for backend in self.backends:
+            backend.reset_chat()
+        self.active = None
+        self.transcript = []
+
+    def stats_text(self) -> str:
+        parts = []
+        for health in self.health:
+            p95 = health.p95()
+            state = "可用" if health.available else "熔断中"
+            parts.append(f"{health.name} {state} 成功 {health.successes} 失败 {health.errors}"
+                         + (f" p95 {p95:.1f}s" if p95 else ""))
+        return f"AI 路由: {'；'.join(parts)}；对冲 {self.hedges} 次"
@@ -0,0 +1,49 @@
+"""批量流水线入口（无交互）
+
+用法:
+    python batch.py jobs.jsonl
+    python batch.py jobs.jsonl --images 3 --publish 1 --report output/batch_report.json
+
+任务文件格式见 service/batch.py
+"""
+
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# 先加载 .env，service 模块在导入时读取环境变量
+load_dotenv()
+
+from util.browser_pool import close_browser_pool
+from util.http_client import close_http_client
+from util.image_optimizer import close_image_pool
+from util.redis_client import close_async_redis
+from util.background import shutdown_background_worker
+from util.metrics import flush_metrics
+from service.batch import STAGES, DEFAULT_LIMITS, load_jobs, run_batch
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="批量执行 内容 → 图片 → 上传 → 发布")
+    parser.add_argument("jobs", help="JSONL 任务文件，每行一个任务")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}", type=int, default=DEFAULT_LIMITS[stage], help=f"{stage} 阶段并发数")
+    parser.add_argument("--report", default=f"output/batch_report_{time.strftime('%Y%m%d%H%M%S')}.json", help="汇总报告保存路径")
+    args = parser.parse_args()
+    
+    jobs = load_jobs(args.jobs)
+    limits = {stage: getattr(args, stage) for stage in STAGES}
+    try:
+        await run_batch(jobs, limits, args.report)
+    finally:
+        await close_browser_pool()
+        await close_http_client()
+        close_image_pool()
+        await close_async_redis()
+        await asyncio.to_thread(shutdown_background_worker)
+        flush_metrics()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
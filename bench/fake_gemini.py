@@ -0,0 +1,90 @@
+"""Gemini 网页版替身 - 进程内的 AIClient 实现，用于离线基准测试
+
+gemini_webapi 通过 Cookie 访问 gemini.google.com，无法简单地用本地 HTTP 服务替代，
+所以在 AIClient 这一层替换：按配置的延迟返回文本，生成图片时写出一张 3:4 的 PNG。
+装有 Pillow 时生成带噪点的 1080x1440 图片（接近真实图片的压缩难度），否则写出纯色小图。
+"""
+
+import os
+import time
+import zlib
+import random
+import struct
+import asyncio
+from ai_client.base import AIClient
+
+IMAGE_SIZE = (1080, 1440)
+
+
+def _solid_png(width: int, height: int, color: tuple[int, int, int]) -> bytes:
+    """只用标准库生成纯色 PNG"""
+    row = b"\x00" + bytes(color) * width
+    raw = zlib.compress(row * height, 6)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+def _write_image(path: str, seed: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = random.Random(seed)
+    color = tuple(rng.randrange(256) for _ in range(3))
+    try:
+        from PIL import Image
+    except ImportError:
+        with open(path, "wb") as f:
+            f.write(_solid_png(270, 360, color))
+        return
+    # 低分辨率噪点放大，文件大小接近真实生成图（数 MB）
+    noise = Image.frombytes("RGB", (IMAGE_SIZE[0] // 8, IMAGE_SIZE[1] // 8), rng.randbytes(IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3 // 64))
+    image = Image.blend(Image.new("RGB", IMAGE_SIZE, color), noise.resize(IMAGE_SIZE), 0.5)
+    image.save(path, "PNG")
+
+
+class FakeGeminiClient(AIClient):
+    """模拟 GeminiWebClient 的延迟和失败
+
+    参数:
+        chat_latency: 文本回复延迟（秒）
+        image_latency: 单张图片生成延迟（秒）
+        jitter: 延迟的对数正态抖动
+        failure_rate: 图片生成返回空结果的概率
+    """
+
+    def __init__(self, chat_latency: float = 1.0, image_latency: float = 5.0, jitter: float = 0.3, failure_rate: float = 0.0):
+        self.model = "fake-gemini"
+        self.chat_latency = chat_latency
+        self.image_latency = image_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.turns = 0
+
+    async def _delay(self, base: float):
+        if base > 0:
+            await asyncio.sleep(base * random.lognormvariate(0, self.jitter) if self.jitter > 0 else base)
+
+    async def chat(self, message: str) -> str:
+        await self._delay(self.chat_latency)
+        return f"基准测试回复 {time.monotonic():.3f}"
+
+    async def chat_history(self, message: str) -> str:
+        self.turns += 1
+        return await self.chat(message)
+
+    async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+        await self.generate_image(message, file_path, file_name)
+        return ""
+
+    async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+        await self._delay(self.image_latency)
+        if random.random() < self.failure_rate:
+            return False
+        path = os.path.join(file_path, f"{file_name}.png")
+        await asyncio.to_thread(_write_image, path, hash((file_path, file_name)))
+        return True
+
+    def reset_chat(self):
+        self.turns = 0
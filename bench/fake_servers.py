@@ -0,0 +1,285 @@
+"""本地替身服务 - 只依赖标准库的 HTTP 服务，用于离线基准测试
+
+    FakeOpenAI: OpenAI 兼容的 /v1/chat/completions，支持流式（SSE）、可配置延迟、抖动和错误率
+    FakePicList: PicList 内置 HTTP 服务的 /upload、/delete、/heartbeat
+    FakeMCP: xiaohongshu-mcp 的 /health 和 /api/v1/*
+
+每个服务在独立线程中运行（ThreadingHTTPServer，端口 0 自动分配），请求之间互不阻塞。
+回复内容按提示词生成: 要求整理 JSON 时返回合法的图文 JSON，要求挑选选题时返回一个选题，其余返回一段填充文本。
+
+用法:
+    servers = FakeServers(ServerConfig(llm_latency=0.5)).start()
+    print(servers.openai_url, servers.piclist_url, servers.mcp_url)
+    ...
+    servers.stop()
+"""
+
+import json
+import time
+import random
+import threading
+import itertools
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+FILLER = "这是基准测试生成的填充内容，用于模拟模型回复的长度和分段。" * 8
+
+
+@dataclass
+class ServerConfig:
+    """替身服务的延迟和错误配置，延迟单位为秒"""
+    llm_latency: float = 0.5        # 首个 token 前的延迟（非流式为整体延迟）
+    llm_jitter: float = 0.2         # 延迟的随机抖动比例，按对数正态分布放大，模拟长尾
+    stream_chunks: int = 20         # 流式回复分成的段数
+    chunk_interval: float = 0.02    # 流式分段间隔
+    error_rate: float = 0.0         # 返回 500 的概率
+    throttle_rate: float = 0.0      # 返回 429（带 Retry-After）的概率
+    image_count: int = 4            # 生成的 JSON 中 image_prompt 的数量
+    upload_latency: float = 0.1     # 每次上传请求的固定延迟
+    upload_bandwidth: float = 20.0  # 模拟上传带宽（MB/s），按图片大小增加延迟，0 表示不限
+    publish_latency: float = 0.5
+
+
+def _sleep(base: float, jitter: float):
+    if base <= 0:
+        return
+    time.sleep(base * random.lognormvariate(0, jitter) if jitter > 0 else base)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeService/1.0"
+
+    @property
+    def config(self) -> ServerConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _json(self, data: dict, status: int = 200, headers: dict = None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, key: str):
+        with self.server.lock:
+            self.server.counters[key] = self.server.counters.get(key, 0) + 1
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if not path.endswith("/chat/completions"):
+            self._json({"error": {"message": "not found"}}, 404)
+            return
+        request = self._body()
+        self._count("requests")
+
+        roll = random.random()
+        if roll < self.config.throttle_rate:
+            self._count("throttled")
+            self._json({"error": {"message": "rate limited", "type": "rate_limit"}}, 429, {"Retry-After": "1"})
+            return
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            self._count("errors")
+            self._json({"error": {"message": "internal error", "type": "server_error"}}, 500)
+            return
+
+        messages = request.get("messages") or [{"content": ""}]
+        reply = self.server.reply_for(str(messages[-1].get("content", "")))
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages)
+        _sleep(self.config.llm_latency, self.config.llm_jitter)
+        if request.get("stream"):
+            self._stream(request.get("model", "fake"), reply)
+            return
+        self._json({
+            "id": f"chatcmpl-{next(self.server.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(reply), "total_tokens": prompt_tokens + len(reply)},
+        })
+
+    def _stream(self, model: str, reply: str):
+        """SSE 分段返回（chunked 编码，保持连接复用）"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{next(self.server.ids)}"
+        size = max(1, -(-len(reply) // max(1, self.config.stream_chunks)))
+        pieces = [reply[i:i + size] for i in range(0, len(reply), size)]
+        try:
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(self.config.chunk_interval)
+                self._event({
+                    "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                })
+            self._event({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前停止读取（如增量 JSON 解析完成后）
+            self.close_connection = True
+
+    def _event(self, data: dict):
+        self._write_chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _PicListHandler(_Handler):
+    def do_GET(self):
+        if urlparse(self.path).path == "/heartbeat":
+            self._json({"success": True, "result": "alive"})
+        else:
+            self._json({"success": False, "message": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        request = self._body()
+        if path == "/upload":
+            paths = request.get("list", [])
+            self._count("uploads")
+            total = 0
+            for item in paths:
+                try:
+                    with open(item, "rb") as f:
+                        total += len(f.read())
+                except OSError:
+                    pass
+            delay = self.config.upload_latency
+            if self.config.upload_bandwidth > 0:
+                delay += total / (self.config.upload_bandwidth * 1024 * 1024)
+            time.sleep(delay)
+            with self.server.lock:
+                self.server.counters["bytes"] = self.server.counters.get("bytes", 0) + total
+            urls = [f"https://img.bench.local/{next(self.server.ids)}.jpg" for _ in paths]
+            self._json({"success": True, "result": urls, "fullResult": [{"imgUrl": url} for url in urls]})
+        elif path == "/delete":
+            self._count("deletes")
+            self._json({"success": True})
+        else:
+            self._json({"success": False, "message": "not found"}, 404)
+
+
+class _MCPHandler(_Handler):
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._json({"success": True, "data": {"status": "healthy"}})
+        elif path == "/api/v1/login/status":
+            self._json({"success": True, "data": {"is_logged_in": True, "username": "bench"}})
+        elif path.startswith("/api/v1/"):
+            self._json({"success": True, "data": {}})
+        else:
+            self._json({"success": False, "message": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        request = self._body()
+        if path == "/api/v1/publish":
+            self._count("publishes")
+            time.sleep(self.config.publish_latency)
+            self._json({"success": True, "data": {"title": request.get("title", ""), "post_id": str(next(self.server.ids))}})
+        elif path.startswith("/api/v1/"):
+            self._json({"success": True, "data": {"feeds": []}})
+        else:
+            self._json({"success": False, "message": "not found"}, 404)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, handler, config: ServerConfig):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.config = config
+        self.counters: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def reply_for(self, prompt: str) -> str:
+        """按提示词返回模拟回复"""
+        if "json" in prompt.lower():
+            serial = next(self.ids)
+            return "```json\n" + json.dumps({
+                "title": f"基准测试标题 {serial}",
+                "tags": ["基准测试", "离线", "性能"],
+                "image_prompt": [f"第 {i} 张图片的描述" for i in range(1, self.config.image_count + 1)],
+                "content": FILLER[:120],
+            }, ensure_ascii=False, indent=2) + "\n```"
+        if "选出" in prompt or "换一个" in prompt:
+            return f"基准测试选题 {next(self.ids)}"
+        return FILLER
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeServers:
+    """同时启动 OpenAI、PicList、MCP 三个替身服务"""
+
+    def __init__(self, config: ServerConfig = None):
+        self.config = config or ServerConfig()
+        self.openai = _Server(_OpenAIHandler, self.config)
+        self.piclist = _Server(_PicListHandler, self.config)
+        self.mcp = _Server(_MCPHandler, self.config)
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def openai_url(self) -> str:
+        return f"{self.openai.url}/v1"
+
+    @property
+    def piclist_url(self) -> str:
+        return self.piclist.url
+
+    @property
+    def mcp_url(self) -> str:
+        return self.mcp.url
+
+    def start(self) -> "FakeServers":
+        for server in (self.openai, self.piclist, self.mcp):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in (self.openai, self.piclist, self.mcp):
+            server.shutdown()
+            server.server_close()
+
+    def counters(self) -> dict[str, dict[str, int]]:
+        return {
+            "openai": dict(self.openai.counters),
+            "piclist": dict(self.piclist.counters),
+            "mcp": dict(self.mcp.counters),
+        }
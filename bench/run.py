@@ -0,0 +1,286 @@
+"""离线基准测试入口 - 用本地替身服务跑完整流水线，输出吞吐和各阶段 p50/p95/p99
+
+用法（在项目根目录执行，不读取 .env，不访问外网）:
+    python -m bench.run pipeline --posts 20                      # 内容 → 图片 → 上传 → 发布（MCP）
+    python -m bench.run pipeline --posts 20 --image-count 6 --images 3 --llm-latency 1.5
+    python -m bench.run chat --requests 200 --concurrency 32     # AI 客户端层（限流、连接池）
+    python -m bench.run chat --requests 200 --distinct 20 --cache # 重复提示词，测缓存命中
+    python -m bench.run chat --stream --requests 50              # 流式对话的首段延迟和总耗时
+    python -m bench.run upload --posts 10                        # 图片优化 + 上传 + 上传缓存
+
+替身服务见 bench/fake_servers.py（OpenAI、PicList、MCP）和 bench/fake_gemini.py（Gemini 网页版）。
+文本请求走 OpenAI 替身服务，图片生成走 Gemini 替身；Gemini 替身使用与 GeminiWebClient 相同的默认限流配置
+（rpm 20，突发 3），可用 AI_RATE_LIMITS={"FakeGeminiClient": {...}} 调整。各阶段耗时来自 util/metrics.py 的 span。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from bench.fake_servers import FakeServers, ServerConfig
+
+STAGES = ("content", "images", "upload", "publish")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="离线基准测试")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    def add_common(sub):
+        sub.add_argument("--llm-latency", type=float, default=0.5, help="OpenAI 替身首个 token 前的延迟（秒）")
+        sub.add_argument("--llm-jitter", type=float, default=0.2, help="延迟的对数正态抖动")
+        sub.add_argument("--stream-chunks", type=int, default=20, help="流式回复的分段数")
+        sub.add_argument("--chunk-interval", type=float, default=0.02, help="流式分段间隔（秒）")
+        sub.add_argument("--error-rate", type=float, default=0.0, help="OpenAI 替身返回 500 的概率")
+        sub.add_argument("--throttle-rate", type=float, default=0.0, help="OpenAI 替身返回 429 的概率")
+        sub.add_argument("--upload-latency", type=float, default=0.1, help="PicList 替身每次上传的延迟（秒）")
+        sub.add_argument("--upload-bandwidth", type=float, default=20.0, help="PicList 替身的上传带宽（MB/s），0 为不限")
+        sub.add_argument("--publish-latency", type=float, default=0.5, help="MCP 替身发布延迟（秒）")
+        sub.add_argument("--image-latency", type=float, default=3.0, help="Gemini 替身单张图片延迟（秒）")
+        sub.add_argument("--image-failure-rate", type=float, default=0.0, help="Gemini 替身图片生成失败的概率")
+        sub.add_argument("--image-count", type=int, default=4, help="每篇内容的图片数")
+        sub.add_argument("--cache", action="store_true", help="启用 AI 响应缓存（AI_CACHE）")
+        sub.add_argument("--no-rate-limit", action="store_true", help="关闭 AI 限流与重试（AI_RATE_LIMIT=false）")
+        sub.add_argument("--trace", help="把 span 和计数写入该 JSON lines 文件（METRICS_JSONL）")
+        sub.add_argument("--report", help="基准报告 JSON 的保存路径")
+        sub.add_argument("--keep", action="store_true", help="保留临时工作目录")
+
+    pipeline = subparsers.add_parser("pipeline", help="完整流水线")
+    add_common(pipeline)
+    pipeline.add_argument("--posts", type=int, default=10, help="内容篇数")
+    for stage in STAGES:
+        pipeline.add_argument(f"--{stage}", type=int, help=f"{stage} 阶段并发数，默认同 batch.py")
+
+    chat = subparsers.add_parser("chat", help="AI 客户端层")
+    add_common(chat)
+    chat.add_argument("--requests", type=int, default=100, help="请求数")
+    chat.add_argument("--concurrency", type=int, default=16, help="并发数")
+    chat.add_argument("--distinct", type=int, default=0, help="不同提示词的数量，0 表示全部不同")
+    chat.add_argument("--stream", action="store_true", help="使用流式多轮对话（每个请求独立会话）")
+
+    upload = subparsers.add_parser("upload", help="图片优化 + 上传")
+    add_common(upload)
+    upload.add_argument("--posts", type=int, default=10, help="上传次数（同一组图片，第二次起命中上传缓存）")
+    return parser.parse_args()
+
+
+def configure_env(args, servers: FakeServers, workdir: str):
+    """把替身服务地址和临时目录写入环境变量，必须在导入项目模块之前调用（模块在导入时读取配置）"""
+    os.environ.update({
+        "AI_PROVIDER": "openai",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": servers.openai_url,
+        "OPENAI_MODEL": "fake-gpt",
+        "AI_CACHE": "true" if args.cache else "false",
+        "AI_CACHE_FILE": os.path.join(workdir, "ai_cache.db"),
+        "AI_CACHE_REDIS": "false",
+        "AI_RATE_LIMIT": "false" if args.no_rate_limit else "true",
+        "PICLIST_URL": servers.piclist_url,
+        "PICLIST_KEY": "",
+        "PICLIST_CACHE_FILE": os.path.join(workdir, "upload_cache.db"),
+        "XHS_MCP_URL": servers.mcp_url,
+        "SUBJECT_DB_FILE": os.path.join(workdir, "subjects.db"),
+        "SUBJECT_INDEX_FILE": os.path.join(workdir, "subject_index.json"),
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "image_cache"),
+        "METRICS": "true",
+        "METRICS_JSONL": os.path.abspath(args.trace) if args.trace else "",
+        "METRICS_PROM_FILE": "",
+        # 替身服务在本机，不能走代理
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+    })
+
+
+def make_client_factory(args):
+    """文本走 create_client()（OpenAI 替身服务），图片走 Gemini 替身"""
+    from ai_client import create_client, RateLimitedClient
+    from ai_client.base import DelegatingClient
+    from ai_client.rate_limit import DEFAULT_POLICIES
+    from bench.fake_gemini import FakeGeminiClient
+
+    # 限流按类名取配置，替身默认套用 GeminiWebClient 的配置，图片耗时才和真实服务可比；AI_RATE_LIMITS 中已有的配置优先
+    overrides = json.loads(os.getenv("AI_RATE_LIMITS") or "{}")
+    overrides.setdefault("FakeGeminiClient", DEFAULT_POLICIES["GeminiWebClient"])
+    os.environ["AI_RATE_LIMITS"] = json.dumps(overrides)
+
+    class BenchClient(DelegatingClient):
+        def __init__(self):
+            super().__init__(create_client())
+            image_client = FakeGeminiClient(image_latency=args.image_latency, failure_rate=args.image_failure_rate)
+            self.image_client = image_client if args.no_rate_limit else RateLimitedClient(image_client)
+
+        async def image_history(self, message: str, file_path: str, file_name: str) -> str:
+            return await self.image_client.image_history(message, file_path, file_name)
+
+        async def generate_image(self, message: str, file_path: str, file_name: str) -> bool:
+            return await self.image_client.generate_image(message, file_path, file_name)
+
+    return BenchClient
+
+
+def stage_percentiles(snapshot: dict) -> dict:
+    """各 span 的次数和分位数（只统计成功的）"""
+    result = {}
+    for histogram in snapshot["histograms"]:
+        labels = dict(histogram["labels"])
+        if histogram["name"] != "span_seconds" or labels.pop("status") != "ok":
+            continue
+        name = labels.pop("span")
+        key = f"{name} ({', '.join(f'{k}={v}' for k, v in sorted(labels.items()))})" if labels else name
+        result[key] = {q: histogram[q] for q in ("count", "sum", "p50", "p95", "p99")}
+    return result
+
+
+async def run_pipeline(args, workdir: str) -> dict:
+    from service.batch import DEFAULT_LIMITS, run_batch
+
+    jobs = [
+        {"id": f"bench-{i}", "requirement": "2", "file_path": os.path.join(workdir, "output", f"bench-{i}"), "platforms": ["xhs_mcp"]}
+        for i in range(1, args.posts + 1)
+    ]
+    limits = {stage: getattr(args, stage) or DEFAULT_LIMITS[stage] for stage in STAGES}
+    start = time.perf_counter()
+    reports = await run_batch(jobs, limits, client_factory=make_client_factory(args))
+    elapsed = time.perf_counter() - start
+    succeeded = sum(1 for report in reports if report["status"] == "success")
+    return {
+        "posts": args.posts, "succeeded": succeeded, "limits": limits, "elapsed": round(elapsed, 2),
+        "throughput_per_hour": round(succeeded / elapsed * 3600, 1),
+    }
+
+
+async def run_chat(args, workdir: str) -> dict:
+    from ai_client import create_client
+    from util.metrics import percentile
+
+    shared = create_client()
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    latencies, first_chunk, failed = [], [], 0
+
+    async def one(i: int):
+        nonlocal failed
+        prompt = f"基准测试问题 {i % args.distinct if args.distinct else i}"
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if args.stream:
+                    first = None
+                    async for _ in create_client().stream_chat_history(prompt):
+                        if first is None:
+                            first = time.perf_counter() - start
+                    first_chunk.append(first or 0.0)
+                else:
+                    await shared.chat(prompt)
+            except Exception:
+                failed += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(args.requests)])
+    elapsed = time.perf_counter() - start
+    result = {
+        "requests": args.requests, "failed": failed, "concurrency": args.concurrency, "elapsed": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "latency": {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+    }
+    if args.stream:
+        result["first_chunk"] = {f"p{q}": percentile(first_chunk, q) for q in (50, 95, 99)}
+    if hasattr(shared, "stats_text"):
+        print(shared.stats_text())
+    return result
+
+
+async def run_upload(args, workdir: str) -> dict:
+    from service.image import upload_generated_images
+    from bench.fake_gemini import FakeGeminiClient
+    from util.metrics import percentile
+
+    file_path = os.path.join(workdir, "output", "upload")
+    generator = FakeGeminiClient(image_latency=0)
+    for index in range(1, args.image_count + 1):
+        await generator.generate_image("", file_path, index)
+
+    latencies, failed = [], 0
+    start = time.perf_counter()
+    for _ in range(args.posts):
+        round_start = time.perf_counter()
+        if await upload_generated_images({}, file_path):
+            latencies.append(time.perf_counter() - round_start)
+        else:
+            failed += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "rounds": args.posts, "images": args.image_count, "failed": failed, "elapsed": round(elapsed, 2),
+        "first_round": round(latencies[0], 3) if latencies else None,
+        "latency": {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+    }
+
+
+def print_report(result: dict, stages: dict, counters: dict):
+    from rich.table import Table
+    from util.console import console
+
+    table = Table(title="基准测试 - 各 span 耗时（成功）")
+    for column in ("span", "次数", "总耗时", "p50", "p95", "p99"):
+        table.add_column(column, justify="left" if column == "span" else "right")
+    for name, row in sorted(stages.items(), key=lambda item: -item[1]["sum"]):
+        cells = [f"{row[q]:.3f}s" if row[q] is not None else "-" for q in ("p50", "p95", "p99")]
+        table.add_row(name, str(row["count"]), f"{row['sum']:.1f}s", *cells)
+    console.print(table)
+    console.print(f"[bold]结果:[/bold] {json.dumps(result, ensure_ascii=False)}")
+    console.print(f"[dim]替身服务请求数: {json.dumps(counters, ensure_ascii=False)}[/dim]")
+
+
+async def main(args, servers: FakeServers, workdir: str):
+    from util.http_client import close_http_client
+    from util.image_optimizer import close_image_pool
+    from util.background import shutdown_background_worker
+    from util.metrics import get_registry, flush_metrics
+
+    scenarios = {"pipeline": run_pipeline, "chat": run_chat, "upload": run_upload}
+    try:
+        result = await scenarios[args.scenario](args, workdir)
+    finally:
+        await close_http_client()
+        close_image_pool()
+        await asyncio.to_thread(shutdown_background_worker)
+
+    snapshot = get_registry().snapshot()
+    stages = stage_percentiles(snapshot)
+    counters = servers.counters()
+    print_report(result, stages, counters)
+    flush_metrics()
+
+    report_path = args.report or f"output/bench_{args.scenario}_{time.strftime('%Y%m%d%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "scenario": args.scenario, "args": vars(args), "result": result, "spans": stages,
+            "counters": snapshot["counters"], "servers": counters,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"基准报告已保存到 {report_path}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    servers = FakeServers(ServerConfig(
+        llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, stream_chunks=args.stream_chunks,
+        chunk_interval=args.chunk_interval, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        image_count=args.image_count, upload_latency=args.upload_latency, upload_bandwidth=args.upload_bandwidth,
+        publish_latency=args.publish_latency,
+    )).start()
+    workdir = tempfile.mkdtemp(prefix="xhs-bench-")
+    configure_env(args, servers, workdir)
+    try:
+        asyncio.run(main(args, servers, workdir))
+    finally:
+        servers.stop()
+        if args.keep:
+            print(f"工作目录: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
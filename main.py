@@ -1,6 +1,11 @@
+import os
 import asyncio
 import time
 from dotenv import load_dotenv
+
+# 先加载 .env，service 模块在导入时读取环境变量
+load_dotenv()
+
 from ai_client import create_client
 from service.content import topic_discussion, content_creation, generate_json
 from service.image import generate_images, re_generate_images, edit_image
@@ -8,11 +13,16 @@ from service.publish import publish_content as publish_content_mcp  # MCP 版本
 from service.publish_xiaohongshu import publish_content as publish_xiaohongshu  # Playwright 版本
 from service.publish_douyin import publish_content as publish_douyin
 from service.publish_weixin import publish_content as publish_weixin
+from service.publish_all import publish_all, review_drafts
 from util.json_util import save_json, load_json
+from util.browser_pool import close_browser_pool
+from util.http_client import close_http_client
+from util.image_optimizer import close_image_pool
+from util.redis_client import close_async_redis
+from util.background import shutdown_background_worker
+from util.metrics import flush_metrics
 from util.console import console, print_warning, print_info
 
-load_dotenv()
-
 
 async def main():
     client = create_client()
@@ -53,7 +63,7 @@ async def main():
                         case "2":
                             await content_creation(client)
                         case "3":
-                            content_json = await generate_json(client)
+                            content_json = await generate_json(client, os.path.basename(file_path))
                             save_json(content_json, file_path)
                         case "0":
                             break
@@ -105,6 +115,8 @@ async def main():
 [bold cyan]1.[/] 发布小红书
 [bold cyan]2.[/] 发布抖音
 [bold cyan]3.[/] 发布视频号
+[bold cyan]4.[/] 同时发布全部平台
+[bold cyan]5.[/] 审核草稿（无人值守模式填写）
 [bold cyan]0.[/] 返回上级
                     """)
                     command = input("请输入命令: ")
@@ -115,6 +127,10 @@ async def main():
                             await publish_douyin(content_json, file_path, load_json)
                         case "3":
                             await publish_weixin(content_json, file_path, load_json)
+                        case "4":
+                            await publish_all(content_json, file_path, load_json)
+                        case "5":
+                            await review_drafts()
                         case "0":
                             break
                         case _:
@@ -127,6 +143,13 @@ async def main():
                 break
             case _:
                 print_warning("无效命令")
+    
+    await close_browser_pool()
+    await close_http_client()
+    close_image_pool()
+    await close_async_redis()
+    await asyncio.to_thread(shutdown_background_worker)
+    flush_metrics()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from util.txt_util import read_subjects
+from util.subject_index import get_subject_index
 
 def topic_discussion_prompt(command):
     prompt = ""
@@ -23,8 +23,8 @@ def topic_discussion_prompt(command):
         """
         
     
-    # 添加历史选题，避免重复
-    old_subject = read_subjects()
+    # 添加与本次要求最相关的历史选题，避免重复（提示词长度不随历史增长）
+    old_subject = get_subject_index().top_k(prompt)
     if old_subject:
         prompt += f"""以下是之前使用过的选题，以<old_subject包裹>,你确保新生成的选题不要和之前的重复：
         <old_subject>
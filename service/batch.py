@@ -0,0 +1,254 @@
+"""批量流水线服务 - 无交互地批量执行 内容 → 图片 → 上传 → 发布
+
+任务文件为 JSONL，每行一个任务，例如:
+    {"id": "post-1", "requirement": "2"}
+    {"id": "post-2", "requirement": "写一篇投标保证金的科普", "subject": "投标保证金退还指南"}
+    {"id": "post-3", "file_path": "output/20260112083438", "stages": ["upload", "publish"], "platforms": ["xhs_mcp"]}
+
+任务字段:
+    id: 任务标识（可选，默认使用行号）
+    requirement: 选题要求，与选题探讨的输入一致（"1"、"2" 为预设），content 阶段必填
+    subject: 可选，直接指定选题，为空时由 AI 挑选
+    file_path: 可选，输出目录；已有 content.json 时可跳过 content 阶段
+    stages: 可选，要执行的阶段，默认 ["content", "images", "upload", "publish"]
+    platforms: 可选，发布平台列表，为空时跳过 publish 阶段
+        xhs_mcp: 小红书 MCP（无需人工）
+        xiaohongshu / douyin / weixin: Playwright 版本，默认无人值守（headless 填写草稿并保存截图，
+            稍后在 main.py 中审核）；BATCH_UNATTENDED=false 时需要人工确认并关闭浏览器
+    published: 可选，已发布成功的平台，publish 阶段跳过这些平台（队列重试时由 worker 写入，避免重复发布）
+"""
+
+import os
+import json
+import time
+import asyncio
+from rich.table import Table
+from ai_client import create_client
+from service.content import auto_generate
+from service.image import generate_images, upload_generated_images
+from service.publish import check_login as check_login_mcp, publish_from_json
+from service.publish_xiaohongshu import publish_content as publish_xiaohongshu
+from service.publish_douyin import publish_content as publish_douyin
+from service.publish_weixin import publish_content as publish_weixin
+from util.json_util import save_json, load_json
+from util.metrics import span, inc, print_metrics_summary
+from util.console import console, print_success, print_error, print_info, print_warning
+
+STAGES = ("content", "images", "upload", "publish")
+
+# 各阶段默认并发数
+DEFAULT_LIMITS = {
+    "content": int(os.getenv("BATCH_CONTENT_CONCURRENCY", 4)),
+    "images": int(os.getenv("BATCH_IMAGES_CONCURRENCY", 2)),
+    "upload": int(os.getenv("BATCH_UPLOAD_CONCURRENCY", 4)),
+    "publish": int(os.getenv("BATCH_PUBLISH_CONCURRENCY", 1)),
+}
+# Playwright 发布是否使用无人值守模式
+UNATTENDED = os.getenv("BATCH_UNATTENDED", "true").lower() in ("1", "true", "yes")
+
+
+async def _publish_mcp(content_json: dict, file_path: str) -> bool:
+    """通过 MCP 发布小红书（未登录时直接失败，不等待扫码）"""
+    if not await check_login_mcp():
+        raise RuntimeError("小红书 MCP 未登录，请先在交互模式下扫码登录")
+    result = await publish_from_json(content_json)
+    return bool(result and result.get("success"))
+
+
+PUBLISHERS = {
+    "xhs_mcp": _publish_mcp,
+    "xiaohongshu": lambda content_json, file_path: publish_xiaohongshu(content_json, file_path, load_json, UNATTENDED),
+    "douyin": lambda content_json, file_path: publish_douyin(content_json, file_path, load_json, UNATTENDED),
+    "weixin": lambda content_json, file_path: publish_weixin(content_json, file_path, load_json, UNATTENDED),
+}
+
+
+def load_jobs(jobs_file: str) -> list[dict]:
+    """读取 JSONL 任务文件，跳过空行"""
+    jobs = []
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job.setdefault("id", str(line_no))
+            jobs.append(job)
+    return jobs
+
+
+async def _publish_platform(platform: str, content_json: dict, file_path: str) -> bool:
+    ok = False
+    try:
+        with span("publish", platform=platform):
+            ok = await PUBLISHERS[platform](content_json, file_path)
+        return ok
+    finally:
+        inc("publish_total", platform=platform, outcome="ok" if ok is True else "failed")
+
+
+async def run_stage(job: dict, state: dict, stage: str):
+    """执行单个阶段，失败时抛出异常
+
+    state 中可选的 client_factory 用于创建 AI 客户端（默认 create_client，基准测试中替换为本地替身）
+    """
+    with span("stage", stage=stage) as stage_span:
+        stage_span.set(job=job.get("id"), file_path=state["file_path"])
+        await _run_stage(job, state, stage)
+
+
+async def _run_stage(job: dict, state: dict, stage: str):
+    file_path = state["file_path"]
+
+    if stage == "content":
+        if not job.get("requirement"):
+            raise ValueError("content 阶段缺少 requirement 字段")
+        client = state.get("client_factory", create_client)()
+        content_json = await auto_generate(
+            client, job["requirement"], job.get("subject"), os.path.basename(file_path)
+        )
+        if not content_json:
+            raise ValueError("生成的 JSON 解析失败")
+        save_json(content_json, file_path)
+        state["client"] = client
+        state["content_json"] = content_json
+        return
+
+    if state.get("content_json") is None:
+        state["content_json"] = load_json(file_path)
+    content_json = state["content_json"]
+
+    if stage == "images":
+        client = state.get("client") or state.get("client_factory", create_client)()
+        generated = await generate_images(client, content_json, file_path)
+        expected = len(content_json.get("image_prompt", []))
+        if len(generated) < expected:
+            raise RuntimeError(f"图片生成不完整: {len(generated)}/{expected}")
+    elif stage == "upload":
+        if not await upload_generated_images(content_json, file_path):
+            raise RuntimeError("图片上传失败")
+    elif stage == "publish":
+        platforms = job.get("platforms", [])
+        for platform in platforms:
+            if platform not in PUBLISHERS:
+                raise ValueError(f"不支持的发布平台: {platform}")
+        # 发布不是幂等的：已成功的平台记录在 state["published"] 中，重试时跳过
+        published = state.setdefault("published", list(job.get("published", [])))
+        pending = [platform for platform in platforms if platform not in published]
+        if len(pending) < len(platforms):
+            print_info(f"[{job.get('id')}] 已发布过的平台不再重复发布: {', '.join(p for p in platforms if p in published)}")
+        # 各平台在浏览器池中使用独立上下文，并发发布
+        results = await asyncio.gather(
+            *[_publish_platform(platform, content_json, file_path) for platform in pending],
+            return_exceptions=True
+        )
+        published.extend(platform for platform, ok in zip(pending, results) if ok is True)
+        failed = [platform for platform, ok in zip(pending, results) if ok is not True]
+        if failed:
+            raise RuntimeError(f"发布失败: {', '.join(failed)}")
+
+
+def job_stages(job: dict) -> list[str]:
+    """任务要执行的阶段（按流水线顺序），没有发布平台时跳过 publish"""
+    stages = job.get("stages") or list(STAGES)
+    if not job.get("platforms"):
+        stages = [stage for stage in stages if stage != "publish"]
+    return [stage for stage in STAGES if stage in stages]
+
+
+def job_file_path(job: dict) -> str:
+    """任务的输出目录，未指定时按时间和任务 ID 生成"""
+    return job.get("file_path") or f"output/{time.strftime('%Y%m%d%H%M%S')}_{job['id']}"
+
+
+async def run_job(job: dict, semaphores: dict[str, asyncio.Semaphore], client_factory=None) -> dict:
+    """按顺序执行一个任务的各阶段，任一阶段失败则停止后续阶段"""
+    job_id = job["id"]
+    stages = job_stages(job)
+    file_path = job_file_path(job)
+    state = {"file_path": file_path}
+    if client_factory:
+        state["client_factory"] = client_factory
+    report = {"id": job_id, "file_path": file_path, "status": "success", "stages": {}}
+
+    # 同一任务的各阶段共用一个 trace
+    with span("job") as job_span:
+        job_span.set(job=job_id)
+        for stage in stages:
+            async with semaphores[stage]:
+                print_info(f"[{job_id}] 开始 {stage} 阶段")
+                start = time.perf_counter()
+                try:
+                    await run_stage(job, state, stage)
+                    report["stages"][stage] = {"ok": True, "seconds": round(time.perf_counter() - start, 2)}
+                    print_success(f"[{job_id}] {stage} 阶段完成")
+                except Exception as e:
+                    report["stages"][stage] = {
+                        "ok": False,
+                        "seconds": round(time.perf_counter() - start, 2),
+                        "error": str(e) or type(e).__name__,
+                    }
+                    report["status"] = "failed"
+                    print_error(f"[{job_id}] {stage} 阶段失败: {e}")
+                    break
+        job_span.set(result=report["status"])
+
+    return report
+
+
+def print_summary(reports: list[dict], elapsed: float):
+    """打印批量任务汇总"""
+    table = Table(title=f"批量任务汇总（耗时 {elapsed:.1f}s）")
+    table.add_column("任务")
+    table.add_column("状态")
+    for stage in STAGES:
+        table.add_column(stage, justify="right")
+    table.add_column("输出目录")
+
+    for report in reports:
+        cells = []
+        for stage in STAGES:
+            result = report["stages"].get(stage)
+            if result is None:
+                cells.append("-")
+            elif result["ok"]:
+                cells.append(f"[green]{result['seconds']}s[/green]")
+            else:
+                cells.append(f"[red]失败 {result['seconds']}s[/red]")
+        status = "[green]成功[/green]" if report["status"] == "success" else "[red]失败[/red]"
+        table.add_row(report["id"], status, *cells, report["file_path"])
+
+    console.print(table)
+    succeeded = sum(1 for report in reports if report["status"] == "success")
+    print_info(f"成功 {succeeded}/{len(reports)}，吞吐 {len(reports) / elapsed * 3600:.1f} 篇/小时")
+
+
+async def run_batch(jobs: list[dict], limits: dict[str, int] = None, report_path: str = None, client_factory=None) -> list[dict]:
+    """并发执行批量任务，返回每个任务的报告
+
+    参数:
+        jobs: 任务列表（见模块说明）
+        limits: 各阶段并发数，未指定的阶段使用 DEFAULT_LIMITS
+        report_path: 可选，汇总报告 JSON 的保存路径
+        client_factory: 可选，创建 AI 客户端的函数，默认 create_client
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    semaphores = {stage: asyncio.Semaphore(max(1, limits[stage])) for stage in STAGES}
+
+    print_info(f"共 {len(jobs)} 个任务，各阶段并发数: {limits}")
+    start = time.perf_counter()
+    reports = await asyncio.gather(*[run_job(job, semaphores, client_factory) for job in jobs])
+    elapsed = time.perf_counter() - start
+
+    print_summary(reports, elapsed)
+    print_metrics_summary()
+
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": round(elapsed, 2), "limits": limits, "jobs": reports}, f, ensure_ascii=False, indent=2)
+        print_success(f"汇总报告已保存到 {report_path}")
+
+    failed = [report["id"] for report in reports if report["status"] != "success"]
+    if failed:
+        print_warning(f"失败任务: {', '.join(failed)}")
+    return reports
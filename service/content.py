@@ -1,21 +1,44 @@
 """内容创作服务"""
 
 import json
-import asyncio
-import threading
-from util.loading import ai_loading
-from util.json_util import extract_json
-from util.console import print_ai_response, print_success, print_warning, console
+from contextlib import aclosing
+from util.loading import loading_status
+from util.json_util import extract_json, validate_post, JsonStreamExtractor
+from util.console import print_ai_response, print_ai_stream, print_warning, console
 from util.txt_util import add_subject
-from ai_client import create_client
+from util.background import get_background_worker
 from prompt.topic_discussion import topic_discussion_prompt
+from util.subject_index import get_subject_index
+from util.metrics import span
+
+
+GENERATE_JSON_PROMPT = f"""将我们最后确定的内容整理成json格式，以便于使用nano banana pro 生成图片，尽量保留所有内容，格式如下：
+                                                   {{
+                                                       "title": "标题",
+                                                       "tags": ["标签1", "标签2", "标签3"],
+                                                       "image_prompt": ["图片1描述", "图片2描述", "图片3描述"]
+                                                       "content":"文案"
+                                                   }}
+                                                    """
+
+AUTO_PICK_SUBJECT_PROMPT = "请从以上选题中选出你认为最合适的一个，直接返回该选题本身，不要返回任何其他内容。"
+
+
+def _content_creation_prompt(subject: str) -> str:
+    """内容创作的提示词"""
+    return f"""确定选题是：'''{subject}'''。
+                                                我们来继续设计内容。
+                                                内容是要发布到小红书的，这个平台的特点是图文结合，重点在图片，文字只需要配一个简短的标题和一些标签就行。
+                                                封面首图用简洁的大字封面最好。
+                                                    """
 
 
 async def topic_discussion(client, command):
     """选题探讨"""
     prompt = topic_discussion_prompt(command)
-    response = await ai_loading(client.chat_history(prompt))
-    print_ai_response(response, title="Gemini")
+    with span("topic_discussion"):
+        response = await print_ai_stream(client.stream_chat_history(prompt), title="Gemini")
+    _warn_duplicate_subjects(response)
     
     while True:
         command = input("继续对话，或者输入'ok'继续下一步：")
@@ -24,18 +47,20 @@ async def topic_discussion(client, command):
         if not command.strip():
             print("请输入内容或输入'ok'继续下一步。")
             continue
-        response = await ai_loading(client.chat_history(command))
-        print_ai_response(response)
+        response = await print_ai_stream(client.stream_chat_history(command))
+        _warn_duplicate_subjects(response)
+
+
+def _warn_duplicate_subjects(response: str):
+    """提示与历史选题近似重复的候选选题"""
+    for candidate, subject, score in get_subject_index().check_candidates(response):
+        print_warning(f"选题「{candidate}」与历史选题「{subject}」相似（{score}）")
 
 async def content_creation(client):
     """内容创作"""
     command = input("请输入选题：")
-    response = await ai_loading(client.chat_history(f"""确定选题是：'''{command}'''。
-                                                我们来继续设计内容。
-                                                内容是要发布到小红书的，这个平台的特点是图文结合，重点在图片，文字只需要配一个简短的标题和一些标签就行。
-                                                封面首图用简洁的大字封面最好。
-                                                    """))
-    print_ai_response(response)
+    with span("content_creation"):
+        await print_ai_stream(client.stream_chat_history(_content_creation_prompt(command)))
     
     while True:
         command = input("继续对话，或者输入'ok'继续下一步：")
@@ -44,65 +69,88 @@ async def content_creation(client):
         if not command.strip():
             print("请输入内容或输入'ok'继续下一步。")
             continue
-        response = await ai_loading(client.chat_history(command))
-        print_ai_response(response)
+        await print_ai_stream(client.stream_chat_history(command))
 
 
-async def generate_json(client) -> dict:
-    """生成json并返回解析后的对象"""
-    response = await ai_loading(client.chat_history(f"""将我们最后确定的内容整理成json格式，以便于使用nano banana pro 生成图片，尽量保留所有内容，格式如下：
-                                                   {{
-                                                       "title": "标题",
-                                                       "tags": ["标签1", "标签2", "标签3"],
-                                                       "image_prompt": ["图片1描述", "图片2描述", "图片3描述"]
-                                                       "content":"文案"
-                                                   }}
-                                                    """), "正在整理 JSON...")
-    print_ai_response(response, title="生成的 JSON")
+async def generate_json(client, post_id: str = None) -> dict:
+    """生成json并返回解析后的对象，post_id 为内容标识（如输出目录名），随选题一起记录"""
+    # 边接收边解析，完整的 JSON 对象一出现就停止等待
+    extractor = JsonStreamExtractor(validator=validate_post)
+    with loading_status("正在整理 JSON..."), span("generate_json"):
+        async with aclosing(client.stream_chat_history(GENERATE_JSON_PROMPT)) as stream:
+            async for delta in stream:
+                if extractor.feed(delta) is not None:
+                    break
+            else:
+                extractor.finish()
+    print_ai_response(extractor.buffer, title="生成的 JSON")
     
+    if extractor.result is None:
+        print(f"\n❌ JSON 解析失败: {extractor.error or '未找到有效的 JSON'}")
+        return None
+    _submit_summary(extractor.result, post_id)
+    print("\n✅ JSON 解析成功")
+    return extractor.result
+
+
+def _parse_content_json(response: str, post_id: str = None) -> dict:
+    """解析 JSON 并启动后台总结任务，解析失败返回 None"""
     try:
-        result = extract_json(response)
-        # 使用线程启动后台任务（不受 input() 阻塞影响）
-        # 注意：不传递 client，因为异步客户端绑定到原事件循环，需要在新线程中创建新实例
-        thread = threading.Thread(
-            target=_run_summarize_in_thread,
-            args=(result,),
-            daemon=True
-        )
-        thread.start()
-        print("\n✅ JSON 解析成功")
-        return result
+        result = extract_json(response, validator=validate_post)
     except (ValueError, json.JSONDecodeError) as e:
         print(f"\n❌ JSON 解析失败: {e}")
         return None
+    
+    _submit_summary(result, post_id)
+    return result
+
+
+def _submit_summary(content_json: dict, post_id: str = None):
+    """交给常驻的后台执行器总结选题（不受 input() 阻塞影响）"""
+    get_background_worker().submit("总结选题", lambda client: _summarize_content(client, content_json, post_id))
 
 
-def _run_summarize_in_thread(content_json: dict):
-    """在新线程中运行异步总结任务"""
-    # 抑制 loguru 日志输出（gemini_webapi 使用 loguru）
-    from loguru import logger
-    logger.remove()  # 移除所有 handler，静默 gemini_webapi 日志
+async def auto_generate(client, requirement: str, subject: str = None, post_id: str = None) -> dict:
+    """无交互地完成 选题探讨 → 内容创作 → 生成json，用于批量任务
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(_summarize_content(content_json))
-    finally:
-        loop.close()
+    参数:
+        client: AI 客户端（会使用其对话历史，每个任务应使用独立实例）
+        requirement: 选题要求，与选题探讨的输入一致（"1"、"2" 为预设）
+        subject: 可选，直接指定选题；为空时由 AI 从生成的选题中挑选
+        post_id: 可选，内容标识（如输出目录名），随选题一起记录
+    
+    返回:
+        解析后的 content_json，失败返回 None
+    """
+    client.reset_chat()
+    with span("topic_discussion"):
+        await client.chat_history(topic_discussion_prompt(requirement))
+    
+    if not subject:
+        with span("pick_subject"):
+            subject = await client.chat_history(AUTO_PICK_SUBJECT_PROMPT)
+            subject = subject.strip().strip("'\"“”")
+            duplicates = get_subject_index().near_duplicates(subject)
+            if duplicates:
+                # 选中的选题与历史重复时，让 AI 换一个
+                subject = await client.chat_history(
+                    f"选题「{subject}」与历史选题「{duplicates[0][0]}」重复了，请换一个不重复的，直接返回该选题本身。"
+                )
+                subject = subject.strip().strip("'\"“”")
+    
+    with span("content_creation"):
+        await client.chat_history(_content_creation_prompt(subject))
+    with span("generate_json"):
+        response = await client.chat_history(GENERATE_JSON_PROMPT)
+    return _parse_content_json(response, post_id)
 
 
-async def _summarize_content(content_json: dict):
-    """后台任务：总结当前内容"""
+async def _summarize_content(client, content_json: dict, post_id: str = None):
+    """后台任务：总结当前内容，并记录到历史选题"""
     console.print("[dim]📝 后台总结任务已启动[/dim]")
-    
-    try:
-        # 在新线程中创建新的 client 实例
-        client = create_client()
-        summary = await client.chat(
-            "以下是自媒体创造的内容，为了以后不重复生成该主题，你需要分析并总结出一个非常简短的主题，"
-            "直接返回总结后的主题，除此之外不要返回任何其他内容。内容如下：\n" 
-            + json.dumps(content_json, ensure_ascii=False)
-        )
-        add_subject(summary.strip())
-    except Exception:
-        pass  # 静默失败
+    summary = await client.chat(
+        "以下是自媒体创造的内容，为了以后不重复生成该主题，你需要分析并总结出一个非常简短的主题，"
+        "直接返回总结后的主题，除此之外不要返回任何其他内容。内容如下：\n" 
+        + json.dumps(content_json, ensure_ascii=False)
+    )
+    add_subject(summary.strip(), post_id)
@@ -3,12 +3,99 @@
 import os
 import json
 import glob
-from util.loading import ai_loading
+import random
+import asyncio
+from util.loading import ai_loading, loading_status
 from util.piclist_client import upload_by_path
-from util.console import print_success, print_error, print_info
+from util.image_optimizer import optimize_images
+from util.json_util import save_json
+from util.metrics import span, inc
+from util.console import print_success, print_error, print_info, print_warning
 
+# 并发生成图片数量，1（默认）表示沿用单会话逐张生成（依靠对话历史保持风格），大于 1 时启用并发模式
+IMAGE_CONCURRENCY = max(1, int(os.getenv("IMAGE_CONCURRENCY", 1)))
+# 单张图片未返回结果时的重试次数（请求异常由 RateLimitedClient 重试，这里不再叠加）
+IMAGE_RETRIES = int(os.getenv("IMAGE_RETRIES", 2))
 
-async def generate_images(client, content_json: dict, file_path: str):
+
+def build_style_preamble(content_json: dict) -> str:
+    """构建整组图片共享的风格前言
+
+    并发生成时每张图片都是独立请求，没有对话历史可依赖，
+    通过把标题、风格要求和整组图片描述放进每个请求来保持风格一致。
+    content_json 中可选的 style 字段会作为额外的风格要求。
+    """
+    image_prompts = content_json["image_prompt"]
+    prompts_str = "\n".join([f"{i}. {desc}" for i, desc in enumerate(image_prompts, 1)])
+    style = content_json.get("style", "")
+    style_line = f"风格要求：{style}\n" if style else ""
+    return f"""你正在为同一篇小红书图文生成一组共{len(image_prompts)}张配图，请使用nano banana pro生成。
+所有图片必须保持统一的视觉风格（相同的配色、字体、排版和插画风格），每张图片的宽高比都是3:4，封面首图使用简洁的大字封面。
+图文标题：{content_json.get("title", "")}
+{style_line}整组图片的内容如下，仅供把握整体风格，本次只生成其中指定的一张：
+{prompts_str}
+"""
+
+
+async def _generate_one(client, preamble: str, item: str, file_path: str, index: int, retries: int) -> str | None:
+    """生成单张图片，未返回图片时重试，返回失败原因，成功返回 None
+
+    请求异常直接抛出：限流、超时等可重试的错误已由 RateLimitedClient 按退避策略重试过
+    """
+    prompt = f"{preamble}\n现在生成第{index}张图片，图片内容：\n{item}"
+    error = None
+    with span("image", mode="parallel") as image_span:
+        for attempt in range(retries + 1):
+            image_span.set(index=index, attempts=attempt + 1)
+            if await client.generate_image(prompt, file_path, index):
+                return None
+            error = "未返回图片"
+            
+            if attempt < retries:
+                inc("image_retries_total")
+                print_warning(f"第 {index} 张图片生成失败（{error}），第 {attempt + 1} 次重试...")
+                await asyncio.sleep(2 ** attempt + random.random())
+        image_span.status = "error"
+        image_span.set(error=error)
+    return error
+
+
+async def _generate_images_parallel(client, content_json: dict, file_path: str, concurrency: int, retries: int) -> list[str]:
+    """并发生成图片，每张完成后立即写入 file_path/{i}.png"""
+    image_prompts = content_json["image_prompt"]
+    total = len(image_prompts)
+    preamble = build_style_preamble(content_json)
+    semaphore = asyncio.Semaphore(concurrency)
+    os.makedirs(file_path, exist_ok=True)
+    
+    async def worker(index: int, item: str):
+        async with semaphore:
+            try:
+                return index, await _generate_one(client, preamble, item, file_path, index, retries)
+            except Exception as e:
+                # 单张失败不影响其余图片
+                return index, str(e) or type(e).__name__
+    
+    tasks = [worker(i, item) for i, item in enumerate(image_prompts, 1)]
+    generated, failed = [], []
+    with loading_status(f"🎨 并发生成 {total} 张图片（并发数 {concurrency}）...") as status:
+        for coro in asyncio.as_completed(tasks):
+            index, error = await coro
+            if error is None:
+                generated.append(os.path.join(file_path, f"{index}.png"))
+                print_success(f"第 {index} 张图片生成完成")
+            else:
+                failed.append(index)
+                print_error(f"第 {index} 张图片生成失败: {error}")
+            if status:
+                status.update(f"[bold cyan]🎨 已完成 {len(generated) + len(failed)}/{total} 张图片...[/bold cyan]")
+    
+    if failed:
+        print_warning(f"以下图片生成失败，可稍后单独重新生成: {sorted(failed)}")
+    return sorted(generated)
+
+
+async def generate_images(client, content_json: dict, file_path: str, concurrency: int = None, retries: int = None) -> list[str]:
     """根据 content_json 生成图片，上传并更新 content.json
     
     content_json 结构:
@@ -22,15 +109,30 @@ async def generate_images(client, content_json: dict, file_path: str):
     生成完成后会:
         1. 上传 file_path 下所有 png 图片
         2. 将图片链接存入 file_path/content.json 的 images 字段
+    
+    参数:
+        concurrency: 并发数，默认读取 IMAGE_CONCURRENCY（默认 1）；大于 1 时各图片独立并发生成，
+            通过共享风格前言保持风格一致；小于等于 1 时沿用单会话逐张生成
+        retries: 并发模式下单张图片的重试次数，默认读取 IMAGE_RETRIES
+    
+    返回:
+        成功生成的图片路径列表
     """
     if not content_json or "image_prompt" not in content_json:
         print_error("content_json 无效或缺少 image_prompt 字段")
         return []
     
     image_prompts = content_json["image_prompt"]
+    concurrency = max(1, concurrency if concurrency is not None else IMAGE_CONCURRENCY)
+    retries = IMAGE_RETRIES if retries is None else retries
     
     client.reset_chat()
     
+    if concurrency > 1:
+        generated = await _generate_images_parallel(client, content_json, file_path, concurrency, retries)
+        print_success(f"{len(generated)}/{len(image_prompts)} 张图片生成完成")
+        return generated
+    
     # 批量生成
     # image_prompts_str = "\n".join([f"{i+1}. {desc}" for i, desc in enumerate(image_prompts)])
     # prompt = f"""
@@ -49,15 +151,20 @@ async def generate_images(client, content_json: dict, file_path: str):
     #         f"🎨 正在准备生成图片..."
     #     )
     # print_success(f"response")
+    generated = []
     for i, item in enumerate(image_prompts, 1):
         print_info(f"正在生成第 {i}/{len(image_prompts)} 张图片...")
-        response = await ai_loading(
-            client.image_history(f"开始生成第{i}张图片，要求宽高比3:4，图片内容：\n{item}", file_path, i),
-            f"🎨 生成第 {i}/{len(image_prompts)} 张图片..."
-        )
+        with span("image", mode="serial") as image_span:
+            image_span.set(index=i)
+            response = await ai_loading(
+                client.image_history(f"开始生成第{i}张图片，要求宽高比3:4，图片内容：\n{item}", file_path, i),
+                f"🎨 生成第 {i}/{len(image_prompts)} 张图片..."
+            )
+        generated.append(os.path.join(file_path, f"{i}.png"))
         print_success(f"第 {i} 张图片生成完成")
     
     print_success(f"全部 {len(image_prompts)} 张图片生成完成")
+    return generated
 
 
 async def re_generate_images(client, content_json: dict, file_path: str, image_index: int):
@@ -66,6 +173,21 @@ async def re_generate_images(client, content_json: dict, file_path: str, image_i
     item = contents[image_index - 1]  # 用户输入从1开始
     
     print_info(f"正在重新生成第 {image_index} 张图片...")
+    if IMAGE_CONCURRENCY > 1:
+        # 并发模式下没有对话历史，使用同样的风格前言重新生成
+        try:
+            error = await ai_loading(
+                _generate_one(client, build_style_preamble(content_json), item, file_path, image_index, IMAGE_RETRIES),
+                f"🎨 重新生成第 {image_index} 张图片..."
+            )
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        if error:
+            print_error(f"第 {image_index} 张图片重新生成失败: {error}")
+        else:
+            print_success(f"第 {image_index} 张图片重新生成完成")
+        return
+    
     response = await ai_loading(
         client.image_history(f"开始重新生成第{image_index}张图片，要求宽高比3:4，图片内容：\n{item}", file_path, image_index),
         f"🎨 重新生成第 {image_index} 张图片..."
@@ -81,4 +203,27 @@ async def edit_image(client,file_path: str,image_index: str,requirement: str):
         client.image(f"{requirement}", file_path, image_index, image_path),
         f"🎨 重新生成第 {image_index} 张图片..."
     )
-    print_success(f"第 {image_index} 张图片编辑完成")
\ No newline at end of file
+    print_success(f"第 {image_index} 张图片编辑完成")
+
+
+async def upload_generated_images(content_json: dict, file_path: str) -> list[str]:
+    """上传 file_path 下所有 png 图片，并将图片链接写入 content.json 的 images 字段"""
+    image_paths = sorted(
+        glob.glob(os.path.join(os.path.abspath(file_path), "*.png")),
+        key=lambda p: (len(os.path.basename(p)), os.path.basename(p))
+    )
+    if not image_paths:
+        print_error(f"{file_path} 下没有找到图片")
+        return []
+    
+    # 上传按图床参数压缩后的衍生图，原图保留在输出目录
+    with span("upload", target="piclist") as upload_span:
+        upload_span.set(images=len(image_paths))
+        urls = await upload_by_path(await optimize_images(image_paths, "piclist"))
+    if len(urls) != len(image_paths):
+        print_error(f"图片上传不完整: {len(urls)}/{len(image_paths)}")
+        return []
+    
+    content_json["images"] = urls
+    save_json(content_json, file_path)
+    return urls
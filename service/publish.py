@@ -7,60 +7,62 @@ import base64
 import httpx
 from PIL import Image
 import io
+from util.http_client import get_http_client
+from util.metrics import span
 
 MCP_BASE_URL = os.getenv("XHS_MCP_URL", "http://localhost:18060")
 
 
 async def health_check():
     """健康检查"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(f"{MCP_BASE_URL}/health")
-            result = response.json()
-            status = result.get("data", {}).get("status", "unknown")
-            print(f"🏥 服务状态: {status}")
-            return result
-        except httpx.HTTPError as e:
-            print(f"❌ 健康检查失败: {e}")
-            return None
+    client = get_http_client()
+    try:
+        response = await client.get(f"{MCP_BASE_URL}/health", timeout=30.0)
+        result = response.json()
+        status = result.get("data", {}).get("status", "unknown")
+        print(f"🏥 服务状态: {status}")
+        return result
+    except httpx.HTTPError as e:
+        print(f"❌ 健康检查失败: {e}")
+        return None
 
 
 async def check_login():
     """检查登录状态"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(f"{MCP_BASE_URL}/api/v1/login/status")
-            result = response.json()
-            is_logged_in = result.get("data", {}).get("is_logged_in", False)
-            if is_logged_in:
-                print("✅ 已登录")
-            else:
-                print("❌ 未登录")
-            return is_logged_in
-        except httpx.HTTPError as e:
-            print(f"❌ 检查登录状态失败: {e}")
-            return False
+    client = get_http_client()
+    try:
+        response = await client.get(f"{MCP_BASE_URL}/api/v1/login/status", timeout=30.0)
+        result = response.json()
+        is_logged_in = result.get("data", {}).get("is_logged_in", False)
+        if is_logged_in:
+            print("✅ 已登录")
+        else:
+            print("❌ 未登录")
+        return is_logged_in
+    except httpx.HTTPError as e:
+        print(f"❌ 检查登录状态失败: {e}")
+        return False
 
 
 async def get_qrcode():
     """获取登录二维码并显示"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(f"{MCP_BASE_URL}/api/v1/login/qrcode")
-            data = response.json()
-            
-            # 解码并显示二维码
-            img_base64 = data.get("data", {}).get("img", "")
-            img_data = base64.b64decode(img_base64.replace("data:image/png;base64,", ""))
-            img = Image.open(io.BytesIO(img_data))
-            img.show()
-            
-            timeout = data.get("data", {}).get("timeout", "未知")
-            print(f"📱 请在 {timeout} 内扫码登录")
-            return True
-        except Exception as e:
-            print(f"❌ 获取二维码失败: {e}")
-            return False
+    client = get_http_client()
+    try:
+        response = await client.get(f"{MCP_BASE_URL}/api/v1/login/qrcode", timeout=30.0)
+        data = response.json()
+        
+        # 解码并显示二维码
+        img_base64 = data.get("data", {}).get("img", "")
+        img_data = base64.b64decode(img_base64.replace("data:image/png;base64,", ""))
+        img = Image.open(io.BytesIO(img_data))
+        img.show()
+        
+        timeout = data.get("data", {}).get("timeout", "未知")
+        print(f"📱 请在 {timeout} 内扫码登录")
+        return True
+    except Exception as e:
+        print(f"❌ 获取二维码失败: {e}")
+        return False
 
 
 async def login():
@@ -85,44 +87,47 @@ async def publish_post(title: str, content: str, images: list[str]):
     返回:
         发布结果
     """
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            data = {
-                "title": title,
-                "content": content,
-                "images": images
-            }
-            
-            print(f"📝 正在发布笔记: {title}")
+    client = get_http_client()
+    try:
+        data = {
+            "title": title,
+            "content": content,
+            "images": images
+        }
+        
+        print(f"📝 正在发布笔记: {title}")
+        with span("publish.mcp", platform="xhs_mcp"):
             response = await client.post(
                 f"{MCP_BASE_URL}/api/v1/publish",
-                json=data
+                json=data,
+                timeout=120.0
             )
             result = response.json()
-            
-            if result.get("success"):
-                print("✅ 发布成功!")
-            else:
-                print(f"❌ 发布失败: {result}")
-            
-            return result
-        except httpx.HTTPError as e:
-            print(f"❌ 发布请求失败: {e}")
-            return None
+        
+        if result.get("success"):
+            print("✅ 发布成功!")
+        else:
+            print(f"❌ 发布失败: {result}")
+        
+        return result
+    except httpx.HTTPError as e:
+        print(f"❌ 发布请求失败: {e}")
+        return None
 
 
 async def search_content(keyword: str):
     """搜索内容"""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(
-                f"{MCP_BASE_URL}/api/v1/search",
-                json={"keyword": keyword}
-            )
-            return response.json()
-        except httpx.HTTPError as e:
-            print(f"❌ 搜索失败: {e}")
-            return None
+    client = get_http_client()
+    try:
+        response = await client.post(
+            f"{MCP_BASE_URL}/api/v1/search",
+            json={"keyword": keyword},
+            timeout=60.0
+        )
+        return response.json()
+    except httpx.HTTPError as e:
+        print(f"❌ 搜索失败: {e}")
+        return None
 
 
 async def publish_from_json(content_json: dict):
@@ -0,0 +1,108 @@
+"""多平台同时发布 - 同一份 content.json 并发发布到小红书、抖音、视频号
+
+各平台在同一个浏览器（见 util/browser_pool.py）中使用独立的上下文，草稿并行填写，
+总耗时约等于最慢的平台，而不是各平台之和。每个平台仍需人工确认并关闭页面，
+无人值守模式下则保存截图等待审核（见 service/review.py）。
+"""
+
+import time
+import asyncio
+from rich.table import Table
+from service.publish_xiaohongshu import publish_content as publish_xiaohongshu
+from service.publish_douyin import publish_content as publish_douyin
+from service.publish_weixin import publish_content as publish_weixin
+from service.review import pending_reviews, get_review, set_review_status, STATUS_APPROVED, STATUS_REJECTED
+from util.json_util import load_json
+from util.metrics import span, inc
+from util.console import console, print_info, print_success, print_warning
+
+PLATFORMS = {
+    "xiaohongshu": ("小红书", publish_xiaohongshu),
+    "douyin": ("抖音", publish_douyin),
+    "weixin": ("视频号", publish_weixin),
+}
+
+
+async def _publish_one(platform: str, content_json: dict, file_path: str, load_json_func, unattended: bool) -> dict:
+    name, publish = PLATFORMS[platform]
+    start = time.perf_counter()
+    try:
+        with span("publish", platform=platform):
+            ok = await publish(content_json, file_path, load_json_func, unattended)
+        error = None if ok else "发布失败"
+    except Exception as e:
+        ok, error = False, str(e) or type(e).__name__
+    inc("publish_total", platform=platform, outcome="ok" if ok else "failed")
+    return {"platform": name, "ok": ok, "seconds": round(time.perf_counter() - start, 1), "error": error}
+
+
+def print_results(results: list[dict], elapsed: float):
+    """打印各平台发布结果"""
+    table = Table(title=f"多平台发布结果（耗时 {elapsed:.1f}s）")
+    table.add_column("平台")
+    table.add_column("状态")
+    table.add_column("耗时", justify="right")
+    table.add_column("错误")
+    for result in results:
+        status = "[green]成功[/green]" if result["ok"] else "[red]失败[/red]"
+        table.add_row(result["platform"], status, f"{result['seconds']}s", result["error"] or "")
+    console.print(table)
+
+
+async def publish_all(content_json: dict, file_path: str = None, load_json_func=None, platforms: list[str] = None, unattended: bool = False) -> dict[str, bool]:
+    """并发发布到多个平台，返回 {平台: 是否成功}
+
+    参数:
+        platforms: 平台列表（xiaohongshu / douyin / weixin），默认全部
+        unattended: 无人值守模式，填写完成后保存截图等待审核
+    """
+    platforms = platforms or list(PLATFORMS)
+    for platform in platforms:
+        if platform not in PLATFORMS:
+            raise ValueError(f"不支持的发布平台: {platform}")
+
+    hint = "填写完成后保存截图等待审核" if unattended else "各平台填写完成后请分别确认并关闭页面"
+    print_info(f"同时发布到: {'、'.join(PLATFORMS[p][0] for p in platforms)}，{hint}")
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        _publish_one(platform, content_json, file_path, load_json_func, unattended) for platform in platforms
+    ])
+    print_results(results, time.perf_counter() - start)
+    return {platform: result["ok"] for platform, result in zip(platforms, results)}
+
+
+async def review_drafts():
+    """审核无人值守模式填写的草稿：通过后以有界面模式重新填写并由人工确认发布"""
+    while True:
+        reviews = pending_reviews()
+        if not reviews:
+            print_info("没有待审核的草稿")
+            return
+        table = Table(title="待审核草稿")
+        table.add_column("ID", justify="right")
+        table.add_column("平台")
+        table.add_column("标题")
+        table.add_column("截图")
+        for review in reviews:
+            name = PLATFORMS.get(review["platform"], (review["platform"],))[0]
+            table.add_row(str(review["id"]), name, review["title"], review["screenshot"])
+        console.print(table)
+
+        command = input("请输入草稿 ID，输入0返回上级: ")
+        if command == "0":
+            return
+        review = get_review(int(command)) if command.isdigit() else None
+        if review is None or review["platform"] not in PLATFORMS:
+            print_warning("无效的草稿 ID")
+            continue
+
+        action = input("1. 通过并发布  2. 驳回  其他. 跳过: ")
+        if action == "1":
+            _, publish = PLATFORMS[review["platform"]]
+            file_path = review["file_path"]
+            if await publish(load_json(file_path), file_path, load_json):
+                set_review_status(review["id"], STATUS_APPROVED)
+                print_success(f"草稿 #{review['id']} 已发布")
+        elif action == "2":
+            set_review_status(review["id"], STATUS_REJECTED, input("驳回原因（可选）: ") or None)
+            print_info(f"草稿 #{review['id']} 已驳回")
@@ -3,66 +3,95 @@
 import os
 import glob
 from util.douyin_client import DouyinClient
+from util.browser_pool import get_browser_pool
+from util.image_optimizer import optimize_images
+from service.review import capture_draft
+from util.metrics import span
 from util.console import print_success, print_error, print_info
 
 
-async def publish_content(content_json: dict, file_path: str = None, load_json_func=None) -> bool:
-    """发布图文到抖音"""
-    client = DouyinClient(headless=False)
+async def publish_content(content_json: dict, file_path: str = None, load_json_func=None, unattended: bool = False) -> bool:
+    """发布图文到抖音
+
+    unattended=True 时为无人值守模式: headless 运行，填写完成后保存截图等待异步审核（见 service/review.py），
+    不等待人工关闭浏览器；未登录时直接失败。
+    """
+    client = DouyinClient(headless=unattended, pool=get_browser_pool())
     
-    await client.start()
+    try:
+        with span("publish.start", platform="douyin"):
+            await client.start()
     
-    # 检查登录状态
-    is_logged_in = await client.check_login()
+        # 检查登录状态
+        with span("publish.check_login", platform="douyin"):
+            is_logged_in = await client.check_login()
     
-    if not is_logged_in:
-        print_info("需要登录抖音...")
-        print_info("请在浏览器中完成登录（扫码+验证码），登录成功后按回车继续...")
+        if not is_logged_in and unattended:
+            print_error("抖音未登录，无人值守模式无法扫码，请先在交互模式下登录")
+            return False
+    
+        if not is_logged_in:
+            print_info("需要登录抖音...")
+            print_info("请在浏览器中完成登录（扫码+验证码），登录成功后按回车继续...")
         
-        # 等待用户手动登录（不会刷新页面）
-        await client.wait_for_manual_login()
+            # 等待用户手动登录（不会刷新页面）
+            await client.wait_for_manual_login()
     
-    # 尝试加载内容
-    if not content_json and file_path and load_json_func:
-        content_json = load_json_func(file_path)
+        # 尝试加载内容
+        if not content_json and file_path and load_json_func:
+            content_json = load_json_func(file_path)
     
-    if not content_json:
-        print_error("没有内容可发布")
-        return False
+        if not content_json:
+            print_error("没有内容可发布")
+            return False
     
-    # 获取本地图片路径
-    image_paths = []
-    if file_path:
-        abs_file_path = os.path.abspath(file_path)
-        print_info(f"图片目录: {abs_file_path}")
-        png_files = sorted(glob.glob(os.path.join(abs_file_path, "*.png")))
-        image_paths = png_files
-        print_info(f"找到 {len(image_paths)} 张图片")
+        # 获取本地图片路径
+        image_paths = []
+        if file_path:
+            abs_file_path = os.path.abspath(file_path)
+            print_info(f"图片目录: {abs_file_path}")
+            png_files = sorted(glob.glob(os.path.join(abs_file_path, "*.png")))
+            image_paths = await optimize_images(png_files, "douyin")
+            print_info(f"找到 {len(image_paths)} 张图片")
     
-    if not image_paths:
-        print_error("没有找到本地图片，抖音需要本地图片路径")
-        return False
+        if not image_paths:
+            print_error("没有找到本地图片，抖音需要本地图片路径")
+            return False
     
-    # 发布
-    title = content_json.get("title", "")
-    content = content_json.get("content", "")
-    tags = content_json.get("tags", [])
+        # 发布
+        title = content_json.get("title", "")
+        content = content_json.get("content", "")
+        tags = content_json.get("tags", [])
     
-    success = await client.upload_images(
-        image_paths=image_paths,
-        title=title,
-        content=content,
-        tags=tags
-    )
+        with span("publish.fill", platform="douyin"):
+            success = await client.upload_images(
+                image_paths=image_paths,
+                title=title,
+                content=content,
+                tags=tags
+            )
     
-    if success:
-        await client.wait_for_close()
-        return True
-    else:
-        print_error("抖音内容填写失败，可能未登录或页面有问题")
-        print_info("请在浏览器中检查并手动操作，完成后关闭浏览器")
-        await client.wait_for_close()
-        return False
+        if unattended:
+            # 保存截图等待异步审核，立即归还浏览器上下文
+            if not success:
+                print_error("抖音内容填写失败")
+                return False
+            with span("publish.capture", platform="douyin"):
+                review_id = await capture_draft(client, "douyin", content_json, file_path)
+            # 没有审核记录时草稿会随上下文一起丢失，按失败处理以便重试
+            return review_id is not None
+    
+        if success:
+            await client.wait_for_close()
+            return True
+        else:
+            print_error("抖音内容填写失败，可能未登录或页面有问题")
+            print_info("请在浏览器中检查并手动操作，完成后关闭浏览器")
+            await client.wait_for_close()
+            return False
+    finally:
+        # 任何分支（包括异常）都归还浏览器上下文，wait_for_close 之后再调用不会重复关闭
+        await client.close()
 
 
 async def publish_video(video_path: str, title: str, tags: list[str] = None) -> bool:
@@ -71,7 +100,7 @@ async def publish_video(video_path: str, title: str, tags: list[str] = None) ->
         print_error(f"视频文件不存在: {video_path}")
         return False
     
-    client = DouyinClient(headless=False)
+    client = DouyinClient(headless=False, pool=get_browser_pool())
     
     try:
         await client.start()
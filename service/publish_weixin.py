@@ -3,66 +3,92 @@
 import os
 import glob
 from util.weixin_client import WeixinClient
+from util.browser_pool import get_browser_pool
+from util.image_optimizer import optimize_images
+from service.review import capture_draft
+from util.metrics import span
 from util.console import print_success, print_error, print_info
 
 
-async def publish_content(content_json: dict, file_path: str = None, load_json_func=None) -> bool:
-    """发布图文到视频号"""
-    client = WeixinClient(headless=False)
+async def publish_content(content_json: dict, file_path: str = None, load_json_func=None, unattended: bool = False) -> bool:
+    """发布图文到视频号
+
+    unattended=True 时为无人值守模式: headless 运行，填写完成后保存截图等待异步审核（见 service/review.py），
+    不等待人工关闭浏览器；未登录时直接失败。
+    """
+    client = WeixinClient(headless=unattended, pool=get_browser_pool())
     
-    await client.start()
+    try:
+        with span("publish.start", platform="weixin"):
+            await client.start()
     
-    # 检查登录状态
-    is_logged_in = await client.check_login()
+        # 检查登录状态
+        with span("publish.check_login", platform="weixin"):
+            is_logged_in = await client.check_login()
     
-    if not is_logged_in:
-        print_info("需要登录视频号...")
-        success = await client.login()
-        if not success:
-            print_error("登录失败")
-            await client.close()
+        if not is_logged_in and unattended:
+            print_error("视频号未登录，无人值守模式无法扫码，请先在交互模式下登录")
             return False
     
-    # 尝试加载内容
-    if not content_json and file_path and load_json_func:
-        content_json = load_json_func(file_path)
+        if not is_logged_in:
+            print_info("需要登录视频号...")
+            success = await client.login()
+            if not success:
+                print_error("登录失败")
+                return False
     
-    if not content_json:
-        print_error("没有内容可发布")
-        await client.close()
-        return False
+        # 尝试加载内容
+        if not content_json and file_path and load_json_func:
+            content_json = load_json_func(file_path)
     
-    # 获取本地图片路径
-    image_paths = []
-    if file_path:
-        abs_file_path = os.path.abspath(file_path)
-        print_info(f"图片目录: {abs_file_path}")
-        png_files = sorted(glob.glob(os.path.join(abs_file_path, "*.png")))
-        image_paths = png_files
-        print_info(f"找到 {len(image_paths)} 张图片")
+        if not content_json:
+            print_error("没有内容可发布")
+            return False
     
-    if not image_paths:
-        print_error("没有找到本地图片，视频号需要本地图片路径")
-        await client.close()
-        return False
+        # 获取本地图片路径
+        image_paths = []
+        if file_path:
+            abs_file_path = os.path.abspath(file_path)
+            print_info(f"图片目录: {abs_file_path}")
+            png_files = sorted(glob.glob(os.path.join(abs_file_path, "*.png")))
+            image_paths = await optimize_images(png_files, "weixin")
+            print_info(f"找到 {len(image_paths)} 张图片")
     
-    # 发布
-    title = content_json.get("title", "")
-    content = content_json.get("content", "")
-    tags = content_json.get("tags", [])
+        if not image_paths:
+            print_error("没有找到本地图片，视频号需要本地图片路径")
+            return False
     
-    success = await client.upload_images(
-        image_paths=image_paths,
-        title=title,
-        content=content,
-        tags=tags
-    )
+        # 发布
+        title = content_json.get("title", "")
+        content = content_json.get("content", "")
+        tags = content_json.get("tags", [])
     
-    if success:
-        await client.wait_for_close()
-        return True
-    else:
-        print_error("视频号内容填写失败")
-        print_info("请在浏览器中排查问题，关闭浏览器后程序继续...")
-        await client.wait_for_close()
-        return False
+        with span("publish.fill", platform="weixin"):
+            success = await client.upload_images(
+                image_paths=image_paths,
+                title=title,
+                content=content,
+                tags=tags
+            )
+    
+        if unattended:
+            # 保存截图等待异步审核，立即归还浏览器上下文
+            if not success:
+                print_error("视频号内容填写失败")
+                return False
+            with span("publish.capture", platform="weixin"):
+                review_id = await capture_draft(client, "weixin", content_json, file_path)
+            # 没有审核记录时草稿会随上下文一起丢失，按失败处理以便重试
+            return review_id is not None
+    
+        if success:
+            await client.wait_for_close()
+            return True
+        else:
+            print_error("视频号内容填写失败")
+            print_info("请在浏览器中排查问题，关闭浏览器后程序继续...")
+            await client.wait_for_close()
+            return False
+    finally:
+        # 任何分支（包括异常）都归还浏览器上下文，wait_for_close 之后再调用不会重复关闭
+        await client.close()
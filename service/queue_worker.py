@@ -0,0 +1,125 @@
+"""队列 worker - 从 Redis 任务队列中消费各阶段任务，可在多台机器上同时运行
+
+任务内容与批量任务文件中的一行相同（见 service/batch.py）。一个阶段完成后，任务会被放入下一阶段的队列，
+所以不同机器可以只负责部分阶段，例如 GPU 机器只跑 images，有浏览器的机器只跑 publish。
+各机器需要共享输出目录（如 NFS），publish 阶段默认使用无人值守模式。
+"""
+
+import os
+import time
+import socket
+import asyncio
+from service.batch import STAGES, job_stages, job_file_path, run_stage
+from util.job_queue import JobQueue, Job
+from util.console import print_success, print_error, print_info, print_warning
+
+# 心跳、续租和回收过期租约的间隔（秒）
+HEARTBEAT_INTERVAL = int(os.getenv("JOB_HEARTBEAT_INTERVAL", 15))
+# 队列为空时的轮询间隔（秒）
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+
+
+async def enqueue_job(queue: JobQueue, job: dict) -> str | None:
+    """把批量任务放入其第一个阶段的队列，返回任务 ID"""
+    stages = job_stages(job)
+    if not stages:
+        print_warning(f"[{job['id']}] 没有要执行的阶段，跳过")
+        return None
+    payload = {**job, "file_path": job_file_path(job), "stages": stages}
+    return await queue.enqueue(stages[0], payload)
+
+
+class QueueWorker:
+    """消费指定阶段队列的 worker
+
+    参数:
+        queue: 任务队列
+        stages: 负责的阶段，按顺序优先取靠前阶段的任务
+        concurrency: 同时处理的任务数
+    """
+
+    def __init__(self, queue: JobQueue, stages: list[str] = None, concurrency: int = 1, worker_id: str = None):
+        self.queue = queue
+        self.stages = list(stages or STAGES)
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.active: dict[str, Job] = {}
+        self.processed = 0
+        self.failed = 0
+        self._stopping = False
+
+    async def _heartbeat(self):
+        while not self._stopping:
+            try:
+                await self.queue.heartbeat(self.worker_id, {
+                    "stages": self.stages, "active": list(self.active), "processed": self.processed, "failed": self.failed,
+                })
+                for job in list(self.active.values()):
+                    if not await self.queue.extend(job):
+                        print_warning(f"[{job.payload.get('id')}] 租约已被回收，任务可能会被重复执行")
+                for stage in self.stages:
+                    reaped = await self.queue.reap(stage)
+                    if reaped:
+                        print_warning(f"{stage} 队列回收了 {reaped} 个租约过期的任务")
+            except Exception as e:
+                print_warning(f"worker 心跳失败: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _lease(self) -> Job | None:
+        for stage in self.stages:
+            job = await self.queue.lease(stage, self.worker_id)
+            if job is not None:
+                return job
+        return None
+
+    async def _process(self, job: Job):
+        payload = job.payload
+        job_name = payload.get("id", job.id)
+        self.active[job.id] = job
+        print_info(f"[{job_name}] 开始 {job.stage} 阶段（第 {job.attempts} 次）")
+        start = time.perf_counter()
+        state = {"file_path": payload["file_path"]}
+        try:
+            await run_stage(payload, state, job.stage)
+        except Exception as e:
+            self.failed += 1
+            error = str(e) or type(e).__name__
+            print_error(f"[{job_name}] {job.stage} 阶段失败: {error}")
+            # 部分平台已发布成功时写回任务内容，重试只发布失败的平台
+            if state.get("published"):
+                payload["published"] = state["published"]
+            await self.queue.nack(job, error, payload=payload)
+            return
+        finally:
+            self.active.pop(job.id, None)
+
+        self.processed += 1
+        print_success(f"[{job_name}] {job.stage} 阶段完成（{time.perf_counter() - start:.1f}s）")
+        stages = payload["stages"]
+        index = stages.index(job.stage)
+        # 先放入下一阶段再确认，崩溃时最多重复执行，不会丢失
+        if index + 1 < len(stages):
+            await self.queue.enqueue(stages[index + 1], payload)
+        await self.queue.ack(job)
+
+    async def _slot(self, stop_when_idle: bool):
+        while not self._stopping:
+            job = await self._lease()
+            if job is None:
+                if stop_when_idle and not self.active:
+                    return
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            await self._process(job)
+
+    async def run(self, stop_when_idle: bool = False):
+        """开始消费，stop_when_idle=True 时队列为空后退出"""
+        print_info(f"worker {self.worker_id} 启动，阶段: {', '.join(self.stages)}，并发 {self.concurrency}")
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            await asyncio.gather(*[self._slot(stop_when_idle) for _ in range(self.concurrency)])
+        finally:
+            self._stopping = True
+            heartbeat.cancel()
+            await self.queue.remove_worker(self.worker_id)
+            print_info(f"worker {self.worker_id} 退出，完成 {self.processed}，失败 {self.failed}")
@@ -0,0 +1,106 @@
+"""草稿审核 - 无人值守发布的截图/DOM 快照记录与异步人工审核
+
+无人值守模式（headless）填写完草稿后不等待人工关闭浏览器，而是:
+    1. 保存填写完成的表单截图和 DOM 快照到 <输出目录>/review/
+    2. 在 data/reviews.db 中记录一条待审核记录
+    3. 立即归还浏览器上下文，继续处理下一个任务
+
+审核可以稍后在交互模式（main.py → 发布 → 审核草稿）中进行:
+通过后以有界面模式重新打开该平台的发布页并填写，由人工确认发布；驳回则只更新状态。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from util.console import print_success, print_warning
+from util.paths import DATA_DIR
+
+REVIEW_DB_FILE = os.getenv("REVIEW_DB_FILE", os.path.join(DATA_DIR, "reviews.db"))
+
+STATUS_PENDING = "pending"
+STATUS_APPROVED = "approved"
+STATUS_REJECTED = "rejected"
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _db():
+    with _lock:
+        os.makedirs(os.path.dirname(os.path.abspath(REVIEW_DB_FILE)), exist_ok=True)
+        conn = sqlite3.connect(REVIEW_DB_FILE, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS reviews (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        platform TEXT NOT NULL,
+                        file_path TEXT,
+                        title TEXT,
+                        screenshot TEXT,
+                        snapshot TEXT,
+                        page_url TEXT,
+                        status TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        reviewed_at REAL,
+                        note TEXT
+                    )
+                """)
+                yield conn
+        finally:
+            conn.close()
+
+
+async def capture_draft(client, platform: str, content_json: dict, file_path: str) -> int | None:
+    """保存已填写草稿的截图和 DOM 快照并登记待审核，返回审核记录 ID"""
+    page = client.page
+    if page is None or page.is_closed():
+        print_warning(f"{platform} 页面已关闭，无法保存草稿截图")
+        return None
+
+    review_dir = os.path.join(os.path.abspath(file_path or "output"), "review")
+    os.makedirs(review_dir, exist_ok=True)
+    prefix = os.path.join(review_dir, f"{platform}_{time.strftime('%Y%m%d%H%M%S')}")
+    screenshot, snapshot = f"{prefix}.png", f"{prefix}.html"
+    try:
+        await page.screenshot(path=screenshot, full_page=True)
+        with open(snapshot, "w", encoding="utf-8") as f:
+            f.write(await page.content())
+    except Exception as e:
+        print_warning(f"{platform} 草稿截图失败: {e}")
+        return None
+
+    with _db() as conn:
+        cursor = conn.execute(
+            "INSERT INTO reviews (platform, file_path, title, screenshot, snapshot, page_url, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (platform, file_path, content_json.get("title", ""), screenshot, snapshot, page.url, STATUS_PENDING, time.time())
+        )
+        review_id = cursor.lastrowid
+    print_success(f"{platform} 草稿已填写，待审核 #{review_id}: {screenshot}")
+    return review_id
+
+
+def pending_reviews() -> list[dict]:
+    """全部待审核记录，按创建时间排序"""
+    with _db() as conn:
+        rows = conn.execute("SELECT * FROM reviews WHERE status = ? ORDER BY id", (STATUS_PENDING,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_review(review_id: int) -> dict | None:
+    with _db() as conn:
+        row = conn.execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def set_review_status(review_id: int, status: str, note: str = None):
+    """更新审核状态"""
+    with _db() as conn:
+        conn.execute(
+            "UPDATE reviews SET status = ?, reviewed_at = ?, note = ? WHERE id = ?",
+            (status, time.time(), note, review_id)
+        )
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from util import job_queue
+from util.job_queue import JobQueue, InMemoryRedis
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_queue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+
+@pytest.fixture
+def queue(redis, clock):
+    return JobQueue(redis, visibility_timeout=60, max_attempts=2)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_lease_then_ack(queue, redis):
+    job_id = run(queue.enqueue("images", {"file_path": "output/a"}))
+    job = run(queue.lease("images", "w1"))
+    assert job.id == job_id
+    assert job.payload == {"file_path": "output/a"}
+    assert job.attempts == 1
+    assert run(queue.stats())["images"] == {"ready": 0, "processing": 1, "dead": 0}
+
+    run(queue.ack(job))
+    assert run(queue.stats())["images"] == {"ready": 0, "processing": 0, "dead": 0}
+    assert redis.hgetall(queue._job_key(job_id)) == {}
+    assert run(queue.lease("images", "w1")) is None
+
+
+def test_late_nack_after_reap_is_noop(queue, redis, clock):
+    run(queue.enqueue("images", {}))
+    job = run(queue.lease("images", "w1"))
+    clock.now += 61
+    assert run(queue.reap("images")) == 1
+    assert run(queue.stats())["images"] == {"ready": 1, "processing": 0, "dead": 0}
+
+    run(queue.nack(job, "too late"))
+    assert run(queue.stats())["images"] == {"ready": 1, "processing": 0, "dead": 0}
+    assert redis.lrange(queue._key("images", "ready"), 0, -1) == [job.id]
+    assert redis.hget(queue._job_key(job.id), "last_error") == "租约过期"
+
+
+def test_nack_until_dead_then_retry_dead(queue):
+    job_id = run(queue.enqueue("upload", {"n": 1}))
+    for attempt in (1, 2):
+        job = run(queue.lease("upload", "w1"))
+        assert job.attempts == attempt
+        run(queue.nack(job, f"error {attempt}"))
+    assert run(queue.stats())["upload"] == {"ready": 0, "processing": 0, "dead": 1}
+    assert run(queue.dead_letters("upload")) == [{"id": job_id, "attempts": 2, "error": "error 2", "payload": {"n": 1}}]
+
+    assert run(queue.retry_dead("upload")) == 1
+    job = run(queue.lease("upload", "w1"))
+    assert job.id == job_id
+    assert job.attempts == 1
+
+
+def test_nack_updates_payload(queue):
+    run(queue.enqueue("publish", {"platforms": ["a", "b"]}))
+    job = run(queue.lease("publish", "w1"))
+    run(queue.nack(job, "b failed", payload={"platforms": ["a", "b"], "published": ["a"]}))
+    job = run(queue.lease("publish", "w1"))
+    assert job.payload["published"] == ["a"]
+
+
+def test_extend_after_reap_returns_false(queue, clock):
+    run(queue.enqueue("content", {}))
+    job = run(queue.lease("content", "w1"))
+    assert run(queue.extend(job)) is True
+    clock.now += 61
+    run(queue.reap("content"))
+    assert run(queue.extend(job)) is False
+
+
+def test_missing_job_hash_is_dropped(queue, redis):
+    lost_id = run(queue.enqueue("images", {"lost": True}))
+    redis.delete(queue._job_key(lost_id))
+    kept_id = run(queue.enqueue("images", {"kept": True}))
+
+    job = run(queue.lease("images", "w1"))
+    assert job.id == kept_id
+    assert redis.hgetall(queue._job_key(lost_id)) == {}
+    assert redis.lrange(queue._key("images", "processing"), 0, -1) == [kept_id]
+    assert run(queue.lease("images", "w1")) is None
+
+
+def test_reap_of_missing_job_does_not_recreate_hash(queue, redis, clock):
+    run(queue.enqueue("images", {}))
+    job = run(queue.lease("images", "w1"))
+    redis.delete(queue._job_key(job.id))
+    clock.now += 61
+    run(queue.reap("images"))
+    assert redis.hgetall(queue._job_key(job.id)) == {}
+    assert run(queue.stats())["images"] == {"ready": 0, "processing": 0, "dead": 0}
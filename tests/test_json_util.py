@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from util.json_util import JsonStreamExtractor, extract_json, repair_json, validate_post
+
+POST = {
+    "title": "周末去哪儿",
+    "tags": ["旅行", "周末"],
+    "image_prompt": ["封面", "第二张"],
+    "content": "正文",
+}
+
+
+def test_fenced_block_after_unmatched_brace_in_prose():
+    text = "注意：模板中的 { 占位符已替换。\n```json\n" + json.dumps(POST, ensure_ascii=False) + "\n```"
+    assert extract_json(text, validate_post) == POST
+
+
+def test_unclosed_brace_without_fence_retries_from_next_brace():
+    text = "说明 { 这里没有闭合\n" + json.dumps(POST, ensure_ascii=False)
+    assert extract_json(text, validate_post) == POST
+
+
+def test_stream_fence_split_across_chunks():
+    text = "前言 { 占位\n```json\n" + json.dumps(POST, ensure_ascii=False) + "\n```"
+    extractor = JsonStreamExtractor(validator=validate_post)
+    result = None
+    for i in range(0, len(text), 3):
+        result = extractor.feed(text[i:i + 3])
+        if result is not None:
+            break
+    assert result == POST
+
+
+def test_missing_comma_is_repaired():
+    text = '```json\n{\n  "title": "标题",\n  "tags": ["a", "b"]\n  "image_prompt": ["图1"]\n  "content": "正文"\n}\n```'
+    result = extract_json(text, validate_post)
+    assert result["tags"] == ["a", "b"]
+    assert result["content"] == "正文"
+    assert json.loads(repair_json('{"a": 1\n "b": 2}')) == {"a": 1, "b": 2}
+
+
+def test_invalid_post_raises():
+    with pytest.raises(ValueError):
+        extract_json('{"title": "只有标题"}', validate_post)
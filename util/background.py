@@ -0,0 +1,126 @@
+"""后台任务执行器 - 单个常驻线程 + 独立事件循环，处理生成后的后续任务（如总结选题）
+
+- 有界队列，队列满时直接放弃并提示（提交不阻塞，可以在协程中调用）
+- 复用同一个 AI 客户端，不会每个任务都重新创建和初始化
+- 失败按指数退避重试，重试耗尽后打印警告；AI 客户端已带限流重试（AI_RATE_LIMIT=true）时不再重复重试
+- 程序退出时会处理完队列中剩余的任务（最多等待 BACKGROUND_DRAIN_TIMEOUT 秒）
+
+使用方法:
+    async def summarize(client):
+        await client.chat("...")
+
+    get_background_worker().submit("总结选题", summarize)
+"""
+
+import os
+import queue
+import random
+import atexit
+import asyncio
+import threading
+from typing import Awaitable, Callable
+
+from .console import console, print_warning
+
+QUEUE_SIZE = int(os.getenv("BACKGROUND_QUEUE_SIZE", 100))
+# 任务失败后的重试次数，只在 AI 客户端没有限流重试时使用
+MAX_RETRIES = int(os.getenv("BACKGROUND_RETRIES", 3))
+DRAIN_TIMEOUT = float(os.getenv("BACKGROUND_DRAIN_TIMEOUT", 60))
+
+_STOP = object()
+
+
+class BackgroundWorker:
+    """后台任务执行器"""
+
+    def __init__(self, client_factory: Callable = None, queue_size: int = QUEUE_SIZE, max_retries: int = MAX_RETRIES):
+        self.client_factory = client_factory
+        self.max_retries = max_retries
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.client = None
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="background-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, name: str, func: Callable[[object], Awaitable]) -> bool:
+        """提交任务，func 接收复用的 AI 客户端并返回协程；返回是否成功入队"""
+        try:
+            self.queue.put_nowait((name, func))
+            return True
+        except queue.Full:
+            print_warning(f"后台任务队列已满，放弃任务: {name}")
+            return False
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is _STOP:
+                        break
+                    loop.run_until_complete(self._execute(*item))
+                finally:
+                    self.queue.task_done()
+        finally:
+            loop.close()
+
+    async def _execute(self, name: str, func: Callable[[object], Awaitable]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.client is None and self.client_factory is not None:
+                    self.client = self.client_factory()
+                await func(self.client)
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    retried = f"（已重试 {self.max_retries} 次）" if self.max_retries else ""
+                    print_warning(f"后台任务失败{retried}: {name}: {e}")
+                    return
+                delay = 2 ** attempt + random.random()
+                console.print(f"[dim]🔁 后台任务 {name} 失败，{delay:.1f}s 后重试: {e}[/dim]")
+                await asyncio.sleep(delay)
+
+    def shutdown(self, timeout: float = DRAIN_TIMEOUT):
+        """处理完队列中剩余任务后停止线程"""
+        if not self._thread.is_alive():
+            return
+        pending = self.queue.qsize()
+        if pending:
+            console.print(f"[dim]⏳ 等待 {pending} 个后台任务完成...[/dim]")
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print_warning("后台任务队列已满，无法正常停止")
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print_warning(f"后台任务未在 {timeout:.0f}s 内完成，剩余约 {self.queue.qsize()} 个")
+
+
+_worker: BackgroundWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def get_background_worker() -> BackgroundWorker:
+    """获取进程内共享的后台任务执行器（首次调用时启动，退出时自动排空）"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            from ai_client import create_client
+            # RateLimitedClient 已对限流、超时等错误按退避重试，外层再重试会使请求数成倍增加
+            rate_limit = os.getenv("AI_RATE_LIMIT", "true").lower() in ("1", "true", "yes")
+            _worker = BackgroundWorker(client_factory=create_client, max_retries=0 if rate_limit else MAX_RETRIES)
+            atexit.register(shutdown_background_worker)
+        return _worker
+
+
+def shutdown_background_worker():
+    """停止后台任务执行器，等待队列中的任务完成"""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.shutdown()
@@ -0,0 +1,193 @@
+"""Playwright 浏览器池 - 进程内共享一个 Chromium，按 平台+账号 租用并复用上下文
+
+使用方法:
+    pool = get_browser_pool()
+    lease = await pool.acquire("xiaohongshu", "default", headless=False)
+    page = await lease.context.new_page()
+    ...
+    await pool.release(lease)
+
+    # 程序退出前
+    await close_browser_pool()
+"""
+
+import os
+import asyncio
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+from .stealth import apply_stealth
+from .console import print_info, print_warning
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，缺失时不做内存检查
+    psutil = None
+
+# 上下文使用多少次后回收重建
+CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", 20))
+# 浏览器进程总内存（MB）超过该值时回收上下文，0 表示不检查
+MAX_MEMORY_MB = int(os.getenv("BROWSER_MAX_MEMORY_MB", 1500))
+
+BROWSER_ARGS = [
+    "--start-maximized",
+    "--disable-blink-features=AutomationControlled",
+]
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def browser_memory_mb() -> float:
+    """当前进程所有子进程（Playwright 驱动和 Chromium）的内存占用（MB），无 psutil 时返回 0"""
+    if psutil is None:
+        return 0
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 1024 / 1024
+
+
+class BrowserLease:
+    """一次上下文租用"""
+
+    def __init__(self, key: tuple, context: BrowserContext, fresh: bool):
+        self.key = key
+        self.context = context
+        # 是否为新建的上下文（新上下文需要加载 cookies）
+        self.fresh = fresh
+
+    @property
+    def platform(self) -> str:
+        return self.key[0]
+
+    @property
+    def account(self) -> str:
+        return self.key[1]
+
+
+class BrowserPool:
+    """浏览器池
+
+    - 每种 headless 模式只启动一次 Chromium，冷启动成本每个进程只付一次
+    - 上下文按 (平台, 账号, headless) 缓存，同一 key 同一时间只租给一个使用者
+    - 上下文使用 max_uses 次后、或浏览器内存超过 max_memory_mb 时回收重建
+    """
+
+    def __init__(self, max_uses: int = CONTEXT_MAX_USES, max_memory_mb: int = MAX_MEMORY_MB):
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.playwright = None
+        self._browsers: dict[bool, Browser] = {}
+        self._contexts: dict[tuple, BrowserContext] = {}
+        self._uses: dict[tuple, int] = {}
+        self._key_locks: dict[tuple, asyncio.Lock] = {}
+        self._lock = asyncio.Lock()
+
+    async def _get_browser(self, headless: bool) -> Browser:
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        browser = self._browsers.get(headless)
+        if browser is None or not browser.is_connected():
+            if browser is not None:
+                print_warning("浏览器已断开，重新启动")
+                self._drop_contexts(headless)
+            browser = await self.playwright.chromium.launch(headless=headless, args=BROWSER_ARGS)
+            self._browsers[headless] = browser
+        return browser
+
+    def _drop_contexts(self, headless: bool):
+        """浏览器断开后丢弃其所有上下文记录"""
+        for key in [key for key in self._contexts if key[2] == headless]:
+            self._contexts.pop(key, None)
+            self._uses.pop(key, None)
+
+    def _should_recycle(self, key: tuple) -> bool:
+        if self._uses.get(key, 0) >= self.max_uses:
+            return True
+        if self.max_memory_mb and browser_memory_mb() > self.max_memory_mb:
+            print_warning(f"浏览器内存超过 {self.max_memory_mb}MB，回收上下文")
+            return True
+        return False
+
+    async def _close_context(self, key: tuple):
+        context = self._contexts.pop(key, None)
+        self._uses.pop(key, None)
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def acquire(self, platform: str, account: str = "default", headless: bool = False, **context_options) -> BrowserLease:
+        """租用一个上下文，同一 平台+账号 被占用时等待其释放
+
+        context_options 会在新建上下文时传给 browser.new_context
+        """
+        key = (platform, account, headless)
+        key_lock = self._key_locks.setdefault(key, asyncio.Lock())
+        await key_lock.acquire()
+        try:
+            async with self._lock:
+                browser = await self._get_browser(headless)
+                if key in self._contexts and self._should_recycle(key):
+                    await self._close_context(key)
+
+                context = self._contexts.get(key)
+                fresh = context is None
+                if fresh:
+                    options = {"no_viewport": True, "user_agent": USER_AGENT, **context_options}
+                    context = await browser.new_context(**options)
+                    await apply_stealth(context)
+                    self._contexts[key] = context
+                    self._uses[key] = 0
+                    print_info(f"已创建浏览器上下文: {platform}/{account}")
+            return BrowserLease(key, context, fresh)
+        except BaseException:
+            key_lock.release()
+            raise
+
+    async def release(self, lease: BrowserLease, recycle: bool = False):
+        """归还上下文，recycle=True 时立即关闭（例如登录状态异常）"""
+        try:
+            async with self._lock:
+                if self._contexts.get(lease.key) is lease.context:
+                    self._uses[lease.key] = self._uses.get(lease.key, 0) + 1
+                    if recycle or self._should_recycle(lease.key):
+                        await self._close_context(lease.key)
+        finally:
+            self._key_locks[lease.key].release()
+
+    async def close(self):
+        """关闭所有上下文和浏览器"""
+        async with self._lock:
+            for key in list(self._contexts):
+                await self._close_context(key)
+            for browser in self._browsers.values():
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+            self._browsers = {}
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+
+
+_pool: BrowserPool | None = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程内共享的浏览器池"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+async def close_browser_pool():
+    """关闭共享浏览器池（程序退出前调用）"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
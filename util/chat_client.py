@@ -1,7 +1,13 @@
 import asyncio
 from ai_client import create_client
 
+_client = None
+
+
 async def chat(message: str) -> str:
-    client = create_client()
-    response = await client.chat(message)
-    return response
\ No newline at end of file
+    # 复用同一个客户端，开启 AI_CACHE 时进程内缓存才能命中
+    global _client
+    if _client is None:
+        _client = create_client()
+    response = await _client.chat(message)
+    return response
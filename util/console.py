@@ -1,8 +1,11 @@
 """终端美化输出工具 - 支持 Markdown 渲染"""
 
+from typing import AsyncIterator
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.live import Live
+from rich.text import Text
 
 # 全局 Console 实例
 console = Console()
@@ -31,6 +34,27 @@ def print_ai_response(text: str, title: str = "AI 回复"):
     console.print(panel)
 
 
+async def print_ai_stream(stream: AsyncIterator[str], title: str = "AI 回复") -> str:
+    """流式输出 AI 响应，边接收边渲染 Markdown，返回完整回复
+    
+    用法:
+        from util.console import print_ai_stream
+        response = await print_ai_stream(client.stream_chat_history("你好"), title="Gemini")
+    """
+    parts = []
+    
+    def render():
+        if not parts:
+            return Panel(Text("思考中...", style="dim"), title=title, border_style="cyan")
+        return Panel(Markdown("".join(parts)), title=title, border_style="cyan")
+    
+    # 按刷新频率渲染，避免每个 token 都重新解析 Markdown
+    with Live(get_renderable=render, console=console, refresh_per_second=8, vertical_overflow="visible"):
+        async for delta in stream:
+            parts.append(delta)
+    return "".join(parts)
+
+
 def print_success(text: str):
     """打印成功消息（绿色）"""
     console.print(f"[green]✅ {text}[/green]")
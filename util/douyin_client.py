@@ -10,11 +10,20 @@ from .stealth import (
     remove_popups, find_visible_element, upload_files_visible
 )
 from .console import print_success, print_error, print_info, print_warning
+from .browser_pool import BrowserPool, BrowserLease
+from .page_wait import UploadTracker, WaitReport, wait_for_attached
+from .route_policy import install_route_policy, print_route_stats
+from .session_state import context_options, restore_session, save_session, check_session, invalidate
 
 # 抖音创作者平台地址
 DOUYIN_CREATOR_URL = "https://creator.douyin.com"
 DOUYIN_UPLOAD_URL = "https://creator.douyin.com/creator-micro/content/upload"
 
+# 上传就绪信号：上传接口、图片缩略图、上传进度元素
+DOUYIN_UPLOAD_API_PATTERN = r"imagex|ImageUpload|/upload"
+DOUYIN_THUMB_SELECTOR = '[class*="image-item"] img, [class*="img-card"] img, [class*="preview"] img'
+DOUYIN_PROGRESS_SELECTOR = '[class*="progress"], [class*="uploading"]'
+
 # Cookie 存储路径
 COOKIE_FILE = os.getenv("DOUYIN_COOKIE_FILE", "douyin_cookies.json")
 
@@ -104,10 +113,13 @@ async def upload_images(
     """上传图文到抖音（带人类行为模拟）"""
     print_info(f"正在上传图文: {title}")
     
+    report = WaitReport("抖音")
     try:
         await page.goto(DOUYIN_UPLOAD_URL)
         await page.wait_for_load_state("networkidle")
-        await human_delay(2000, 4000)
+        # 原固定延时为 2000~4000 毫秒，以其上限作为超时
+        await report.wait("进入发布页", wait_for_attached(page, 'div[class*="tab-item"], input[type="file"]', timeout=4000), 3000)
+        await human_delay(300, 800)
         
         await remove_popups(page)
         
@@ -131,9 +143,18 @@ async def upload_images(
         
         print_info(f"正在上传 {len(image_paths)} 张图片...")
         
+        tracker = UploadTracker(page, DOUYIN_UPLOAD_API_PATTERN)
         await upload_files_visible(page, 'input[type="file"][accept*="image"]', image_paths)
         
-        await human_delay(3000 + len(image_paths) * 1500, 5000 + len(image_paths) * 2500)
+        # 原固定延时为 3000+1500n ~ 5000+2500n 毫秒，现以其上限作为超时
+        max_wait = 5000 + len(image_paths) * 2500
+        budget = (3000 + 5000) / 2 + len(image_paths) * (1500 + 2500) / 2
+        await report.wait(
+            "图片上传",
+            tracker.wait(len(image_paths), DOUYIN_THUMB_SELECTOR, DOUYIN_PROGRESS_SELECTOR, timeout=max_wait),
+            budget
+        )
+        await human_delay(300, 800)
         print_success("图片上传完成")
         
         title_input = await find_visible_element(page, 'input[placeholder*="标题"]')
@@ -160,6 +181,7 @@ async def upload_images(
         
         await human_delay(800, 1500)
         
+        report.print()
         print_success("内容已填写完成！")
         print_info("请在浏览器中检查内容，手动点击发布按钮")
         print_info("关闭浏览器后程序将继续...")
@@ -174,8 +196,14 @@ async def upload_images(
 class DouyinClient:
     """抖音客户端封装"""
     
-    def __init__(self, headless: bool = False):
+    PLATFORM = "douyin"
+    
+    def __init__(self, headless: bool = False, pool: BrowserPool = None, account: str = "default"):
+        """pool 不为空时从浏览器池租用上下文，否则独立启动浏览器"""
         self.headless = headless
+        self.pool = pool
+        self.account = account
+        self.lease: BrowserLease = None
         self.playwright = None
         self.browser = None
         self.context = None
@@ -183,6 +211,18 @@ class DouyinClient:
     
     async def start(self):
         """启动浏览器（带反检测）"""
+        if self.pool:
+            self.lease = await self.pool.acquire(
+                self.PLATFORM, self.account, self.headless, **context_options(self.PLATFORM, self.account)
+            )
+            self.context = self.lease.context
+            # 优先使用完整的登录状态，没有时退回到 cookies 文件
+            if self.lease.fresh and not await restore_session(self.context, self.PLATFORM, self.account):
+                await load_cookies(self.context)
+            await install_route_policy(self.context, self.PLATFORM)
+            self.page = await self.context.new_page()
+            return
+        
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
             headless=self.headless,
@@ -193,27 +233,56 @@ class DouyinClient:
         )
         self.context = await self.browser.new_context(
             no_viewport=True,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            **context_options(self.PLATFORM, self.account)
         )
         
         await apply_stealth(self.context)
         
-        self.page = await self.context.new_page()
+        if not await restore_session(self.context, self.PLATFORM, self.account):
+            await load_cookies(self.context)
+        await install_route_policy(self.context, self.PLATFORM)
         
-        await load_cookies(self.context)
+        self.page = await self.context.new_page()
+    
+    async def _release(self):
+        """关闭页面并归还租用的上下文"""
+        lease, self.lease = self.lease, None
+        try:
+            if self.page and not self.page.is_closed():
+                await self.page.close()
+        except Exception:
+            pass
+        await self.pool.release(lease)
     
     async def close(self):
-        """关闭浏览器"""
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        """关闭浏览器（租用模式下归还上下文）"""
+        if self.lease:
+            await self._release()
+            return
+        # 置空后再关闭，重复调用（如 wait_for_close 之后）时直接返回
+        browser, self.browser = self.browser, None
+        playwright, self.playwright = self.playwright, None
+        if browser:
+            await browser.close()
+        if playwright:
+            await playwright.stop()
     
     async def check_login(self) -> bool:
-        return await check_login(self.page)
+        """优先用缓存和接口判断登录状态，无法判断时再打开页面检查"""
+        status = await check_session(self.context, self.PLATFORM, self.account)
+        if status is not None:
+            return status
+        is_logged_in = await check_login(self.page)
+        if is_logged_in:
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        return is_logged_in
     
     async def login(self) -> bool:
-        return await login_with_qrcode(self.page, self.context)
+        success = await login_with_qrcode(self.page, self.context)
+        if success:
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        return success
     
     async def wait_for_manual_login(self):
         """等待用户手动完成登录（不刷新页面）"""
@@ -232,10 +301,18 @@ class DouyinClient:
         
         # 保存 cookies（不刷新页面）
         await save_cookies(self.context)
-        print_success("已保存登录状态")
+        await save_session(self.context, self.PLATFORM, self.account, self.page)
     
     async def upload_images(self, image_paths: list[str], title: str, content: str = "", tags: list[str] = None) -> bool:
-        return await upload_images(self.page, image_paths, title, content, tags)
+        success = await upload_images(self.page, image_paths, title, content, tags)
+        print_route_stats(self.context)
+        if success:
+            # 登录 cookie 可能已续期，刷新保存的登录状态
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        else:
+            # 可能是登录失效导致，下次重新探测
+            invalidate(self.PLATFORM, self.account)
+        return success
     
     async def wait_for_close(self):
         """等待用户关闭浏览器"""
@@ -245,11 +322,13 @@ class DouyinClient:
             except:
                 pass
         
+        if self.lease:
+            await self._release()
+            print_info("页面已关闭")
+            return
+        
         try:
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+            await self.close()
         except:
             pass
         
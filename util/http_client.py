@@ -0,0 +1,72 @@
+"""共享 HTTP 客户端 - 连接池 + keep-alive，可用时启用 HTTP/2
+
+按用途划分的命名连接池，同一事件循环内共用，避免每次请求都重新建立 TCP/TLS 连接:
+    default: PicList、小红书 MCP 等本地/远程 HTTP 服务（HTTP_*）
+    openai:  OpenAI 兼容接口，传给 AsyncOpenAI 的 http_client（OPENAI_*，超时更长）
+
+使用方法:
+    client = get_http_client()
+    response = await client.get(url, timeout=30.0)
+    openai_pool = get_http_client("openai")
+
+    # 程序退出前，关闭当前事件循环的全部连接池
+    await close_http_client()
+"""
+
+import os
+import asyncio
+import weakref
+import httpx
+
+try:
+    import h2  # noqa: F401  HTTP/2 需要 httpx[http2]
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))
+MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", 10))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 120))
+
+# 各连接池的配置
+POOLS = {
+    "default": {
+        "http2": HTTP2_ENABLED and HTTP2_AVAILABLE,
+        "limits": httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE, keepalive_expiry=KEEPALIVE_EXPIRY),
+        "timeout": httpx.Timeout(30.0),
+    },
+    "openai": {
+        "http2": False,
+        "limits": httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE, keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY),
+        "timeout": httpx.Timeout(OPENAI_TIMEOUT, connect=10.0),
+    },
+}
+
+# httpx 连接绑定事件循环，每个事件循环一组共享客户端（名称 → 客户端）
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    """获取当前事件循环的共享 HTTP 客户端，超时时间可在每次请求时指定"""
+    if name not in POOLS:
+        raise ValueError(f"未知的连接池: {name}")
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(name)
+    if client is None or client.is_closed:
+        client = clients[name] = httpx.AsyncClient(**POOLS[name])
+    return client
+
+
+async def close_http_client():
+    """关闭当前事件循环的全部共享 HTTP 客户端（程序退出前调用）"""
+    loop = asyncio.get_running_loop()
+    for client in (_clients.pop(loop, None) or {}).values():
+        if not client.is_closed:
+            await client.aclose()
@@ -0,0 +1,196 @@
+"""图片优化 - 上传/发布前按平台生成压缩后的衍生图
+
+生成的 PNG 是全分辨率大图，各平台收到后都会再压缩一次。这里在上传前统一处理:
+    - 缩放到平台推荐分辨率（只缩小不放大）
+    - 比例偏离 3:4 超过容差时居中裁剪
+    - 转为 JPEG/WebP，去除 EXIF 等元数据
+    - 超过体积上限时逐步降低质量
+处理在进程池中并行执行，结果按 源文件哈希 + 平台参数 缓存在 data/image_cache/，相同图片不重复处理。
+
+使用方法:
+    image_paths = await optimize_images(png_files, "xiaohongshu")
+
+    # 程序退出前
+    close_image_pool()
+"""
+
+import io
+import os
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from .console import console, print_warning
+from .upload_cache import file_hash
+from .metrics import span, inc
+from .paths import DATA_DIR
+
+CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(DATA_DIR, "image_cache"))
+OPTIMIZE_ENABLED = os.getenv("IMAGE_OPTIMIZE", "true").lower() in ("1", "true", "yes")
+# 进程池大小，0 表示使用 CPU 核数
+OPTIMIZE_WORKERS = int(os.getenv("IMAGE_OPTIMIZE_WORKERS", 0)) or None
+
+# 各平台的衍生图参数
+#   width/height: 目标分辨率（3:4）
+#   format: JPEG 或 WEBP
+#   quality: 初始质量，超过 max_bytes 时按 quality_step 递减，不低于 min_quality
+#   aspect_tolerance: 允许偏离 3:4 的比例，超出时居中裁剪
+PROFILES = {
+    "xiaohongshu": {"width": 1080, "height": 1440, "format": "JPEG", "quality": 88, "min_quality": 70, "max_bytes": 2 * 1024 * 1024},
+    "douyin": {"width": 1080, "height": 1440, "format": "JPEG", "quality": 88, "min_quality": 70, "max_bytes": 2 * 1024 * 1024},
+    "weixin": {"width": 1080, "height": 1440, "format": "JPEG", "quality": 85, "min_quality": 65, "max_bytes": 1536 * 1024},
+    # 图床（小红书 MCP 按 URL 下载图片发布）
+    "piclist": {"width": 1080, "height": 1440, "format": "JPEG", "quality": 85, "min_quality": 65, "max_bytes": 1024 * 1024},
+}
+PROFILE_DEFAULTS = {"quality_step": 5, "aspect_tolerance": 0.02}
+
+_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _profile(platform: str) -> dict:
+    if platform not in PROFILES:
+        raise ValueError(f"不支持的图片优化平台: {platform}")
+    return {**PROFILE_DEFAULTS, **PROFILES[platform]}
+
+
+def _profile_signature(profile: dict) -> str:
+    """参数变化时缓存自动失效"""
+    text = json.dumps(profile, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+
+
+def _crop_to_aspect(img, ratio: float, tolerance: float):
+    """比例偏离超过容差时按目标比例居中裁剪"""
+    width, height = img.size
+    current = width / height
+    if abs(current - ratio) / ratio <= tolerance:
+        return img
+    if current > ratio:
+        new_width = round(height * ratio)
+        left = (width - new_width) // 2
+        return img.crop((left, 0, left + new_width, height))
+    new_height = round(width / ratio)
+    top = (height - new_height) // 2
+    return img.crop((0, top, width, top + new_height))
+
+
+def _encode(img, profile: dict) -> tuple[bytes, int]:
+    """按体积上限编码，返回 (图片数据, 实际质量)"""
+    quality = profile["quality"]
+    while True:
+        buffer = io.BytesIO()
+        # 不传 exif/icc_profile，元数据不会写入
+        img.save(buffer, format=profile["format"], quality=quality, optimize=True, progressive=True)
+        data = buffer.getvalue()
+        if len(data) <= profile["max_bytes"] or quality - profile["quality_step"] < profile["min_quality"]:
+            return data, quality
+        quality -= profile["quality_step"]
+
+
+def _optimize_one(src: str, profile: dict, cache_dir: str) -> dict:
+    """在子进程中处理一张图片，命中缓存时直接返回"""
+    from PIL import Image, ImageOps
+
+    extension = _EXTENSIONS[profile["format"]]
+    dst = os.path.join(cache_dir, f"{file_hash(src)[:32]}_{_profile_signature(profile)}{extension}")
+    src_bytes = os.path.getsize(src)
+    if os.path.exists(dst):
+        return {"path": dst, "src_bytes": src_bytes, "bytes": os.path.getsize(dst), "cached": True}
+
+    with Image.open(src) as original:
+        img = ImageOps.exif_transpose(original)
+        if img.mode in ("RGBA", "LA", "P"):
+            # JPEG 不支持透明通道，透明部分填充白色
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+    target_ratio = profile["width"] / profile["height"]
+    img = _crop_to_aspect(img, target_ratio, profile["aspect_tolerance"])
+    if img.width > profile["width"]:
+        img = img.resize((profile["width"], round(img.height * profile["width"] / img.width)), Image.LANCZOS)
+
+    data, quality = _encode(img, profile)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{dst}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, dst)
+    return {
+        "path": dst,
+        "src_bytes": src_bytes,
+        "bytes": len(data),
+        "cached": False,
+        "quality": quality,
+        "over_limit": len(data) > profile["max_bytes"],
+    }
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=OPTIMIZE_WORKERS)
+    return _executor
+
+
+async def optimize_images(image_paths: list[str], platform: str) -> list[str]:
+    """为指定平台生成衍生图，返回与 image_paths 一一对应的路径
+
+    未启用、缺少 Pillow 或单张处理失败时，对应位置返回原图路径。
+    """
+    if not OPTIMIZE_ENABLED or not image_paths:
+        return list(image_paths)
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print_warning("未安装 Pillow，跳过图片优化")
+        return list(image_paths)
+
+    profile = _profile(platform)
+    cache_dir = os.path.join(CACHE_DIR, platform)
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    with span("optimize_images", platform=platform) as optimize_span:
+        optimize_span.set(images=len(image_paths))
+        results = await asyncio.gather(
+            *[loop.run_in_executor(executor, _optimize_one, path, profile, cache_dir) for path in image_paths],
+            return_exceptions=True
+        )
+
+    optimized = []
+    src_total = dst_total = cached = 0
+    for path, result in zip(image_paths, results):
+        if isinstance(result, BaseException):
+            print_warning(f"图片优化失败，使用原图 {os.path.basename(path)}: {result}")
+            optimized.append(path)
+            size = os.path.getsize(path)
+            src_total, dst_total = src_total + size, dst_total + size
+            continue
+        if result.get("over_limit"):
+            print_warning(f"{os.path.basename(path)} 压缩到最低质量仍超过 {profile['max_bytes'] // 1024}KB")
+        optimized.append(result["path"])
+        src_total += result["src_bytes"]
+        dst_total += result["bytes"]
+        cached += result["cached"]
+
+    inc("image_optimize_saved_bytes_total", max(0, src_total - dst_total), platform=platform)
+    ratio = src_total / dst_total if dst_total else 1
+    console.print(
+        f"[dim]🗜️ {platform} 图片优化: {len(image_paths)} 张，{src_total / 1024 / 1024:.1f}MB → "
+        f"{dst_total / 1024 / 1024:.1f}MB（{ratio:.1f}x），缓存命中 {cached} 张[/dim]"
+    )
+    return optimized
+
+
+def close_image_pool():
+    """关闭图片处理进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
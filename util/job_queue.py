@@ -0,0 +1,453 @@
+"""分布式任务队列 - 基于 Redis 列表 + 有序集合的可靠队列
+
+每个阶段（content / images / upload / publish）一个队列，多台机器上的 worker 可以同时消费:
+    <prefix><stage>:ready       待处理的任务 ID（列表，LPUSH 入队，RPOPLPUSH 取出）
+    <prefix><stage>:processing  已取出、处理中的任务 ID（列表）
+    <prefix><stage>:leases      任务租约（有序集合，分数为租约到期时间）
+    <prefix><stage>:dead        重试耗尽的任务 ID（死信队列）
+    <prefix>job:<id>            任务内容（哈希：payload、stage、attempts、last_error、leased_at）
+    <prefix>workers             worker 心跳（哈希：worker ID → JSON）
+
+租约到期未确认（worker 崩溃或卡住）的任务会被 reap() 放回队列；处理中的 worker 通过 extend() 续租。
+取出任务和加租约在同一个 Lua 脚本中完成（LEASE_SCRIPT），不会出现取出后没有租约的任务。
+使用异步 Redis 客户端（util/redis_client.py），同一操作的多条命令通过流水线合并为一次往返。
+测试时可以用 InMemoryRedis 代替真实的 Redis（JOB_QUEUE_BACKEND=memory）。
+
+使用方法:
+    queue = get_job_queue()
+    job_id = await queue.enqueue("images", {"file_path": "output/xxx"})
+
+    job = await queue.lease("images", worker_id)
+    try:
+        ...
+        await queue.ack(job)
+    except Exception as e:
+        await queue.nack(job, str(e))
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import weakref
+import threading
+
+QUEUE_PREFIX = os.getenv("JOB_QUEUE_PREFIX", "xhs:queue:")
+QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "redis")
+# 租约时长（秒），处理中的任务需要在到期前续租
+VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", 300))
+# 最多尝试次数，超过后进入死信队列
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# worker 心跳超过该时间（秒）视为离线
+HEARTBEAT_TTL = int(os.getenv("JOB_HEARTBEAT_TTL", 60))
+
+QUEUE_STAGES = ("content", "images", "upload", "publish")
+
+# 原子取出任务并加租约
+#   KEYS: ready, processing, leases
+#   ARGV: 当前时间, 租约到期时间, worker ID, 任务键前缀
+# 任务内容已丢失（例如被手动删除）的 ID 直接丢弃并继续取下一个，不会重新创建任务哈希
+LEASE_SCRIPT = """
+while true do
+    local job_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+    if not job_id then
+        return nil
+    end
+    local job_key = ARGV[4] .. job_id
+    local payload = redis.call('HGET', job_key, 'payload')
+    if payload then
+        redis.call('ZADD', KEYS[3], ARGV[2], job_id)
+        local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+        redis.call('HSET', job_key, 'leased_at', ARGV[1], 'worker', ARGV[3])
+        return {job_id, attempts, payload}
+    end
+    redis.call('LREM', KEYS[2], 0, job_id)
+end
+"""
+
+
+class Job:
+    """从队列中取出的任务"""
+
+    def __init__(self, job_id: str, stage: str, payload: dict, attempts: int):
+        self.id = job_id
+        self.stage = stage
+        self.payload = payload
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.stage}, attempts={self.attempts})"
+
+
+class _InMemoryPipeline:
+    """InMemoryRedis 的流水线：记录命令，execute 时依次执行"""
+
+    def __init__(self, redis: "InMemoryRedis"):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._redis, name)
+
+        def queue_command(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue_command
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        with self._redis._lock:
+            return [method(*args, **kwargs) for method, args, kwargs in commands]
+
+
+class InMemoryRedis:
+    """进程内的 Redis 替身，只实现任务队列用到的命令（decode_responses=True 语义）
+
+    与 redis.asyncio 一样通过 pipeline() 发出命令。
+    """
+
+    def __init__(self):
+        self._data: dict[str, object] = {}
+        self._lock = threading.RLock()
+
+    def pipeline(self, transaction: bool = False) -> _InMemoryPipeline:
+        return _InMemoryPipeline(self)
+
+    def register_script(self, script: str):
+        """只支持任务队列的 Lua 脚本，用等价的 Python 实现代替"""
+        implementations = {LEASE_SCRIPT: self._lease_script}
+        func = implementations[script]
+
+        async def run(keys: list = (), args: list = ()):
+            with self._lock:
+                return func(list(keys), list(args))
+        return run
+
+    def _lease_script(self, keys: list, args: list) -> list | None:
+        ready, processing, leases = keys
+        now, deadline, worker_id, job_prefix = args
+        while (job_id := self.rpoplpush(ready, processing)) is not None:
+            job_key = job_prefix + job_id
+            payload = self.hget(job_key, "payload")
+            if payload is not None:
+                self.zadd(leases, {job_id: float(deadline)})
+                attempts = self.hincrby(job_key, "attempts", 1)
+                self.hset(job_key, mapping={"leased_at": now, "worker": worker_id})
+                return [job_id, attempts, payload]
+            self.lrem(processing, 0, job_id)
+        return None
+
+    def _get(self, key: str, kind: type):
+        value = self._data.get(key)
+        if value is None:
+            value = kind()
+            self._data[key] = value
+        return value
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def lpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            items = self._get(key, list)
+            for value in values:
+                items.insert(0, value)
+            return len(items)
+
+    def rpoplpush(self, src: str, dst: str) -> str | None:
+        with self._lock:
+            items = self._data.get(src)
+            if not items:
+                return None
+            value = items.pop()
+            self._get(dst, list).insert(0, value)
+            return value
+
+    def lrem(self, key: str, count: int, value: str) -> int:
+        with self._lock:
+            items = self._data.get(key) or []
+            removed = 0
+            while value in items and (count == 0 or removed < abs(count)):
+                items.remove(value)
+                removed += 1
+            return removed
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        with self._lock:
+            items = self._data.get(key) or []
+            return list(items[start:None if end == -1 else end + 1])
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            return len(self._data.get(key) or [])
+
+    def zadd(self, key: str, mapping: dict[str, float], xx: bool = False) -> int:
+        with self._lock:
+            scores = self._get(key, dict)
+            added = 0
+            for member, score in mapping.items():
+                if xx and member not in scores:
+                    continue
+                added += member not in scores
+                scores[member] = score
+            return added
+
+    def zrem(self, key: str, *members: str) -> int:
+        with self._lock:
+            scores = self._data.get(key) or {}
+            return sum(scores.pop(member, None) is not None for member in members)
+
+    def zscore(self, key: str, member: str) -> float | None:
+        with self._lock:
+            return (self._data.get(key) or {}).get(member)
+
+    def zrangebyscore(self, key: str, min_score: float, max_score: float) -> list[str]:
+        with self._lock:
+            scores = self._data.get(key) or {}
+            return [m for m, s in sorted(scores.items(), key=lambda item: item[1]) if min_score <= s <= max_score]
+
+    def zcard(self, key: str) -> int:
+        with self._lock:
+            return len(self._data.get(key) or {})
+
+    def hset(self, key: str, field: str = None, value: str = None, mapping: dict = None) -> int:
+        with self._lock:
+            fields = self._get(key, dict)
+            updates = dict(mapping or {})
+            if field is not None:
+                updates[field] = value
+            added = sum(f not in fields for f in updates)
+            fields.update({f: str(v) for f, v in updates.items()})
+            return added
+
+    def hget(self, key: str, field: str) -> str | None:
+        with self._lock:
+            return (self._data.get(key) or {}).get(field)
+
+    def hgetall(self, key: str) -> dict[str, str]:
+        with self._lock:
+            return dict(self._data.get(key) or {})
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._get(key, dict)
+            fields[field] = str(int(fields.get(field, 0)) + amount)
+            return int(fields[field])
+
+    def hdel(self, key: str, *fields: str) -> int:
+        with self._lock:
+            values = self._data.get(key) or {}
+            return sum(values.pop(f, None) is not None for f in fields)
+
+
+class JobQueue:
+    """按阶段划分的可靠任务队列
+
+    参数:
+        redis: redis.asyncio.Redis（decode_responses=True）或 InMemoryRedis
+        visibility_timeout: 租约时长（秒）
+        max_attempts: 最多尝试次数
+    """
+
+    def __init__(self, redis, prefix: str = QUEUE_PREFIX, visibility_timeout: int = VISIBILITY_TIMEOUT, max_attempts: int = MAX_ATTEMPTS):
+        self.redis = redis
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lease_script = redis.register_script(LEASE_SCRIPT)
+
+    def _key(self, stage: str, name: str) -> str:
+        return f"{self.prefix}{stage}:{name}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _pipe(self):
+        return self.redis.pipeline(transaction=False)
+
+    async def _call(self, command: str, *args, **kwargs):
+        """执行单条命令"""
+        pipe = self._pipe()
+        getattr(pipe, command)(*args, **kwargs)
+        return (await pipe.execute())[0]
+
+    async def enqueue(self, stage: str, payload: dict, job_id: str = None) -> str:
+        """加入阶段队列，返回任务 ID"""
+        if stage not in QUEUE_STAGES:
+            raise ValueError(f"不支持的队列阶段: {stage}")
+        job_id = job_id or uuid.uuid4().hex
+        pipe = self._pipe()
+        pipe.hset(self._job_key(job_id), mapping={
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "stage": stage,
+            "attempts": 0,
+            "enqueued_at": time.time(),
+        })
+        pipe.lpush(self._key(stage, "ready"), job_id)
+        await pipe.execute()
+        return job_id
+
+    async def lease(self, stage: str, worker_id: str = None, visibility_timeout: int = None) -> Job | None:
+        """取出一个任务并加租约，队列为空时返回 None"""
+        now = time.time()
+        result = await self._lease_script(
+            keys=[self._key(stage, "ready"), self._key(stage, "processing"), self._key(stage, "leases")],
+            args=[now, now + (visibility_timeout or self.visibility_timeout), worker_id or "", self._job_key("")],
+        )
+        if result is None:
+            return None
+        job_id, attempts, payload = result
+        return Job(job_id, stage, json.loads(payload), int(attempts))
+
+    async def extend(self, job: Job, visibility_timeout: int = None) -> bool:
+        """续租，租约已被回收时返回 False"""
+        deadline = time.time() + (visibility_timeout or self.visibility_timeout)
+        # xx=True 只更新已存在的租约；返回值为 0（没有新增），用 zscore 判断租约是否还在
+        pipe = self._pipe()
+        pipe.zadd(self._key(job.stage, "leases"), {job.id: deadline}, xx=True)
+        pipe.zscore(self._key(job.stage, "leases"), job.id)
+        _, score = await pipe.execute()
+        return score is not None
+
+    async def _finish(self, stage: str, job_id: str) -> bool:
+        """移除租约和处理中记录，返回本次调用是否持有租约"""
+        pipe = self._pipe()
+        pipe.zrem(self._key(stage, "leases"), job_id)
+        pipe.lrem(self._key(stage, "processing"), 0, job_id)
+        removed, _ = await pipe.execute()
+        return removed > 0
+
+    async def ack(self, job: Job):
+        """确认完成，删除任务"""
+        pipe = self._pipe()
+        pipe.zrem(self._key(job.stage, "leases"), job.id)
+        pipe.lrem(self._key(job.stage, "processing"), 0, job.id)
+        pipe.delete(self._job_key(job.id))
+        await pipe.execute()
+
+    async def nack(self, job: Job, error: str = None, retry: bool = True, payload: dict = None):
+        """处理失败：未超过最多尝试次数时放回队列，否则进入死信队列
+
+        租约已过期并被 reap() 回收时（任务已放回队列）不再重复处理。
+        payload 不为空时同时更新任务内容（如记录已完成的部分，重试时跳过）
+        """
+        if await self._finish(job.stage, job.id):
+            await self._retry_or_bury(job.stage, job.id, error, retry, payload)
+
+    async def _retry_or_bury(self, stage: str, job_id: str, error: str = None, retry: bool = True, payload: dict = None):
+        job_key = self._job_key(job_id)
+        pipe = self._pipe()
+        pipe.hget(job_key, "attempts")
+        pipe.hget(job_key, "payload")
+        attempts, stored = await pipe.execute()
+        if stored is None:
+            # 任务内容已丢失，直接丢弃（不写 last_error，避免重新创建任务哈希）
+            return
+        attempts = int(attempts or 0)
+        target = "ready" if retry and attempts < self.max_attempts else "dead"
+        pipe = self._pipe()
+        if error:
+            pipe.hset(job_key, "last_error", error)
+        if payload is not None:
+            pipe.hset(job_key, "payload", json.dumps(payload, ensure_ascii=False))
+        pipe.lpush(self._key(stage, target), job_id)
+        await pipe.execute()
+
+    async def reap(self, stage: str) -> int:
+        """回收租约已过期的任务，返回回收数量"""
+        now = time.time()
+        reaped = 0
+        for job_id in await self._call("zrangebyscore", self._key(stage, "leases"), 0, now):
+            # zrem 成功的一方负责回收，避免多个 worker 重复放回
+            if await self._finish(stage, job_id):
+                await self._retry_or_bury(stage, job_id, "租约过期")
+                reaped += 1
+
+        # 处理中列表里没有租约的任务（例如租约记录被手动删除）
+        processing = await self._call("lrange", self._key(stage, "processing"), 0, -1)
+        if not processing:
+            return reaped
+        pipe = self._pipe()
+        for job_id in processing:
+            pipe.zscore(self._key(stage, "leases"), job_id)
+            pipe.hget(self._job_key(job_id), "leased_at")
+        results = await pipe.execute()
+        for index, job_id in enumerate(processing):
+            score, leased_at = results[index * 2], results[index * 2 + 1]
+            if score is not None or now - float(leased_at or 0) <= self.visibility_timeout:
+                continue
+            if await self._call("lrem", self._key(stage, "processing"), 1, job_id):
+                await self._retry_or_bury(stage, job_id, "租约丢失")
+                reaped += 1
+        return reaped
+
+    async def dead_letters(self, stage: str) -> list[dict]:
+        """死信队列中的任务"""
+        job_ids = await self._call("lrange", self._key(stage, "dead"), 0, -1)
+        pipe = self._pipe()
+        for job_id in job_ids:
+            pipe.hgetall(self._job_key(job_id))
+        jobs = []
+        for job_id, data in zip(job_ids, await pipe.execute() if job_ids else []):
+            jobs.append({"id": job_id, "attempts": int(data.get("attempts", 0)), "error": data.get("last_error"),
+                         "payload": json.loads(data["payload"]) if "payload" in data else None})
+        return jobs
+
+    async def retry_dead(self, stage: str) -> int:
+        """把死信队列中的任务重新放回队列（重置尝试次数）"""
+        count = 0
+        while (job_id := await self._call("rpoplpush", self._key(stage, "dead"), self._key(stage, "ready"))) is not None:
+            await self._call("hset", self._job_key(job_id), "attempts", 0)
+            count += 1
+        return count
+
+    async def heartbeat(self, worker_id: str, info: dict = None):
+        """记录 worker 心跳"""
+        await self._call("hset", f"{self.prefix}workers", worker_id, json.dumps({"ts": time.time(), **(info or {})}, ensure_ascii=False))
+
+    async def remove_worker(self, worker_id: str):
+        await self._call("hdel", f"{self.prefix}workers", worker_id)
+
+    async def workers(self) -> list[dict]:
+        """全部 worker 及其是否在线"""
+        now = time.time()
+        result = []
+        for worker_id, raw in (await self._call("hgetall", f"{self.prefix}workers")).items():
+            info = json.loads(raw)
+            result.append({"id": worker_id, "alive": now - info["ts"] < HEARTBEAT_TTL, **info})
+        return result
+
+    async def stats(self) -> dict[str, dict[str, int]]:
+        """各阶段的排队、处理中、死信数量（一次往返）"""
+        pipe = self._pipe()
+        for stage in QUEUE_STAGES:
+            pipe.llen(self._key(stage, "ready"))
+            pipe.zcard(self._key(stage, "leases"))
+            pipe.llen(self._key(stage, "dead"))
+        results = await pipe.execute()
+        return {
+            stage: dict(zip(("ready", "processing", "dead"), results[index * 3:index * 3 + 3]))
+            for index, stage in enumerate(QUEUE_STAGES)
+        }
+
+
+_memory_redis: InMemoryRedis | None = None
+_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, JobQueue]" = weakref.WeakKeyDictionary()
+
+
+def get_job_queue() -> JobQueue:
+    """获取当前事件循环的任务队列（JOB_QUEUE_BACKEND=memory 时使用进程内替身）"""
+    global _memory_redis
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        if QUEUE_BACKEND == "memory":
+            _memory_redis = _memory_redis or InMemoryRedis()
+            queue = JobQueue(_memory_redis)
+        else:
+            from .redis_client import get_async_redis
+            queue = JobQueue(get_async_redis().client)
+        _queues[loop] = queue
+    return queue
@@ -5,25 +5,194 @@ import json
 import os
 
 
-def extract_json(text: str) -> dict:
+# 小红书图文内容的字段及类型
+POST_SCHEMA = {
+    "title": str,
+    "tags": list,
+    "image_prompt": list,
+    "content": str,
+}
+
+# 缺少逗号：上一个值结束后换行紧接下一个键，如 "image_prompt": [...]\n "content": "..."
+_MISSING_COMMA_RE = re.compile(r'(["\]\}]|\d|true|false|null)(\s*\n\s*)(")')
+# 多余的尾逗号
+_TRAILING_COMMA_RE = re.compile(r',(\s*[\]\}])')
+# 代码块开头，出现时从代码块内部重新查找（前面说明文字里不成对的括号不影响解析）
+_FENCE = "```json"
+
+
+def _escape_newlines_in_strings(text: str) -> str:
+    """把字符串内部的原始换行替换为 \\n（模型常在文案里直接换行）"""
+    result = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                result.append("\\n")
+                continue
+            elif ch == "\r":
+                continue
+        elif ch == '"':
+            in_string = True
+        result.append(ch)
+    return "".join(result)
+
+
+def repair_json(text: str) -> str:
+    """修复模型输出中常见的 JSON 错误：字符串内换行、键之间缺少逗号、尾逗号"""
+    text = _escape_newlines_in_strings(text)
+    text = _MISSING_COMMA_RE.sub(r"\1,\2\3", text)
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+
+def validate_post(data: dict) -> list[str]:
+    """按 POST_SCHEMA 校验内容，返回错误列表（为空表示通过）
+
+    tags 为字符串时会就地拆分为列表
+    """
+    if not isinstance(data, dict):
+        return ["不是 JSON 对象"]
+    if isinstance(data.get("tags"), str):
+        data["tags"] = [tag for tag in re.split(r"[\s,，#]+", data["tags"]) if tag]
+    errors = []
+    for field, field_type in POST_SCHEMA.items():
+        if field not in data:
+            errors.append(f"缺少字段 {field}")
+        elif not isinstance(data[field], field_type):
+            errors.append(f"字段 {field} 类型应为 {field_type.__name__}")
+        elif field_type is list and not all(isinstance(item, str) for item in data[field]):
+            errors.append(f"字段 {field} 的元素应为字符串")
+    if not errors and not data["image_prompt"]:
+        errors.append("image_prompt 不能为空")
+    return errors
+
+
+class JsonStreamExtractor:
+    """增量 JSON 提取器，可以边接收模型输出边解析
+
+    逐字符跟踪括号深度和字符串状态，一旦出现完整的顶层对象就尝试解析（必要时修复），
+    不需要等待整段回复结束，也不会把第一个 { 到最后一个 } 之间的内容整体匹配。
+    遇到 ```json 代码块时丢弃之前的候选对象，从代码块内部重新开始；
+    输入结束时仍有未闭合的候选对象（如说明文字里单独的 {），由 finish() 从下一个 { 重新查找。
+
+    使用方法:
+        extractor = JsonStreamExtractor(validator=validate_post)
+        async for delta in stream:
+            result = extractor.feed(delta)
+            if result is not None:
+                break
+        else:
+            result = extractor.finish()
+    """
+
+    def __init__(self, validator=None):
+        self.validator = validator
+        self.buffer = ""
+        self.result = None
+        self.error = None
+        self._pos = 0
+        self._finished = False
+        self._reset_scan()
+
+    def _reset_scan(self):
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> dict | None:
+        """追加一段文本，解析出符合要求的对象时返回该对象，否则返回 None"""
+        if self.result is not None:
+            return self.result
+        self.buffer += chunk
+        buffer = self.buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if ch == "`":
+                tail = buffer[self._pos:self._pos + len(_FENCE)]
+                if tail.lower() == _FENCE:
+                    self._reset_scan()
+                    self._pos += len(_FENCE)
+                    continue
+                if len(tail) < len(_FENCE) and _FENCE.startswith(tail.lower()) and not self._finished:
+                    # 代码块标记可能被分在两段里，等下一段再判断
+                    return None
+            self._pos += 1
+            if self._start < 0:
+                if ch == "{":
+                    self._start, self._depth = self._pos - 1, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = buffer[self._start:self._pos]
+                    result = self._try_parse(candidate)
+                    if result is not None:
+                        self.result = result
+                        return result
+                    # 不是目标对象，从该对象之后继续查找
+                    self._start = -1
+        return None
+
+    def finish(self) -> dict | None:
+        """输入结束时调用：处理剩余文本，未闭合的候选对象从其后的下一个 { 重新查找"""
+        self._finished = True
+        result = self.feed("")
+        while result is None and self._start >= 0:
+            restart = self._start + 1
+            self._reset_scan()
+            self._pos = restart
+            result = self.feed("")
+        return result
+
+    def _try_parse(self, candidate: str) -> dict | None:
+        for text in (candidate, None):
+            try:
+                data = json.loads(text if text is not None else repair_json(candidate))
+            except json.JSONDecodeError as e:
+                self.error = f"JSON 格式错误: {e}"
+                continue
+            errors = self.validator(data) if self.validator else ([] if isinstance(data, dict) else ["不是 JSON 对象"])
+            if not errors:
+                return data
+            self.error = "；".join(errors)
+            return None
+        return None
+
+
+def extract_json(text: str, validator=None) -> dict:
     """从文本中提取 JSON 并转换为对象
     
     使用方法:
         result = extract_json(ai_response)
         print(result["title"])
+        
+        # 按内容结构校验（同时修复常见格式错误）
+        result = extract_json(ai_response, validator=validate_post)
     """
-    # 匹配 ```json ... ``` 代码块
-    match = re.search(r'```json\s*([\s\S]*?)\s*```', text)
-    if match:
-        json_str = match.group(1)
-        return json.loads(json_str)
-    
-    # 如果没有代码块，尝试直接匹配 {...}
-    match = re.search(r'\{[\s\S]*\}', text)
-    if match:
-        return json.loads(match.group(0))
-    
-    raise ValueError("未找到有效的 JSON")
+    extractor = JsonStreamExtractor(validator)
+    extractor.feed(text)
+    result = extractor.finish()
+    if result is not None:
+        return result
+    raise ValueError(extractor.error or "未找到有效的 JSON")
 
 def save_json(data: dict, file_path: str):
     os.makedirs(file_path, exist_ok=True)
@@ -1,9 +1,36 @@
 """加载动画工具"""
 
+from contextlib import contextmanager
 from rich.console import Console
 
 console = Console()
 
+# rich 同一时间只允许一个动态显示，并发任务时只有第一个显示加载动画
+_status_active = False
+
+
+@contextmanager
+def loading_status(message: str):
+    """显示加载动画的上下文管理器，已有动画在显示时不再重复创建
+
+    使用方法:
+        with loading_status("处理中...") as status:
+            ...
+            if status:
+                status.update("处理中 50%...")
+    """
+    global _status_active
+    if _status_active:
+        yield None
+        return
+    
+    _status_active = True
+    try:
+        with console.status(f"[bold cyan]{message}[/bold cyan]", spinner="dots") as status:
+            yield status
+    finally:
+        _status_active = False
+
 
 async def ai_loading(coroutine, message: str = "正在生成请稍后..."):
     """显示加载动画直到异步任务完成
@@ -14,6 +41,6 @@ async def ai_loading(coroutine, message: str = "正在生成请稍后..."):
         # 自定义提示文字
         response = await ai_loading(client.chat_history("你好"), "思考中...")
     """
-    with console.status(f"[bold cyan]{message}[/bold cyan]", spinner="dots"):
+    with loading_status(message):
         result = await coroutine
     return result
@@ -0,0 +1,281 @@
+"""流水线指标与追踪 - 记录各阶段耗时、token 数、上传字节数和重试次数
+
+    span: 计时的上下文管理器，自动记录父子关系（contextvars，跨 await 和 asyncio.gather 传递），
+          结束时按 名称 + 标签 写入耗时直方图
+    inc: 计数器（token、字节、重试等）
+
+导出:
+    Prometheus 文本格式: export_prometheus()，或设置 METRICS_PROM_FILE，退出时由 flush_metrics() 写入
+    JSON lines: 设置 METRICS_JSONL 时，每个 span 结束和每次计数都追加一行，可按 trace_id 还原单篇内容的调用树
+    终端汇总: print_metrics_summary()
+
+用法:
+    from util.metrics import span, inc
+    with span("upload", platform="piclist") as s:
+        ...
+        s.set(images=3)           # 只写入 JSON lines，不作为标签（避免高基数）
+    inc("upload_bytes_total", 1024, target="piclist")
+
+标签只用于低基数的维度（阶段、平台、提供商），任务 ID、图片序号等放在 set() 的属性里。
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from rich.table import Table
+from util.console import console
+
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+METRICS_JSONL = os.getenv("METRICS_JSONL", "")
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")
+# 直方图分桶（秒），覆盖从单次 HTTP 请求到整篇内容生成
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# 每个序列保留的最近样本数，用于计算分位数
+MAX_SAMPLES = 2048
+
+# 当前 span，子任务创建时复制上下文，因此 gather 出去的协程会挂在同一个父 span 下
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+def _series_key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """最近邻法分位数，q 取 0~100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.samples: deque[float] = deque(maxlen=MAX_SAMPLES)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        self.samples.append(value)
+
+
+class Registry:
+    """进程内的指标存储，线程安全（后台任务线程也会写入）"""
+
+    def __init__(self, jsonl_path: str = METRICS_JSONL):
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, _Histogram] = {}
+        self.jsonl_path = jsonl_path
+        self._jsonl = None
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._emit({"type": "counter", "name": name, "value": value, "labels": labels})
+
+    def observe(self, name: str, value: float, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def _emit(self, record: dict):
+        if not self.jsonl_path:
+            return
+        record = {"ts": round(time.time(), 3), **record}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._jsonl is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.jsonl_path)), exist_ok=True)
+                self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+            self._jsonl.write(line + "\n")
+            self._jsonl.flush()
+
+    def snapshot(self) -> dict:
+        """当前所有指标：计数器的值，以及直方图的次数、总和和分位数"""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (h.count, h.total, list(h.samples)) for key, h in self.histograms.items()}
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters.items()],
+            "histograms": [
+                {
+                    "name": name, "labels": dict(labels), "count": count, "sum": round(total, 4),
+                    "p50": percentile(samples, 50), "p95": percentile(samples, 95), "p99": percentile(samples, 99),
+                }
+                for (name, labels), (count, total, samples) in histograms.items()
+            ],
+        }
+
+    def export_prometheus(self) -> str:
+        """Prometheus 文本格式（exposition format 0.0.4）"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(h.counts), h.total, h.count) for key, h in self.histograms.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), counts, total, count in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def close(self):
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6g}"
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+class Span:
+    """一次计时，结束时写入 span_seconds 直方图（标签为 span 名称和 labels）"""
+
+    def __init__(self, name: str, labels: dict, parent: "Span | None"):
+        self.name = name
+        self.labels = labels
+        self.attrs: dict = {}
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.start = time.perf_counter()
+        self.status = "ok"
+
+    def set(self, **attrs):
+        """附加属性（只写入 JSON lines）"""
+        self.attrs.update(attrs)
+        return self
+
+
+@contextmanager
+def span(name: str, **labels):
+    """计时一段代码，异常时 status 记为 error 并继续抛出"""
+    if not METRICS_ENABLED:
+        yield Span(name, labels, None)
+        return
+
+    current = Span(name, labels, _current_span.get())
+    token = _current_span.set(current)
+    try:
+        yield current
+    except asyncio.CancelledError:
+        # 被取消（如对冲请求中较慢的一方）不算失败
+        current.status = "cancelled"
+        raise
+    except BaseException as e:
+        current.status = "error"
+        current.attrs.setdefault("error", f"{type(e).__name__}: {e}"[:200])
+        raise
+    finally:
+        _current_span.reset(token)
+        duration = time.perf_counter() - current.start
+        _registry.observe("span_seconds", duration, span=name, status=current.status, **labels)
+        _registry._emit({
+            "type": "span", "name": name, "trace_id": current.trace_id, "span_id": current.span_id,
+            "parent_id": current.parent.span_id if current.parent else None,
+            "duration": round(duration, 4), "status": current.status, "labels": labels, "attrs": current.attrs,
+        })
+
+
+def inc(name: str, value: float = 1, **labels):
+    """计数器加 value"""
+    if METRICS_ENABLED and value:
+        _registry.inc(name, value, **labels)
+
+
+def export_prometheus() -> str:
+    return _registry.export_prometheus()
+
+
+def flush_metrics():
+    """程序退出前调用：写出 Prometheus 文件并关闭 JSON lines 文件"""
+    if METRICS_ENABLED and METRICS_PROM_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(METRICS_PROM_FILE)), exist_ok=True)
+        with open(METRICS_PROM_FILE, "w", encoding="utf-8") as f:
+            f.write(_registry.export_prometheus())
+    _registry.close()
+
+
+def print_metrics_summary(title: str = "耗时统计"):
+    """按 span 汇总耗时（次数、总耗时、p50/p95/p99）并列出计数器"""
+    snapshot = _registry.snapshot()
+    spans = [h for h in snapshot["histograms"] if h["name"] == "span_seconds"]
+    if not spans and not snapshot["counters"]:
+        return
+
+    table = Table(title=title)
+    for column in ("span", "标签", "次数", "失败", "总耗时", "p50", "p95", "p99"):
+        table.add_column(column, justify="left" if column in ("span", "标签") else "right")
+    # 成功和失败合并到同一行
+    rows: dict[tuple, dict] = {}
+    for histogram in spans:
+        labels = dict(histogram["labels"])
+        name, status = labels.pop("span"), labels.pop("status")
+        key = (name, tuple(sorted(labels.items())))
+        row = rows.setdefault(key, {"count": 0, "errors": 0, "sum": 0.0, "p50": None, "p95": None, "p99": None})
+        row["count"] += histogram["count"]
+        row["sum"] += histogram["sum"]
+        if status == "ok":
+            row.update(p50=histogram["p50"], p95=histogram["p95"], p99=histogram["p99"])
+        elif status == "error":
+            row["errors"] += histogram["count"]
+    for (name, labels), row in sorted(rows.items(), key=lambda item: -item[1]["sum"]):
+        label_text = ",".join(f"{key}={value}" for key, value in labels)
+        cells = [f"{row[q]:.2f}s" if row[q] is not None else "-" for q in ("p50", "p95", "p99")]
+        errors = f"[red]{row['errors']}[/red]" if row["errors"] else "0"
+        table.add_row(name, label_text, str(row["count"]), errors, f"{row['sum']:.1f}s", *cells)
+    console.print(table)
+
+    for counter in sorted(snapshot["counters"], key=lambda c: c["name"]):
+        label_text = ",".join(f"{key}={value}" for key, value in counter["labels"].items())
+        console.print(f"[dim]{counter['name']}{{{label_text}}} {_format_value(counter['value'])}[/dim]")
@@ -0,0 +1,130 @@
+"""页面就绪等待 - 用页面信号（缩略图、进度条）代替固定延时，上传请求数只作为诊断信息
+
+使用方法:
+    report = WaitReport("小红书")
+    tracker = UploadTracker(page, r"/upload")
+    await upload_files_visible(page, 'input[type="file"]', image_paths)
+    await report.wait("图片上传", tracker.wait(len(image_paths), THUMB_SELECTOR, PROGRESS_SELECTOR, timeout), budget_ms)
+    report.print()
+"""
+
+import re
+import time
+from playwright.async_api import Page, Request
+from rich.table import Table
+
+from .console import console, print_warning
+
+# 页面内判断：缩略图数量达到预期且没有可见的进度元素
+_DOM_READY_JS = """
+([thumbSelector, progressSelector, count]) => {
+    const visible = el => el.offsetParent !== null;
+    const thumbs = [...document.querySelectorAll(thumbSelector)].filter(visible);
+    if (thumbs.length < count) return false;
+    if (!progressSelector) return true;
+    return [...document.querySelectorAll(progressSelector)].filter(visible).length === 0;
+}
+"""
+
+
+class UploadTracker:
+    """等待上传完成（以页面上的缩略图和进度条为准），同时统计上传接口的请求数，需要在触发上传之前创建
+
+    上传接口的 URL 规则可能匹配到埋点、预签名等其他请求，请求数只用于超时时的诊断，不作为完成条件。
+
+    参数:
+        page: 页面对象
+        url_pattern: 上传接口 URL 的正则
+    """
+
+    def __init__(self, page: Page, url_pattern: str):
+        self.page = page
+        self.pattern = re.compile(url_pattern)
+        self.pending = 0
+        self.finished = 0
+        self.failed = 0
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_finished)
+        page.on("requestfailed", self._on_failed)
+
+    def _matches(self, request: Request) -> bool:
+        return request.method in ("POST", "PUT") and bool(self.pattern.search(request.url))
+
+    def _on_request(self, request: Request):
+        if self._matches(request):
+            self.pending += 1
+
+    def _on_finished(self, request: Request):
+        if self._matches(request):
+            self.pending = max(0, self.pending - 1)
+            self.finished += 1
+
+    def _on_failed(self, request: Request):
+        if self._matches(request):
+            self.pending = max(0, self.pending - 1)
+            self.failed += 1
+
+    def detach(self):
+        """移除事件监听"""
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("requestfinished", self._on_finished)
+        self.page.remove_listener("requestfailed", self._on_failed)
+
+    async def wait(self, count: int, thumb_selector: str, progress_selector: str = "", timeout: int = 60000) -> bool:
+        """等待缩略图全部出现且进度条消失
+
+        超时返回 False（调用方继续后续流程，由人工检查），并打印上传请求的统计帮助排查
+        """
+        try:
+            await self.page.wait_for_function(
+                _DOM_READY_JS, arg=[thumb_selector, progress_selector, count], timeout=timeout
+            )
+            return True
+        except Exception:
+            console.print(f"[dim]上传请求: 完成 {self.finished}，失败 {self.failed}，进行中 {self.pending}（预期 {count} 张图片）[/dim]")
+            return False
+        finally:
+            self.detach()
+
+
+class WaitReport:
+    """记录每个等待步骤的实际耗时与原固定延时预算"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.steps: list[tuple[str, float, float, bool]] = []
+
+    async def wait(self, step: str, awaitable, budget_ms: float):
+        """执行等待并记录耗时，返回 awaitable 的结果（结果为 False 视为超时）"""
+        start = time.perf_counter()
+        result = await awaitable
+        actual_ms = (time.perf_counter() - start) * 1000
+        self.steps.append((step, actual_ms, budget_ms, result is not False))
+        if result is False:
+            print_warning(f"{step}: 未检测到就绪信号，已等待 {actual_ms / 1000:.1f}s，继续后续流程")
+        return result
+
+    def print(self):
+        """打印等待耗时报告"""
+        table = Table(title=f"{self.name} 等待耗时")
+        table.add_column("步骤")
+        table.add_column("实际", justify="right")
+        table.add_column("原预算", justify="right")
+        table.add_column("节省", justify="right")
+        total_actual = total_budget = 0
+        for step, actual_ms, budget_ms, ready in self.steps:
+            total_actual += actual_ms
+            total_budget += budget_ms
+            flag = "" if ready else " [yellow](超时)[/yellow]"
+            table.add_row(step + flag, f"{actual_ms / 1000:.1f}s", f"{budget_ms / 1000:.1f}s", f"{(budget_ms - actual_ms) / 1000:.1f}s")
+        table.add_row("合计", f"{total_actual / 1000:.1f}s", f"{total_budget / 1000:.1f}s", f"{(total_budget - total_actual) / 1000:.1f}s")
+        console.print(table)
+
+
+async def wait_for_attached(page: Page, selector: str, timeout: int = 30000) -> bool:
+    """等待元素挂载到 DOM，超时返回 False"""
+    try:
+        await page.locator(selector).first.wait_for(state="attached", timeout=timeout)
+        return True
+    except Exception:
+        return False
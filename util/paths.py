@@ -0,0 +1,5 @@
+"""项目路径 - 本地数据（缓存、数据库、登录状态）统一放在项目根目录的 data/ 下"""
+
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
@@ -4,6 +4,9 @@
 
 import os
 import httpx
+from .http_client import get_http_client
+from . import upload_cache
+from .metrics import span, inc
 
 PICLIST_BASE_URL = os.getenv("PICLIST_URL", "http://127.0.0.1:36677")
 PICLIST_KEY = os.getenv("PICLIST_KEY", "")  # 可选的鉴权密钥
@@ -19,18 +22,18 @@ def _build_url(endpoint: str) -> str:
 
 async def heartbeat() -> bool:
     """健康检查"""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.get(_build_url("heartbeat"))
-            result = response.json()
-            if result.get("success") and result.get("result") == "alive":
-                print("✅ PicList 服务正常")
-                return True
-            print("❌ PicList 服务异常")
-            return False
-        except httpx.HTTPError as e:
-            print(f"❌ PicList 连接失败: {e}")
-            return False
+    client = get_http_client()
+    try:
+        response = await client.get(_build_url("heartbeat"), timeout=10.0)
+        result = response.json()
+        if result.get("success") and result.get("result") == "alive":
+            print("✅ PicList 服务正常")
+            return True
+        print("❌ PicList 服务异常")
+        return False
+    except httpx.HTTPError as e:
+        print(f"❌ PicList 连接失败: {e}")
+        return False
 
 
 async def upload_by_path(image_paths: list[str], picbed: str = None, config_name: str = None) -> list[str]:
@@ -47,38 +50,71 @@ async def upload_by_path(image_paths: list[str], picbed: str = None, config_name
     使用示例:
         urls = await upload_by_path(["D:/images/1.jpg", "D:/images/2.png"])
         print(urls)  # ["https://example.com/1.jpg", "https://example.com/2.png"]
+    
+    上传前会按图片内容哈希查询本地缓存（见 util/upload_cache.py），只上传新增或改动过的图片
     """
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            url = _build_url("upload")
-            
-            # 添加可选参数
-            params = []
-            if picbed:
-                params.append(f"picbed={picbed}")
-            if config_name:
-                params.append(f"configName={config_name}")
-            if params:
-                separator = "&" if PICLIST_KEY else "?"
-                url += separator + "&".join(params)
-            
+    if not upload_cache.CACHE_ENABLED:
+        urls, _ = await _upload_paths(image_paths, picbed, config_name)
+        return urls
+    
+    keys = [upload_cache.cache_key(upload_cache.file_hash(path), picbed, config_name) for path in image_paths]
+    cached = upload_cache.get_many(keys)
+    missing = [(path, key) for path, key in zip(image_paths, keys) if key not in cached]
+    if len(missing) < len(image_paths):
+        inc("upload_cache_hits_total", len(image_paths) - len(missing), target="piclist")
+        print(f"♻️ 缓存命中: {len(image_paths) - len(missing)} 张图片，无需重复上传")
+    
+    if missing:
+        urls, full_results = await _upload_paths([path for path, _ in missing], picbed, config_name)
+        if len(urls) != len(missing):
+            return []
+        if len(full_results) != len(urls):
+            full_results = [None] * len(urls)
+        upload_cache.put_many([(key, url, full) for (_, key), url, full in zip(missing, urls, full_results)])
+        for (_, key), url, full in zip(missing, urls, full_results):
+            cached[key] = {"url": url, "full_result": full}
+    
+    return [cached[key]["url"] for key in keys]
+
+
+async def _upload_paths(image_paths: list[str], picbed: str = None, config_name: str = None) -> tuple[list[str], list[dict]]:
+    """上传本地图片，返回 (URL 列表, fullResult 列表)，失败返回空列表"""
+    client = get_http_client()
+    try:
+        url = _build_url("upload")
+        
+        # 添加可选参数
+        params = []
+        if picbed:
+            params.append(f"picbed={picbed}")
+        if config_name:
+            params.append(f"configName={config_name}")
+        if params:
+            separator = "&" if PICLIST_KEY else "?"
+            url += separator + "&".join(params)
+        
+        with span("piclist_upload") as upload_span:
+            upload_span.set(images=len(image_paths))
             response = await client.post(
                 url,
                 json={"list": image_paths},
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=120.0
             )
             result = response.json()
-            
-            if result.get("success"):
-                urls = result.get("result", [])
-                print(f"✅ 上传成功: {len(urls)} 张图片")
-                return urls
-            else:
-                print(f"❌ 上传失败: {result}")
-                return []
-        except httpx.HTTPError as e:
-            print(f"❌ 上传请求失败: {e}")
-            return []
+        
+        if result.get("success"):
+            urls = result.get("result", [])
+            inc("upload_images_total", len(urls), target="piclist")
+            inc("upload_bytes_total", sum(os.path.getsize(path) for path in image_paths if os.path.exists(path)), target="piclist")
+            print(f"✅ 上传成功: {len(urls)} 张图片")
+            return urls, result.get("fullResult", [])
+        else:
+            print(f"❌ 上传失败: {result}")
+            return [], []
+    except httpx.HTTPError as e:
+        print(f"❌ 上传请求失败: {e}")
+        return [], []
 
 
 async def upload_by_form(image_path: str, picbed: str = None, config_name: str = None) -> str:
@@ -92,37 +128,37 @@ async def upload_by_form(image_path: str, picbed: str = None, config_name: str =
     返回:
         上传成功后的图片 URL
     """
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            url = _build_url("upload")
-            
-            # 添加可选参数
-            params = []
-            if picbed:
-                params.append(f"picbed={picbed}")
-            if config_name:
-                params.append(f"configName={config_name}")
-            if params:
-                separator = "&" if PICLIST_KEY else "?"
-                url += separator + "&".join(params)
-            
-            with open(image_path, "rb") as f:
-                files = {"image": (os.path.basename(image_path), f)}
-                response = await client.post(url, files=files)
-            
-            result = response.json()
-            
-            if result.get("success"):
-                urls = result.get("result", [])
-                if urls:
-                    print(f"✅ 上传成功: {urls[0]}")
-                    return urls[0]
-            
-            print(f"❌ 上传失败: {result}")
-            return ""
-        except httpx.HTTPError as e:
-            print(f"❌ 上传请求失败: {e}")
-            return ""
+    client = get_http_client()
+    try:
+        url = _build_url("upload")
+        
+        # 添加可选参数
+        params = []
+        if picbed:
+            params.append(f"picbed={picbed}")
+        if config_name:
+            params.append(f"configName={config_name}")
+        if params:
+            separator = "&" if PICLIST_KEY else "?"
+            url += separator + "&".join(params)
+        
+        with open(image_path, "rb") as f:
+            files = {"image": (os.path.basename(image_path), f)}
+            response = await client.post(url, files=files, timeout=120.0)
+        
+        result = response.json()
+        
+        if result.get("success"):
+            urls = result.get("result", [])
+            if urls:
+                print(f"✅ 上传成功: {urls[0]}")
+                return urls[0]
+        
+        print(f"❌ 上传失败: {result}")
+        return ""
+    except httpx.HTTPError as e:
+        print(f"❌ 上传请求失败: {e}")
+        return ""
 
 
 async def upload_clipboard(picbed: str = None, config_name: str = None) -> str:
@@ -131,38 +167,39 @@ async def upload_clipboard(picbed: str = None, config_name: str = None) -> str:
     返回:
         上传成功后的图片 URL
     """
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            url = _build_url("upload")
-            
-            # 添加可选参数
-            params = []
-            if picbed:
-                params.append(f"picbed={picbed}")
-            if config_name:
-                params.append(f"configName={config_name}")
-            if params:
-                separator = "&" if PICLIST_KEY else "?"
-                url += separator + "&".join(params)
-            
-            response = await client.post(
-                url,
-                json={},
-                headers={"Content-Type": "application/json"}
-            )
-            result = response.json()
-            
-            if result.get("success"):
-                urls = result.get("result", [])
-                if urls:
-                    print(f"✅ 剪贴板图片上传成功: {urls[0]}")
-                    return urls[0]
-            
-            print(f"❌ 上传失败: {result}")
-            return ""
-        except httpx.HTTPError as e:
-            print(f"❌ 上传请求失败: {e}")
-            return ""
+    client = get_http_client()
+    try:
+        url = _build_url("upload")
+        
+        # 添加可选参数
+        params = []
+        if picbed:
+            params.append(f"picbed={picbed}")
+        if config_name:
+            params.append(f"configName={config_name}")
+        if params:
+            separator = "&" if PICLIST_KEY else "?"
+            url += separator + "&".join(params)
+        
+        response = await client.post(
+            url,
+            json={},
+            headers={"Content-Type": "application/json"},
+            timeout=60.0
+        )
+        result = response.json()
+        
+        if result.get("success"):
+            urls = result.get("result", [])
+            if urls:
+                print(f"✅ 剪贴板图片上传成功: {urls[0]}")
+                return urls[0]
+        
+        print(f"❌ 上传失败: {result}")
+        return ""
+    except httpx.HTTPError as e:
+        print(f"❌ 上传请求失败: {e}")
+        return ""
 
 
 async def delete_images(full_results: list[dict]) -> bool:
@@ -174,22 +211,24 @@ async def delete_images(full_results: list[dict]) -> bool:
     返回:
         是否删除成功
     """
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(
-                _build_url("delete"),
-                json={"list": full_results},
-                headers={"Content-Type": "application/json"}
-            )
-            result = response.json()
-            
-            if result.get("success"):
-                print("✅ 删除成功")
-                return True
-            else:
-                print(f"❌ 删除失败: {result}")
-                return False
-        except httpx.HTTPError as e:
-            print(f"❌ 删除请求失败: {e}")
+    client = get_http_client()
+    try:
+        response = await client.post(
+            _build_url("delete"),
+            json={"list": full_results},
+            headers={"Content-Type": "application/json"},
+            timeout=60.0
+        )
+        result = response.json()
+        
+        if result.get("success"):
+            print("✅ 删除成功")
+            upload_cache.invalidate_urls([item.get("imgUrl") for item in full_results if isinstance(item, dict)])
+            return True
+        else:
+            print(f"❌ 删除失败: {result}")
             return False
+    except httpx.HTTPError as e:
+        print(f"❌ 删除请求失败: {e}")
+        return False
 
@@ -1,7 +1,34 @@
-"""Redis 客户端"""
+"""Redis 客户端
+
+    RedisClient: 同步客户端（单例）
+    AsyncRedisClient: 异步客户端（redis.asyncio），带连接池，接口与同步版一致，另有批量和流水线操作
+
+异步客户端的连接绑定事件循环，每个事件循环一个实例（后台任务线程有自己的事件循环）:
+    redis = get_async_redis()
+    await redis.mset({"a": "1", "b": "2"}, ex=60)
+    values = await redis.mget(["a", "b"])
+
+    # 程序退出前
+    await close_async_redis()
+"""
 
 import os
+import time
+import asyncio
+import weakref
 import redis
+import redis.asyncio as aioredis
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+# 异步连接池的最大连接数
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))
+# 单条命令的超时（秒）
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+# 连接空闲超过该时间（秒）后，下次使用前先 PING 检查
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
 
 
 class RedisClient:
@@ -39,3 +66,98 @@ def get_redis() -> RedisClient:
     """获取 Redis 客户端单例"""
     return RedisClient()
 
+
+class AsyncRedisClient:
+    """异步 Redis 客户端，多个协程共享一个连接池，可以并发发出命令"""
+
+    def __init__(self, max_connections: int = REDIS_MAX_CONNECTIONS):
+        self.pool = aioredis.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD,
+            decode_responses=True,
+            max_connections=max_connections,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        self.client = aioredis.Redis(connection_pool=self.pool)
+
+    async def get(self, key: str) -> str:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ex: int = None) -> bool:
+        return await self.client.set(key, value, ex=ex)
+
+    async def delete(self, key: str) -> int:
+        return await self.client.delete(key)
+
+    async def exists(self, key: str) -> bool:
+        return await self.client.exists(key) > 0
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        """一次往返读取多个键，不存在的键返回 None"""
+        if not keys:
+            return []
+        return await self.client.mget(keys)
+
+    async def mset(self, mapping: dict[str, str], ex: int = None) -> bool:
+        """一次往返写入多个键；指定 ex 时用流水线为每个键设置过期时间"""
+        if not mapping:
+            return True
+        if ex is None:
+            return await self.client.mset(mapping)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ex)
+            return all(await pipe.execute())
+
+    async def delete_many(self, keys: list[str]) -> int:
+        if not keys:
+            return 0
+        return await self.client.delete(*keys)
+
+    def pipeline(self, transaction: bool = False):
+        """流水线：多条命令合并为一次往返
+
+            async with redis.pipeline() as pipe:
+                pipe.incr("a")
+                pipe.expire("a", 60)
+                results = await pipe.execute()
+        """
+        return self.client.pipeline(transaction=transaction)
+
+    async def health_check(self) -> float | None:
+        """PING 往返耗时（毫秒），不可用时返回 None"""
+        start = time.perf_counter()
+        try:
+            await self.client.ping()
+        except (redis.RedisError, OSError):
+            return None
+        return (time.perf_counter() - start) * 1000
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+        await self.pool.disconnect()
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncRedisClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_redis() -> AsyncRedisClient:
+    """获取当前事件循环的异步 Redis 客户端"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncRedisClient()
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_redis():
+    """关闭当前事件循环的异步 Redis 客户端（程序退出前调用）"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,119 @@
+"""请求拦截策略 - 发布页面中屏蔽不需要的重资源（字体、视频、统计上报、推荐流）
+
+创作者页面会加载大量与发布无关的资源，导致 networkidle 迟迟不能稳定。
+按平台配置:
+    - 屏蔽的资源类型（默认字体和音视频）
+    - 屏蔽的域名/URL（统计、监控、推荐流）
+    - 白名单（上传接口、登录二维码等发布流程需要的请求），优先于屏蔽规则
+
+注意: Playwright 开启请求拦截后该上下文不使用 HTTP 缓存；可用 ROUTE_POLICY=false 关闭。
+被屏蔽请求的字节数无法得知，按资源类型的典型大小估算。
+
+使用方法:
+    await install_route_policy(context, "xiaohongshu")
+    ...
+    print_route_stats(context)
+"""
+
+import os
+import re
+import weakref
+from playwright.async_api import BrowserContext, Route
+
+from .console import console
+
+ROUTE_POLICY_ENABLED = os.getenv("ROUTE_POLICY", "true").lower() in ("1", "true", "yes")
+# 屏蔽的资源类型，逗号分隔（Playwright resource_type）
+BLOCK_TYPES = {t.strip() for t in os.getenv("ROUTE_BLOCK_TYPES", "font,media").split(",") if t.strip()}
+# 额外屏蔽的 URL 正则，逗号分隔，对所有平台生效
+EXTRA_BLOCK_PATTERNS = [p.strip() for p in os.getenv("ROUTE_EXTRA_BLOCK", "").split(",") if p.strip()]
+
+# 所有平台通用的统计/监控域名
+COMMON_BLOCK_PATTERNS = [
+    r"google-analytics\.com", r"googletagmanager\.com", r"hm\.baidu\.com", r"cnzz\.com",
+    r"sentry\.io", r"/sentry/", r"\.gif\?.*(?:track|log|report)",
+]
+
+# 各平台规则: block 为屏蔽的 URL 正则，allow 为白名单正则
+PLATFORM_RULES = {
+    "xiaohongshu": {
+        "block": [r"apm-fe\.xiaohongshu\.com", r"t2\.xiaohongshu\.com", r"/api/sns/web/v\d+/homefeed", r"lng\.xiaohongshu\.com"],
+        "allow": [r"ros-upload", r"/api/media/", r"/upload", r"qrcode", r"/login"],
+    },
+    "douyin": {
+        "block": [r"mcs\.snssdk\.com", r"mon\.zijieapi\.com", r"mssdk", r"apmplus", r"/slardar/", r"/aweme/v\d+/web/feed"],
+        "allow": [r"imagex", r"ImageUpload", r"/upload", r"qrcode", r"/passport/"],
+    },
+    "weixin": {
+        "block": [r"badjs\.", r"aegis\.qq\.com", r"beacon\.qq\.com", r"/jsmonitor", r"/mmfinderassistant-bin/.*report"],
+        "allow": [r"upload", r"qrcode", r"/auth/"],
+    },
+}
+
+# 被屏蔽资源的估算大小（字节）
+ESTIMATED_BYTES = {"font": 80_000, "media": 800_000, "image": 40_000, "script": 50_000, "stylesheet": 20_000}
+DEFAULT_ESTIMATED_BYTES = 3_000
+
+_policies: "weakref.WeakKeyDictionary[BrowserContext, RoutePolicy]" = weakref.WeakKeyDictionary()
+
+
+class RoutePolicy:
+    """单个平台的请求拦截策略，统计被屏蔽的请求"""
+
+    def __init__(self, platform: str, block_types: set[str] = None, block_patterns: list[str] = None, allow_patterns: list[str] = None):
+        rules = PLATFORM_RULES.get(platform, {})
+        self.platform = platform
+        self.block_types = BLOCK_TYPES if block_types is None else block_types
+        patterns = COMMON_BLOCK_PATTERNS + rules.get("block", []) + EXTRA_BLOCK_PATTERNS
+        self.block_re = re.compile("|".join(block_patterns or patterns))
+        allow = allow_patterns if allow_patterns is not None else rules.get("allow", [])
+        self.allow_re = re.compile("|".join(allow)) if allow else None
+        self.reset()
+
+    def reset(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_bytes = 0
+        self.by_type: dict[str, int] = {}
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self.allow_re is not None and self.allow_re.search(url):
+            return False
+        return resource_type in self.block_types or bool(self.block_re.search(url))
+
+    async def handle(self, route: Route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked += 1
+            self.blocked_bytes += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            self.by_type[request.resource_type] = self.by_type.get(request.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+    def summary(self) -> str:
+        types = "，".join(f"{t} {n}" for t, n in sorted(self.by_type.items(), key=lambda item: -item[1]))
+        return (f"🚫 {self.platform} 屏蔽 {self.blocked}/{self.blocked + self.allowed} 个请求，"
+                f"约节省 {self.blocked_bytes / 1024 / 1024:.1f}MB（{types or '无'}）")
+
+
+async def install_route_policy(context: BrowserContext, platform: str) -> RoutePolicy | None:
+    """为上下文安装请求拦截策略，同一上下文只安装一次"""
+    if not ROUTE_POLICY_ENABLED:
+        return None
+    if context in _policies:
+        return _policies[context]
+    policy = RoutePolicy(platform)
+    await context.route("**/*", policy.handle)
+    _policies[context] = policy
+    return policy
+
+
+def print_route_stats(context: BrowserContext):
+    """打印本次发布的拦截统计并清零"""
+    policy = _policies.get(context)
+    if policy is None or not (policy.blocked or policy.allowed):
+        return
+    console.print(f"[dim]{policy.summary()}[/dim]")
+    policy.reset()
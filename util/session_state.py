@@ -0,0 +1,188 @@
+"""登录会话持久化 - 保存完整的 storage state（cookies + localStorage + sessionStorage），并缓存登录有效性
+
+每个 平台+账号 一个文件 data/sessions/<platform>_<account>.json:
+    cookies / origins: Playwright storage_state 格式，新建上下文时直接传入
+    session_storage: {origin: {key: value}}，通过 init script 在页面加载前写回
+    validated_at: 最近一次确认登录有效的时间
+
+检查登录时按以下顺序判断，尽量不打开页面:
+    1. 登录 cookie 已过期 → 未登录
+    2. 距离上次确认不超过 LOGIN_CACHE_TTL → 已登录
+    3. 用上下文的请求接口调用一个需要登录的轻量 API → 按返回结果判断
+    4. 探测失败（网络错误、接口变化）时返回 None，由调用方退回到打开页面检查
+
+使用方法:
+    lease = await pool.acquire(platform, account, headless, **context_options(platform, account))
+    if lease.fresh:
+        await restore_session(lease.context, platform, account)
+    status = await check_session(context, platform, account)
+"""
+
+import os
+import json
+import time
+from playwright.async_api import BrowserContext, Page
+
+from .console import print_success, print_warning
+from .paths import DATA_DIR
+
+STATE_DIR = os.getenv("SESSION_STATE_DIR", os.path.join(DATA_DIR, "sessions"))
+# 登录有效性缓存时间（秒），期间不再检查登录状态
+LOGIN_CACHE_TTL = int(os.getenv("LOGIN_CACHE_TTL", 6 * 3600))
+# 登录 cookie 剩余有效期少于该值（秒）时视为过期
+COOKIE_EXPIRY_MARGIN = 300
+
+# 各平台的登录 cookie 名称
+AUTH_COOKIES = {
+    "xiaohongshu": ("web_session", "galaxy_creator_session_id"),
+    "douyin": ("sessionid", "sessionid_ss"),
+    "weixin": ("sessionid", "wxuin"),
+}
+
+# 各平台需要登录的轻量接口: (方法, URL, 判断返回 JSON 是否已登录)
+PROBES = {
+    "xiaohongshu": (
+        "GET", "https://creator.xiaohongshu.com/api/galaxy/user/info",
+        lambda data: data.get("success") is True or data.get("code") == 0,
+    ),
+    "douyin": (
+        "GET", "https://creator.douyin.com/web/api/media/user/info/",
+        lambda data: data.get("status_code") == 0 and bool(data.get("user")),
+    ),
+    "weixin": (
+        "POST", "https://channels.weixin.qq.com/cgi-bin/mmfinderassistant-bin/auth/auth_data",
+        lambda data: data.get("errCode") == 0,
+    ),
+}
+
+# 页面加载前写回 sessionStorage（只写入当前源的数据）
+_SESSION_STORAGE_JS = """
+(data => {
+    const items = data[window.location.origin];
+    if (!items) return;
+    for (const [key, value] of Object.entries(items)) {
+        if (window.sessionStorage.getItem(key) === null) window.sessionStorage.setItem(key, value);
+    }
+})(%s);
+"""
+
+
+def state_file(platform: str, account: str = "default") -> str:
+    return os.path.join(STATE_DIR, f"{platform}_{account}.json")
+
+
+def _read(platform: str, account: str) -> dict | None:
+    path = state_file(platform, account)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print_warning(f"读取登录状态失败 {path}: {e}")
+        return None
+
+
+def _write(platform: str, account: str, state: dict):
+    path = state_file(platform, account)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+
+def context_options(platform: str, account: str = "default") -> dict:
+    """新建上下文时的参数：已保存的 cookies 和 localStorage"""
+    state = _read(platform, account)
+    if not state:
+        return {}
+    return {"storage_state": {"cookies": state.get("cookies", []), "origins": state.get("origins", [])}}
+
+
+async def restore_session(context: BrowserContext, platform: str, account: str = "default") -> bool:
+    """写回 sessionStorage，返回是否存在已保存的登录状态
+
+    cookies 和 localStorage 需要在新建上下文时通过 context_options 传入。
+    """
+    state = _read(platform, account)
+    if not state:
+        return False
+    if state.get("session_storage"):
+        await context.add_init_script(_SESSION_STORAGE_JS % json.dumps(state["session_storage"], ensure_ascii=False))
+    return True
+
+
+async def save_session(context: BrowserContext, platform: str, account: str = "default", page: Page = None, validated: bool = True):
+    """保存当前上下文的完整登录状态，page 不为空时一并保存该页面源的 sessionStorage"""
+    previous = _read(platform, account) or {}
+    state = await context.storage_state()
+    session_storage = previous.get("session_storage", {})
+    if page and not page.is_closed():
+        try:
+            origin, items = await page.evaluate(
+                "() => [window.location.origin, Object.fromEntries(Object.entries(window.sessionStorage))]"
+            )
+            if origin and origin != "null":
+                session_storage[origin] = items
+        except Exception:
+            pass
+    state["session_storage"] = session_storage
+    state["validated_at"] = time.time() if validated else previous.get("validated_at", 0)
+    _write(platform, account, state)
+    print_success(f"登录状态已保存到 {state_file(platform, account)}")
+
+
+def invalidate(platform: str, account: str = "default"):
+    """清除登录有效性缓存（保留 cookies，下次检查时重新探测）"""
+    state = _read(platform, account)
+    if state and state.get("validated_at"):
+        state["validated_at"] = 0
+        _write(platform, account, state)
+
+
+def _cookie_expiry(cookies: list[dict], names: tuple[str, ...]) -> float | None:
+    """登录 cookie 中最早的过期时间，会话 cookie 和找不到时返回 None"""
+    expires = [c["expires"] for c in cookies if c.get("name") in names and c.get("expires", -1) > 0]
+    return min(expires) if expires else None
+
+
+async def _probe(context: BrowserContext, platform: str) -> bool | None:
+    """调用需要登录的接口，无法判断时返回 None"""
+    if platform not in PROBES:
+        return None
+    method, url, judge = PROBES[platform]
+    try:
+        response = await context.request.fetch(url, method=method, timeout=10000, max_redirects=0)
+        if response.status in (401, 403):
+            return False
+        if not response.ok:
+            return None
+        return bool(judge(await response.json()))
+    except Exception:
+        return None
+
+
+async def check_session(context: BrowserContext, platform: str, account: str = "default") -> bool | None:
+    """不打开页面判断登录状态，无法判断时返回 None"""
+    state = _read(platform, account)
+    if not state:
+        return None
+
+    expiry = _cookie_expiry(await context.cookies(), AUTH_COOKIES.get(platform, ()))
+    if expiry is not None and expiry - COOKIE_EXPIRY_MARGIN < time.time():
+        print_warning("登录 Cookie 已过期")
+        return False
+
+    if time.time() - state.get("validated_at", 0) < LOGIN_CACHE_TTL:
+        print_success("登录状态有效（缓存）")
+        return True
+
+    result = await _probe(context, platform)
+    if result is True:
+        state["validated_at"] = time.time()
+        _write(platform, account, state)
+        print_success("登录状态有效（接口探测）")
+    elif result is False:
+        invalidate(platform, account)
+    return result
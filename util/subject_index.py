@@ -0,0 +1,164 @@
+"""历史选题相似度索引 - 基于字符二元组（bigram）的倒排索引
+
+用于两件事:
+    1. 选题提示词中只注入与本次要求最相关的 top-K 个历史选题，提示词长度不随历史增长
+    2. 生成选题后检查是否与历史选题近似重复
+
+索引保存在 data/subject_index.json，按选题存储（util/subject_store.py）的自增 ID 增量更新。
+"""
+
+import os
+import re
+import json
+import threading
+from .paths import DATA_DIR
+from .subject_store import SubjectStore, get_subject_store
+
+INDEX_FILE = os.getenv("SUBJECT_INDEX_FILE", os.path.join(DATA_DIR, "subject_index.json"))
+# 注入提示词的历史选题数量
+SUBJECT_TOP_K = int(os.getenv("SUBJECT_TOP_K", 20))
+# 近似重复阈值（Jaccard 相似度）
+DUPLICATE_THRESHOLD = float(os.getenv("SUBJECT_DUPLICATE_THRESHOLD", 0.5))
+
+_PUNCT_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+# 选题列表中的编号行，如 "1. xxx"、"选题2：xxx"、"### 3、xxx"
+_CANDIDATE_RE = re.compile(r"^\s*(?:#+\s*)?(?:\*\*)?\s*(?:选题\s*)?\d{1,2}\s*[\.、:：)）]\s*(.+)$")
+
+
+def shingles(text: str) -> set[str]:
+    """文本的字符二元组集合（去除空白和标点，英文转小写）"""
+    text = _PUNCT_RE.sub("", text.lower())
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def extract_candidates(text: str) -> list[str]:
+    """从 AI 回复中提取编号的候选选题"""
+    candidates = []
+    for line in text.splitlines():
+        match = _CANDIDATE_RE.match(line)
+        if match:
+            candidate = match.group(1).replace("**", "").strip(" 《》\"'“”")
+            if candidate:
+                candidates.append(candidate)
+    return candidates
+
+
+class SubjectIndex:
+    """历史选题倒排索引"""
+
+    def __init__(self, store: SubjectStore = None, index_file: str = INDEX_FILE):
+        self.store = store or get_subject_store()
+        self.index_file = index_file
+        self.subjects: list[str] = []
+        self.shingle_sets: list[set[str]] = []
+        self.postings: dict[str, list[int]] = {}
+        # 已索引的最大选题 ID（序列号）
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # 旧格式或选题库被重建时丢弃索引，重新构建
+            if "seq" not in data or data["seq"] > self.store.last_id():
+                return
+            for text, grams in data.get("entries", []):
+                self._add(text, set(grams))
+            self.seq = data["seq"]
+        except (OSError, ValueError):
+            self._reset()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        data = {
+            "seq": self.seq,
+            "entries": [[text, sorted(grams)] for text, grams in zip(self.subjects, self.shingle_sets)],
+        }
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    def _reset(self):
+        self.subjects, self.shingle_sets, self.postings, self.seq = [], [], {}, 0
+
+    def _add(self, text: str, grams: set[str]):
+        index = len(self.subjects)
+        self.subjects.append(text)
+        self.shingle_sets.append(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(index)
+
+    def sync(self):
+        """把选题存储中新增的选题加入索引"""
+        with self._lock:
+            rows = self.store.since(self.seq)
+            if not rows:
+                return
+            for subject_id, text in rows:
+                self._add(text, shingles(text))
+                self.seq = subject_id
+            self._save()
+
+    def _overlaps(self, grams: set[str]) -> dict[int, int]:
+        """与各历史选题共有的二元组数量"""
+        counts: dict[int, int] = {}
+        for gram in grams:
+            for index in self.postings.get(gram, ()):
+                counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def top_k(self, query: str, k: int = SUBJECT_TOP_K) -> list[str]:
+        """与 query 最相关的 k 个历史选题，相关的不足 k 个时用最近的选题补足"""
+        self.sync()
+        counts = self._overlaps(shingles(query))
+        # 按历史选题被 query 覆盖的比例排序，同分时较新的优先
+        ranked = sorted(
+            counts,
+            key=lambda i: (counts[i] / max(1, len(self.shingle_sets[i])), i),
+            reverse=True
+        )[:k]
+        chosen = set(ranked)
+        for index in range(len(self.subjects) - 1, -1, -1):
+            if len(ranked) >= k:
+                break
+            if index not in chosen:
+                ranked.append(index)
+        return [self.subjects[i] for i in ranked]
+
+    def near_duplicates(self, candidate: str, threshold: float = DUPLICATE_THRESHOLD) -> list[tuple[str, float]]:
+        """与 candidate 近似重复的历史选题及其 Jaccard 相似度，按相似度降序"""
+        self.sync()
+        grams = shingles(candidate)
+        results = []
+        for index, overlap in self._overlaps(grams).items():
+            score = overlap / (len(grams) + len(self.shingle_sets[index]) - overlap)
+            if score >= threshold:
+                results.append((self.subjects[index], round(score, 2)))
+        return sorted(results, key=lambda item: item[1], reverse=True)
+
+    def check_candidates(self, text: str, threshold: float = DUPLICATE_THRESHOLD) -> list[tuple[str, str, float]]:
+        """检查回复中的候选选题，返回 (候选选题, 相似的历史选题, 相似度) 列表"""
+        duplicates = []
+        for candidate in extract_candidates(text):
+            matches = self.near_duplicates(candidate, threshold)
+            if matches:
+                duplicates.append((candidate, *matches[0]))
+        return duplicates
+
+
+_index: SubjectIndex | None = None
+
+
+def get_subject_index() -> SubjectIndex:
+    """获取进程内共享的选题索引"""
+    global _index
+    if _index is None:
+        _index = SubjectIndex()
+    return _index
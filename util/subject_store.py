@@ -0,0 +1,137 @@
+"""历史选题存储 - SQLite（WAL 模式）+ 进程内缓存
+
+替代只追加的 data/subject.txt:
+    - 记录选题的时间戳和来源内容 ID（post_id）
+    - 多线程/多进程并发写入安全
+    - 进程内缓存按自增 ID（序列号）增量刷新，不需要每次全量读取
+    - 首次使用时自动导入 subject.txt 中已有的选题
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from .paths import DATA_DIR
+
+SUBJECT_DB_FILE = os.getenv("SUBJECT_DB_FILE", os.path.join(DATA_DIR, "subjects.db"))
+LEGACY_SUBJECT_FILE = os.path.join(DATA_DIR, "subject.txt")
+
+
+class SubjectStore:
+    """历史选题存储"""
+
+    def __init__(self, db_file: str = SUBJECT_DB_FILE, legacy_file: str = LEGACY_SUBJECT_FILE):
+        self.db_file = db_file
+        self.legacy_file = legacy_file
+        self._lock = threading.Lock()
+        # 进程内缓存: [(id, text)]，按 id 升序
+        self._cache: list[tuple[int, str]] = []
+        self._init_db()
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            conn.execute("PRAGMA busy_timeout = 30000")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        with self._lock, self._db() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS subjects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    post_id TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subjects_post_id ON subjects (post_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            migrated = conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if not migrated:
+                self._import_legacy(conn)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(time.time()),))
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        """导入 subject.txt 中已有的选题（时间戳使用文件修改时间）"""
+        if not os.path.exists(self.legacy_file):
+            return
+        with open(self.legacy_file, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f.read().splitlines() if line.strip()]
+        created_at = os.path.getmtime(self.legacy_file)
+        conn.executemany(
+            "INSERT INTO subjects (text, created_at, post_id) VALUES (?, ?, NULL)",
+            [(line, created_at) for line in lines]
+        )
+
+    def add(self, text: str, post_id: str = None) -> int:
+        """添加一个选题，返回其 ID"""
+        text = text.strip()
+        with self._lock, self._db() as conn:
+            cursor = conn.execute(
+                "INSERT INTO subjects (text, created_at, post_id) VALUES (?, ?, ?)",
+                (text, time.time(), post_id)
+            )
+            return cursor.lastrowid
+
+    def since(self, seq: int) -> list[tuple[int, str]]:
+        """ID 大于 seq 的选题（增量读取）"""
+        with self._db() as conn:
+            return conn.execute("SELECT id, text FROM subjects WHERE id > ? ORDER BY id", (seq,)).fetchall()
+
+    def last_id(self) -> int:
+        """当前最大的选题 ID（序列号）"""
+        with self._db() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM subjects").fetchone()[0]
+
+    def _refresh(self) -> list[tuple[int, str]]:
+        """按序列号增量刷新进程内缓存"""
+        with self._lock:
+            seq = self._cache[-1][0] if self._cache else 0
+            new_rows = self.since(seq)
+            if new_rows:
+                self._cache.extend(new_rows)
+            return self._cache
+
+    def all(self) -> list[str]:
+        """全部选题，按添加顺序"""
+        return [text for _, text in self._refresh()]
+
+    def recent(self, n: int) -> list[str]:
+        """最近添加的 n 个选题，最新的在前"""
+        return [text for _, text in reversed(self._refresh()[-n:])] if n > 0 else []
+
+    def by_post(self, post_id: str) -> list[str]:
+        """某篇内容对应的选题"""
+        with self._db() as conn:
+            rows = conn.execute("SELECT text FROM subjects WHERE post_id = ? ORDER BY id", (post_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def similar(self, text: str, threshold: float = None) -> list[tuple[str, float]]:
+        """与 text 近似的历史选题（通过倒排索引查询，不做全量扫描）"""
+        from .subject_index import get_subject_index
+        index = get_subject_index()
+        return index.near_duplicates(text) if threshold is None else index.near_duplicates(text, threshold)
+
+    def contains_similar(self, text: str, threshold: float = None) -> bool:
+        """是否已有近似的历史选题"""
+        return bool(self.similar(text, threshold))
+
+
+_store: SubjectStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_subject_store() -> SubjectStore:
+    """获取进程内共享的选题存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SubjectStore()
+        return _store
@@ -1,28 +1,20 @@
 """文本文件工具"""
 
 import os
+from .subject_store import get_subject_store
+from .paths import DATA_DIR
 
-# 默认文件路径
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+# 旧版历史选题文件，现仅用于首次导入（见 util/subject_store.py）
 SUBJECT_FILE = os.path.join(DATA_DIR, "subject.txt")
 
 
 def read_subjects() -> list[str]:
-    """从 subject.txt 读取所有行"""
-    if not os.path.exists(SUBJECT_FILE):
-        return []
-    
-    with open(SUBJECT_FILE, "r", encoding="utf-8") as f:
-        lines = f.read().splitlines()
-    
-    # 过滤空行
-    return [line.strip() for line in lines if line.strip()]
+    """读取所有历史选题"""
+    return get_subject_store().all()
 
 
-def add_subject(text: str) -> None:
-    """添加一行文本到 subject.txt 末尾"""
-    # 确保目录存在
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
-    with open(SUBJECT_FILE, "a", encoding="utf-8") as f:
-        f.write(text.strip() + "\n")
+def add_subject(text: str, post_id: str = None) -> None:
+    """添加一个历史选题，post_id 为来源内容的标识（如输出目录名）"""
+    if not text.strip():
+        return
+    get_subject_store().add(text, post_id)
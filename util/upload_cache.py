@@ -0,0 +1,120 @@
+"""PicList 上传缓存 - 按图片内容哈希缓存上传结果，相同图片不重复上传
+
+缓存存储在 SQLite（默认 data/upload_cache.db），记录图片 URL 和 PicList 返回的 fullResult，
+支持过期时间（TTL）和按最近使用时间淘汰。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from .paths import DATA_DIR
+
+CACHE_FILE = os.getenv("PICLIST_CACHE_FILE", os.path.join(DATA_DIR, "upload_cache.db"))
+CACHE_ENABLED = os.getenv("PICLIST_CACHE", "true").lower() in ("1", "true", "yes")
+# 缓存有效期（秒），默认 30 天
+CACHE_TTL = int(os.getenv("PICLIST_CACHE_TTL", 30 * 24 * 3600))
+# 最多缓存条目数，超出时淘汰最久未使用的
+CACHE_MAX_ENTRIES = int(os.getenv("PICLIST_CACHE_MAX_ENTRIES", 5000))
+
+_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash: str, picbed: str = None, config_name: str = None) -> str:
+    """缓存键：同一张图片上传到不同图床/配置得到不同的 URL"""
+    return f"{content_hash}:{picbed or ''}:{config_name or ''}"
+
+
+@contextmanager
+def _db():
+    """打开数据库连接，退出时提交并关闭（进程内串行访问）"""
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(CACHE_FILE)), exist_ok=True)
+    conn = sqlite3.connect(CACHE_FILE, timeout=10)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS upload_cache (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            full_result TEXT,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_upload_cache_url ON upload_cache (url)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_upload_cache_last_used ON upload_cache (last_used)")
+    return conn
+
+
+def get_many(keys: list[str]) -> dict[str, dict]:
+    """批量查询未过期的缓存，返回 {key: {"url": ..., "full_result": ...}}，同时刷新最近使用时间"""
+    if not keys:
+        return {}
+    now = time.time()
+    with _db() as conn:
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(
+            f"SELECT key, url, full_result FROM upload_cache WHERE key IN ({placeholders}) AND created_at > ?",
+            [*keys, now - CACHE_TTL]
+        ).fetchall()
+        conn.executemany("UPDATE upload_cache SET last_used = ? WHERE key = ?", [(now, row[0]) for row in rows])
+    return {
+        key: {"url": url, "full_result": json.loads(full_result) if full_result else None}
+        for key, url, full_result in rows
+    }
+
+
+def put_many(entries: list[tuple[str, str, dict]]):
+    """批量写入缓存，entries 为 (key, url, full_result) 列表，写入后执行过期清理和淘汰"""
+    if not entries:
+        return
+    now = time.time()
+    with _db() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO upload_cache (key, url, full_result, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(key, url, json.dumps(full_result, ensure_ascii=False) if full_result else None, now, now)
+             for key, url, full_result in entries]
+        )
+        conn.execute("DELETE FROM upload_cache WHERE created_at <= ?", (now - CACHE_TTL,))
+        conn.execute(
+            "DELETE FROM upload_cache WHERE key IN ("
+            "SELECT key FROM upload_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (CACHE_MAX_ENTRIES,)
+        )
+
+
+def invalidate_urls(urls: list[str]) -> int:
+    """删除指定 URL 的缓存，返回删除条数"""
+    urls = [url for url in urls if url]
+    if not urls:
+        return 0
+    with _db() as conn:
+        placeholders = ",".join("?" * len(urls))
+        cursor = conn.execute(f"DELETE FROM upload_cache WHERE url IN ({placeholders})", urls)
+        return cursor.rowcount
+
+
+def clear():
+    """清空缓存"""
+    with _db() as conn:
+        conn.execute("DELETE FROM upload_cache")
@@ -10,11 +10,20 @@ from .stealth import (
     remove_popups, find_visible_element, upload_files_visible
 )
 from .console import print_success, print_error, print_info, print_warning
+from .browser_pool import BrowserPool, BrowserLease
+from .page_wait import UploadTracker, WaitReport, wait_for_attached
+from .route_policy import install_route_policy, print_route_stats
+from .session_state import context_options, restore_session, save_session, check_session, invalidate
 
 # 小红书创作者平台地址
 XHS_CREATOR_URL = "https://creator.xiaohongshu.com"
 XHS_UPLOAD_URL = "https://creator.xiaohongshu.com/publish/publish"
 
+# 上传就绪信号：上传接口、图片缩略图、上传进度元素
+XHS_UPLOAD_API_PATTERN = r"ros-upload|/api/media/v\d+/upload|/upload"
+XHS_THUMB_SELECTOR = '.img-preview-area img, [class*="img-preview"] img, [class*="image-item"] img'
+XHS_PROGRESS_SELECTOR = '[class*="progress"], [class*="uploading"]'
+
 # Cookie 存储路径
 COOKIE_FILE = os.getenv("XHS_COOKIE_FILE", "xiaohongshu_cookies.json")
 
@@ -95,10 +104,13 @@ async def upload_images(
     """上传图文到小红书（带人类行为模拟）"""
     print_info("正在上传图文到小红书...")
     
+    report = WaitReport("小红书")
     try:
         await page.goto(XHS_UPLOAD_URL, timeout=60000)
         await page.wait_for_load_state("domcontentloaded")
-        await human_delay(3000, 5000)
+        # 原固定延时为 3000~5000 毫秒，以其上限作为超时
+        await report.wait("进入发布页", wait_for_attached(page, 'div.creator-tab, input[type="file"]', timeout=5000), 4000)
+        await human_delay(300, 800)
         print_success("已进入发布页面")
         
         await remove_popups(page)
@@ -123,9 +135,18 @@ async def upload_images(
         
         print_info(f"正在上传 {len(image_paths)} 张图片...")
         
+        tracker = UploadTracker(page, XHS_UPLOAD_API_PATTERN)
         await upload_files_visible(page, 'input[type="file"]', image_paths)
         
-        await human_delay(3000 + len(image_paths) * 2000, 5000 + len(image_paths) * 3000)
+        # 原固定延时为 3000+2000n ~ 5000+3000n 毫秒，现以其上限作为超时
+        max_wait = 5000 + len(image_paths) * 3000
+        budget = (3000 + 5000) / 2 + len(image_paths) * (2000 + 3000) / 2
+        await report.wait(
+            "图片上传",
+            tracker.wait(len(image_paths), XHS_THUMB_SELECTOR, XHS_PROGRESS_SELECTOR, timeout=max_wait),
+            budget
+        )
+        await human_delay(300, 800)
         print_success("图片上传完成")
         
         if title:
@@ -159,6 +180,7 @@ async def upload_images(
         
         await human_delay(800, 1500)
         
+        report.print()
         print_success("内容已填写完成！")
         print_info("请在浏览器中检查内容，手动点击发布按钮")
         print_info("关闭浏览器后程序将继续...")
@@ -173,8 +195,14 @@ async def upload_images(
 class XiaohongshuClient:
     """小红书客户端封装"""
     
-    def __init__(self, headless: bool = False):
+    PLATFORM = "xiaohongshu"
+    
+    def __init__(self, headless: bool = False, pool: BrowserPool = None, account: str = "default"):
+        """pool 不为空时从浏览器池租用上下文，否则独立启动浏览器"""
         self.headless = headless
+        self.pool = pool
+        self.account = account
+        self.lease: BrowserLease = None
         self.playwright = None
         self.browser = None
         self.context = None
@@ -182,6 +210,18 @@ class XiaohongshuClient:
     
     async def start(self):
         """启动浏览器（带反检测）"""
+        if self.pool:
+            self.lease = await self.pool.acquire(
+                self.PLATFORM, self.account, self.headless, **context_options(self.PLATFORM, self.account)
+            )
+            self.context = self.lease.context
+            # 优先使用完整的登录状态，没有时退回到 cookies 文件
+            if self.lease.fresh and not await restore_session(self.context, self.PLATFORM, self.account):
+                await load_cookies(self.context)
+            await install_route_policy(self.context, self.PLATFORM)
+            self.page = await self.context.new_page()
+            return
+        
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
             headless=self.headless,
@@ -192,30 +232,67 @@ class XiaohongshuClient:
         )
         self.context = await self.browser.new_context(
             no_viewport=True,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            **context_options(self.PLATFORM, self.account)
         )
         
         await apply_stealth(self.context)
         
-        self.page = await self.context.new_page()
+        if not await restore_session(self.context, self.PLATFORM, self.account):
+            await load_cookies(self.context)
+        await install_route_policy(self.context, self.PLATFORM)
         
-        await load_cookies(self.context)
+        self.page = await self.context.new_page()
+    
+    async def _release(self):
+        """关闭页面并归还租用的上下文"""
+        lease, self.lease = self.lease, None
+        try:
+            if self.page and not self.page.is_closed():
+                await self.page.close()
+        except Exception:
+            pass
+        await self.pool.release(lease)
     
     async def close(self):
-        """关闭浏览器"""
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        """关闭浏览器（租用模式下归还上下文）"""
+        if self.lease:
+            await self._release()
+            return
+        # 置空后再关闭，重复调用（如 wait_for_close 之后）时直接返回
+        browser, self.browser = self.browser, None
+        playwright, self.playwright = self.playwright, None
+        if browser:
+            await browser.close()
+        if playwright:
+            await playwright.stop()
     
     async def check_login(self) -> bool:
-        return await check_login(self.page)
+        """优先用缓存和接口判断登录状态，无法判断时再打开页面检查"""
+        status = await check_session(self.context, self.PLATFORM, self.account)
+        if status is not None:
+            return status
+        is_logged_in = await check_login(self.page)
+        if is_logged_in:
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        return is_logged_in
     
     async def login(self) -> bool:
-        return await login_with_qrcode(self.page, self.context)
+        success = await login_with_qrcode(self.page, self.context)
+        if success:
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        return success
     
     async def upload_images(self, image_paths: list[str], title: str, content: str = "", tags: list[str] = None) -> bool:
-        return await upload_images(self.page, image_paths, title, content, tags)
+        success = await upload_images(self.page, image_paths, title, content, tags)
+        print_route_stats(self.context)
+        if success:
+            # 登录 cookie 可能已续期，刷新保存的登录状态
+            await save_session(self.context, self.PLATFORM, self.account, self.page)
+        else:
+            # 可能是登录失效导致，下次重新探测
+            invalidate(self.PLATFORM, self.account)
+        return success
     
     async def wait_for_close(self):
         """等待用户关闭浏览器"""
@@ -225,11 +302,13 @@ class XiaohongshuClient:
             except:
                 pass
         
+        if self.lease:
+            await self._release()
+            print_info("页面已关闭")
+            return
+        
         try:
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+            await self.close()
         except:
             pass
         
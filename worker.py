@@ -0,0 +1,101 @@
+"""分布式队列入口（无交互）
+
+用法:
+    python worker.py enqueue jobs.jsonl                     # 把批量任务放入队列
+    python worker.py run                                    # 消费全部阶段
+    python worker.py run --stages images --concurrency 2    # 只负责图片生成
+    python worker.py run --once                             # 队列为空后退出
+    python worker.py status                                 # 查看队列、worker 和死信
+    python worker.py retry-dead images                      # 重新处理死信任务
+
+任务文件格式见 service/batch.py，队列配置见 util/job_queue.py
+"""
+
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# 先加载 .env，service 模块在导入时读取环境变量
+load_dotenv()
+
+from rich.table import Table
+from util.browser_pool import close_browser_pool
+from util.http_client import close_http_client
+from util.image_optimizer import close_image_pool
+from util.redis_client import close_async_redis
+from util.background import shutdown_background_worker
+from util.metrics import flush_metrics, print_metrics_summary
+from util.job_queue import QUEUE_STAGES, get_job_queue
+from util.console import console, print_success, print_info
+from service.batch import load_jobs
+from service.queue_worker import QueueWorker, enqueue_job
+
+
+async def print_status(queue):
+    table = Table(title="任务队列")
+    for column in ("阶段", "排队", "处理中", "死信"):
+        table.add_column(column, justify="right" if column != "阶段" else "left")
+    for stage, counts in (await queue.stats()).items():
+        table.add_row(stage, str(counts["ready"]), str(counts["processing"]), str(counts["dead"]))
+    console.print(table)
+
+    workers = await queue.workers()
+    table = Table(title=f"worker（{sum(w['alive'] for w in workers)}/{len(workers)} 在线）")
+    for column in ("ID", "状态", "阶段", "处理中", "完成", "失败"):
+        table.add_column(column)
+    for worker in workers:
+        status = "[green]在线[/green]" if worker["alive"] else "[red]离线[/red]"
+        table.add_row(worker["id"], status, ",".join(worker.get("stages", [])), str(len(worker.get("active", []))),
+                      str(worker.get("processed", 0)), str(worker.get("failed", 0)))
+    console.print(table)
+
+    for stage in QUEUE_STAGES:
+        for job in await queue.dead_letters(stage):
+            job_name = (job["payload"] or {}).get("id", job["id"])
+            print_info(f"[死信] {stage} {job_name}: 尝试 {job['attempts']} 次，{job['error']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="分布式任务队列")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = subparsers.add_parser("enqueue", help="把批量任务放入队列")
+    enqueue_parser.add_argument("jobs", help="JSONL 任务文件，每行一个任务")
+    run_parser = subparsers.add_parser("run", help="启动 worker")
+    run_parser.add_argument("--stages", nargs="+", choices=QUEUE_STAGES, default=list(QUEUE_STAGES), help="负责的阶段")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="同时处理的任务数")
+    run_parser.add_argument("--once", action="store_true", help="队列为空后退出")
+    subparsers.add_parser("status", help="查看队列状态")
+    retry_parser = subparsers.add_parser("retry-dead", help="重新处理死信任务")
+    retry_parser.add_argument("stage", choices=QUEUE_STAGES)
+    args = parser.parse_args()
+
+    queue = get_job_queue()
+    try:
+        await _run_command(args, queue)
+    finally:
+        await close_async_redis()
+        flush_metrics()
+
+
+async def _run_command(args, queue):
+    match args.command:
+        case "enqueue":
+            job_ids = [job_id for job in load_jobs(args.jobs) if (job_id := await enqueue_job(queue, job))]
+            print_success(f"已入队 {len(job_ids)} 个任务")
+        case "status":
+            await print_status(queue)
+        case "retry-dead":
+            print_success(f"已重新入队 {await queue.retry_dead(args.stage)} 个任务")
+        case "run":
+            try:
+                await QueueWorker(queue, args.stages, args.concurrency).run(stop_when_idle=args.once)
+            finally:
+                await close_browser_pool()
+                await close_http_client()
+                close_image_pool()
+                await asyncio.to_thread(shutdown_background_worker)
+                print_metrics_summary()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())